@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+情感推理吞吐基准：固定条数分批 vs 按 token 长度动态分批
+
+文本来自 --input 指定的清洗后 CSV（随机抽样），或按真实分布合成的长度混合：
+60% 标题级短文本、30% 中等正文、10% 长文。两种分批方式使用同一批文本、同一个模型，
+输出 articles/sec 与 padding 利用率。
+
+用法:
+    python scripts/bench_sentiment.py --n 2000
+    python scripts/bench_sentiment.py --input data/processed/articles_recent_cleaned.csv --n 5000 --max_tokens 8192
+    python scripts/bench_sentiment.py --n 5000 --workers 8 --threads_per_worker 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pandas as pd
+
+from sentiment_top import (BACKENDS, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE, DEFAULT_MAX_TOKENS, MODEL_NAME,
+                           analyze_sentiment_batch,
+                           load_sentiment_model, plan_token_batches, token_lengths)
+
+_WORDS = ("tencent alibaba shares rose fell after results beat estimates revenue profit guidance "
+          "market investors analysts quarter growth regulators hong kong index stock").split()
+
+
+def synthetic_texts(n: int, seed: int = 0) -> list:
+    """合成真实长度混合的新闻文本"""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        r = rng.random()
+        words = rng.randint(8, 30) if r < 0.6 else rng.randint(100, 300) if r < 0.9 else rng.randint(600, 1200)
+        texts.append(' '.join(rng.choice(_WORDS) for _ in range(words)))
+    return texts
+
+
+def sample_texts(input_file: str, text_column: str, n: int, seed: int = 0) -> list:
+    df = pd.read_csv(input_file, encoding='utf-8-sig')
+    texts = df[text_column].dropna().astype(str)
+    return texts.sample(min(n, len(texts)), random_state=seed).tolist()
+
+
+def padding_efficiency(lengths: list, batches: list) -> float:
+    padded = sum(max(lengths[i] for i in b) * len(b) for b in batches)
+    return sum(lengths) / max(padded, 1)
+
+
+def run(texts: list, sentiment_pipeline, batch_size: int, max_tokens) -> float:
+    start = time.perf_counter()
+    analyze_sentiment_batch(texts, sentiment_pipeline, batch_size, max_tokens=max_tokens)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情感推理分批方式吞吐基准")
+    parser.add_argument("--input", "-i", help="清洗后的新闻 CSV（默认合成长度混合）")
+    parser.add_argument("--text_column", "-t", default="body", help="文本列名")
+    parser.add_argument("--n", type=int, default=1000, help="文本条数")
+    parser.add_argument("--batch_size", "-b", type=int, default=DEFAULT_BATCH_SIZE, help="固定分批条数 / 动态分批条数上限")
+    parser.add_argument("--max_tokens", type=int, default=DEFAULT_MAX_TOKENS, help="动态分批 token 上限")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND, help="推理后端")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="推理进程数")
+    parser.add_argument("--threads_per_worker", type=int, help="每个进程的线程数（默认 CPU 核数 / workers）")
+    parser.add_argument("--pipelined", action="store_true", help="分词 / 推理 / 后处理流水线")
+    parser.add_argument("--output", "-o", help="结果 JSON 路径（可选）")
+    args = parser.parse_args()
+
+    texts = sample_texts(args.input, args.text_column, args.n) if args.input else synthetic_texts(args.n)
+    sentiment_pipeline = load_sentiment_model(args.backend, num_threads=args.threads_per_worker, workers=args.workers,
+                                              pipelined=args.pipelined)
+    if args.workers > 1:
+        # 多进程池在父进程里没有分词器，padding 统计单独加载分词器计算
+        from transformers import AutoTokenizer
+        lengths = token_lengths(texts, SimpleNamespace(tokenizer=AutoTokenizer.from_pretrained(MODEL_NAME)))
+    else:
+        lengths = token_lengths(texts, sentiment_pipeline)
+    fixed_batches = [list(range(i, min(i + args.batch_size, len(texts)))) for i in range(0, len(texts), args.batch_size)]
+    dynamic_batches = plan_token_batches(lengths, args.max_tokens, args.batch_size)
+
+    # 预热一批，避免首批的初始化开销计入
+    analyze_sentiment_batch(texts[:args.batch_size], sentiment_pipeline, args.batch_size)
+
+    result = {
+        'backend': args.backend,
+        'workers': args.workers,
+        'pipelined': args.pipelined,
+        'threads_per_worker': getattr(sentiment_pipeline, 'threads_per_worker', args.threads_per_worker),
+        'n': len(texts),
+        'mean_tokens': round(sum(lengths) / max(len(lengths), 1), 1),
+        'fixed': {
+            'batch_size': args.batch_size,
+            'padding_efficiency': round(padding_efficiency(lengths, fixed_batches), 3),
+            'articles_per_sec': round(run(texts, sentiment_pipeline, args.batch_size, None), 2),
+        },
+        'dynamic': {
+            'max_tokens': args.max_tokens,
+            'batches': len(dynamic_batches),
+            'padding_efficiency': round(padding_efficiency(lengths, dynamic_batches), 3),
+            'articles_per_sec': round(run(texts, sentiment_pipeline, args.batch_size, args.max_tokens), 2),
+        },
+    }
+    result['speedup'] = round(result['dynamic']['articles_per_sec'] / result['fixed']['articles_per_sec'], 2)
+    if getattr(sentiment_pipeline, 'last_stats', None):
+        result['stages'] = sentiment_pipeline.last_stats['stages']
+    if hasattr(sentiment_pipeline, 'close'):
+        sentiment_pipeline.close()
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"[INFO] Saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,31 +4,46 @@ NLP Factor Run-Real Mode
 支持用户提供新闻 CSV 进行因子构建
 """
 import argparse
+import csv
 import json
 import os
 import sys
-import pandas as pd
 from datetime import datetime
 
 def validate_news_csv(csv_path: str) -> dict:
-    """验证新闻 CSV 格式"""
+    """验证新闻 CSV 格式（只用标准库 csv，--validate-only 无需导入 pandas）"""
     required_columns = ['date', 'headline', 'stock_code']
     
     if not os.path.exists(csv_path):
         return {'valid': False, 'error': f'File not found: {csv_path}'}
     
     try:
-        df = pd.read_csv(csv_path)
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            columns = next(reader)
+            # 与 pandas.read_csv 一致：空行不计入行数
+            rows = sum(1 for row in reader if row)
+    except StopIteration:
+        return {'valid': False, 'error': 'Cannot read CSV: No columns to parse from file'}
     except Exception as e:
         return {'valid': False, 'error': f'Cannot read CSV: {e}'}
     
-    missing = [col for col in required_columns if col not in df.columns]
+    missing = [col for col in required_columns if col not in columns]
     if missing:
         return {'valid': False, 'error': f'Missing columns: {missing}'}
     
-    return {'valid': True, 'rows': len(df), 'columns': list(df.columns)}
+    return {'valid': True, 'rows': rows, 'columns': columns}
 
-def run_factor_build(csv_path: str, output_dir: str = 'reports') -> dict:
+def score_headlines_with_server(headlines, server: str) -> list:
+    """通过常驻评分服务（src/sentiment_server.py）给标题打分，返回 legacy 映射的情感分数"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+    from sentiment_server import SentimentClient
+    from sentiment_top import add_sentiment_scores
+    
+    results = SentimentClient(server).score(list(headlines.fillna('').astype(str)))
+    return add_sentiment_scores(headlines.to_frame(), results, headlines.name)['sentiment_score'].tolist()
+
+def run_factor_build(csv_path: str, output_dir: str = 'reports', server: str = None) -> dict:
     """运行因子构建流程"""
     validation = validate_news_csv(csv_path)
     if not validation['valid']:
@@ -37,12 +52,16 @@ def run_factor_build(csv_path: str, output_dir: str = 'reports') -> dict:
     
     print(f"[INFO] Validated {validation['rows']} news items")
     
+    import pandas as pd
     df = pd.read_csv(csv_path)
     
-    # Mock sentiment scoring (in real implementation, use trained model)
-    df['sentiment_score'] = df['headline'].apply(
-        lambda x: 0.5 if 'profit' in str(x).lower() else -0.5 if 'loss' in str(x).lower() else 0.0
-    )
+    if server:
+        df['sentiment_score'] = score_headlines_with_server(df['headline'], server)
+    else:
+        # Mock sentiment scoring (in real implementation, use trained model)
+        df['sentiment_score'] = df['headline'].apply(
+            lambda x: 0.5 if 'profit' in str(x).lower() else -0.5 if 'loss' in str(x).lower() else 0.0
+        )
     
     # Aggregate by date and stock
     daily_factors = df.groupby(['date', 'stock_code'])['sentiment_score'].mean().reset_index()
@@ -78,6 +97,8 @@ def main():
     parser.add_argument('csv', help='Input news CSV file path')
     parser.add_argument('--output', '-o', default='reports', help='Output directory')
     parser.add_argument('--validate-only', action='store_true', help='Only validate')
+    parser.add_argument('--server', help='Score headlines via a running sentiment server '
+                                         '(http://host:port or unix:///path, see src/sentiment_server.py)')
     
     args = parser.parse_args()
     
@@ -86,7 +107,7 @@ def main():
         print(json.dumps(result, indent=2))
         sys.exit(0 if result['valid'] else 1)
     
-    run_factor_build(args.csv, args.output)
+    run_factor_build(args.csv, args.output, args.server)
 
 if __name__ == '__main__':
     main()
@@ -7,7 +7,7 @@ analyze_factors.py
 
 功能包括：
 - 加载因子数据和IC结果
-- 生成详细的统计报告
+- 生成详细的统计报告（--streaming 分块读取因子文件，内存与文件大小无关）
 - 可视化因子表现
 
 Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
@@ -21,10 +21,13 @@ import argparse
 from pathlib import Path
 from typing import Dict, Any
 
+from data_profile import DataProfile
+
 # --- 配置 ---
 DEFAULT_FACTOR_FILE = 'data/processed/daily_sentiment_factors.csv'
 DEFAULT_IC_FILE = 'data/processed/ic_results.csv'
 DEFAULT_EVAL_FILE = 'data/processed/factor_evaluation.json'
+DEFAULT_CHUNK_SIZE = 100000
 # --- 结束配置 ---
 
 def load_factor_data(factor_file: str) -> pd.DataFrame:
@@ -121,6 +124,11 @@ def analyze_factor_distribution(factors_df: pd.DataFrame) -> Dict[str, Any]:
     low_news = (factors_df['news_count'] == 1).mean()
     
     return {
+        'overview': {
+            'records': len(factors_df),
+            'dates': int(factors_df['date'].nunique()),
+            'codes': int(factors_df['code'].nunique())
+        },
         'sentiment_stats': sentiment_stats.to_dict(),
         'weighted_stats': weighted_stats.to_dict(),
         'news_count_stats': news_count_stats.to_dict(),
@@ -137,6 +145,63 @@ def analyze_factor_distribution(factors_df: pd.DataFrame) -> Dict[str, Any]:
     }
 
 
+def analyze_factor_distribution_streaming(
+    factor_file: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """
+    分块读取因子文件并分析因子分布，内存占用与文件大小无关
+    
+    输出结构与 analyze_factor_distribution 相同；均值/标准差/极值精确，分位数为近似值（相对误差 1%），
+    交易日数 / 股票数为 HyperLogLog 近似值
+    
+    Args:
+        factor_file: 因子数据文件路径
+        chunk_size: 每块行数
+        
+    Returns:
+        分布分析结果
+    """
+    logging.info(f"流式分析因子分布: {factor_file}")
+    
+    columns = ['sentiment_factor', 'weighted_factor', 'news_count']
+    profile = DataProfile(numeric_columns=columns, id_columns=['date', 'code'])
+    counts = {'rows': 0, 'positive': 0, 'negative': 0, 'neutral': 0, 'high': 0, 'medium': 0, 'low': 0}
+    for chunk in pd.read_csv(factor_file, encoding='utf-8-sig', chunksize=chunk_size):
+        profile.update(chunk)
+        counts['rows'] += len(chunk)
+        counts['positive'] += int((chunk['sentiment_factor'] > 0).sum())
+        counts['negative'] += int((chunk['sentiment_factor'] < 0).sum())
+        counts['neutral'] += int((chunk['sentiment_factor'] == 0).sum())
+        counts['high'] += int((chunk['news_count'] >= 3).sum())
+        counts['medium'] += int(((chunk['news_count'] >= 2) & (chunk['news_count'] < 3)).sum())
+        counts['low'] += int((chunk['news_count'] == 1).sum())
+    
+    rows = max(counts['rows'], 1)
+    report = profile.report()
+    stats = report['numeric_stats']
+    return {
+        'overview': {
+            'records': counts['rows'],
+            'dates': report['approx_distinct']['date'],
+            'codes': report['approx_distinct']['code']
+        },
+        'sentiment_stats': stats['sentiment_factor'],
+        'weighted_stats': stats['weighted_factor'],
+        'news_count_stats': stats['news_count'],
+        'sentiment_distribution': {
+            'positive': round(counts['positive'] / rows, 4),
+            'negative': round(counts['negative'] / rows, 4),
+            'neutral': round(counts['neutral'] / rows, 4)
+        },
+        'news_count_distribution': {
+            'high_news': round(counts['high'] / rows, 4),
+            'medium_news': round(counts['medium'] / rows, 4),
+            'low_news': round(counts['low'] / rows, 4)
+        }
+    }
+
+
 def analyze_ic_performance(ic_df: pd.DataFrame) -> Dict[str, Any]:
     """
     分析IC表现
@@ -177,14 +242,12 @@ def analyze_ic_performance(ic_df: pd.DataFrame) -> Dict[str, Any]:
     }
 
 
-def print_detailed_report(factors_df: pd.DataFrame, ic_df: pd.DataFrame, 
-                         eval_data: Dict[str, Any], dist_analysis: Dict[str, Any], 
+def print_detailed_report(ic_df: pd.DataFrame, eval_data: Dict[str, Any], dist_analysis: Dict[str, Any], 
                          ic_analysis: Dict[str, Any]) -> None:
     """
     打印详细报告
     
     Args:
-        factors_df: 因子数据框
         ic_df: IC数据框
         eval_data: 评估数据
         dist_analysis: 分布分析结果
@@ -198,9 +261,10 @@ def print_detailed_report(factors_df: pd.DataFrame, ic_df: pd.DataFrame,
     
     # 数据概览
     print(f"\n📈 数据概览:")
-    print(f"   • 因子记录数: {len(factors_df):,}")
-    print(f"   • 覆盖交易日: {factors_df['date'].nunique()}")
-    print(f"   • 覆盖股票数: {factors_df['code'].nunique()}")
+    overview = dist_analysis['overview']
+    print(f"   • 因子记录数: {overview['records']:,}")
+    print(f"   • 覆盖交易日: {overview['dates']}")
+    print(f"   • 覆盖股票数: {overview['codes']}")
     print(f"   • IC计算天数: {comp['total_days']}")
     
     # 因子分布
@@ -287,6 +351,9 @@ def main():
                        help="IC数据文件路径")
     parser.add_argument("--eval_file", "-e", default=DEFAULT_EVAL_FILE, 
                        help="评估数据文件路径")
+    parser.add_argument("--streaming", action="store_true",
+                       help="分块读取因子文件（内存与文件大小无关；分位数、交易日数、股票数为近似值）")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE, help="--streaming 时每块行数")
     parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
     
     args = parser.parse_args()
@@ -301,18 +368,22 @@ def main():
     
     try:
         # 1. 加载数据
-        factors_df = load_factor_data(args.factor_file)
         ic_df = load_ic_data(args.ic_file)
         eval_data = load_evaluation_data(args.eval_file)
         
-        # 2. 分析因子分布
-        dist_analysis = analyze_factor_distribution(factors_df)
+        # 2. 分析因子分布（--streaming 时不整体读入因子文件）
+        if args.streaming:
+            if not Path(args.factor_file).exists():
+                raise FileNotFoundError(f"因子数据文件不存在: {args.factor_file}")
+            dist_analysis = analyze_factor_distribution_streaming(args.factor_file, args.chunk_size)
+        else:
+            dist_analysis = analyze_factor_distribution(load_factor_data(args.factor_file))
         
         # 3. 分析IC表现
         ic_analysis = analyze_ic_performance(ic_df)
         
         # 4. 打印详细报告
-        print_detailed_report(factors_df, ic_df, eval_data, dist_analysis, ic_analysis)
+        print_detailed_report(ic_df, eval_data, dist_analysis, ic_analysis)
         
         print(f"\n✅ 因子分析完成!")
         
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+boilerplate.py
+---------------------------------
+句子级样板文本去除：免责声明、"关于公司"段落、收市综述等在大量正文里重复出现，
+每篇都要送进 Transformer 重新编码
+
+- 正文按句切分（中英文标点 / 换行），句子规范化（小写、空白合并、数字统一为 0，
+  使"恒指跌 1.2%"一类模板句相互匹配）后 blake2b 哈希
+- SentenceIndex：句子哈希 → 出现过的文章数，SQLite 持久化，跨运行累积（同一文章只计一次）
+- 文章数 >= min_count 且长度 >= min_chars 的句子视为样板句：strip 模式直接去除，
+  demote 模式移到正文末尾（超过截断长度的部分最先被截掉）；全部是样板句的文章保持原文
+- 只改变送入模型的文本，输出文件中的正文不变；情感缓存按去除后的文本命中
+
+report 子命令在同一批新闻上比较原文与去除样板句后的：送入模型的 token 数、评分耗时与加速比、
+两者标签一致率与分数相关。
+
+用法:
+    python src/sentiment_top.py --strip_boilerplate --boilerplate_min_count 20
+    python src/boilerplate.py report --input data/processed/articles_recent_cleaned.csv --sample 1000
+    python src/boilerplate.py top --n 20
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BOILERPLATE_DB = 'data/processed/boilerplate.sqlite'
+DEFAULT_MIN_COUNT = 20
+DEFAULT_MIN_CHARS = 40
+MODES = ('strip', 'demote')
+# SQLite 单条语句的参数上限（旧版本为 999）
+_LOOKUP_CHUNK = 900
+
+_SENTENCE_RE = re.compile(r'(?<=[。！？；])|(?<=[.!?;])\s+|\n+')
+_WS_RE = re.compile(r'\s+')
+_DIGITS_RE = re.compile(r'\d+')
+
+
+@dataclass
+class BoilerplateConfig:
+    db_path: str = DEFAULT_BOILERPLATE_DB
+    min_count: int = DEFAULT_MIN_COUNT    # 出现过的文章数下限
+    min_chars: int = DEFAULT_MIN_CHARS    # 句子长度下限（短句即使常见也可能带情感）
+    mode: str = 'strip'                   # strip：去除；demote：移到末尾
+
+
+def split_sentences(text: str) -> List[str]:
+    """按中英文句末标点和换行切句，去掉空句"""
+    if not isinstance(text, str):
+        return []
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+
+
+def sentence_hash(sentence: str) -> int:
+    """规范化后的句子哈希（有符号 64 位，可直接作 SQLite 整数主键）"""
+    normalized = _DIGITS_RE.sub('0', _WS_RE.sub(' ', sentence.lower())).strip()
+    return int.from_bytes(hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+class SentenceIndex:
+    """
+    持久化的句子文档频率索引
+
+    Args:
+        db_path: SQLite 文件路径（':memory:' 为内存索引）
+    """
+
+    def __init__(self, db_path: str = DEFAULT_BOILERPLATE_DB):
+        if db_path != ':memory:':
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sentences "
+                          "(hash INTEGER PRIMARY KEY, doc_count INTEGER, sample TEXT)")
+        self.conn.commit()
+
+    def add_documents(self, items: Iterable[Tuple[str, str]]) -> int:
+        """入库 (doc_id, text)，已入库的文章跳过；返回新入库的文章数（一次事务提交）"""
+        counts: Counter = Counter()
+        samples: Dict[int, str] = {}
+        added = 0
+        for doc_id, text in items:
+            cur = self.conn.execute("INSERT OR IGNORE INTO docs (doc_id) VALUES (?)", (doc_id,))
+            if not cur.rowcount:
+                continue
+            added += 1
+            # 同一文章里重复的句子只计一次
+            unique: Dict[int, str] = {}
+            for sentence in split_sentences(text):
+                unique.setdefault(sentence_hash(sentence), sentence)
+            counts.update(unique.keys())
+            for h, sentence in unique.items():
+                samples.setdefault(h, sentence)
+        self.conn.executemany(
+            "INSERT INTO sentences (hash, doc_count, sample) VALUES (?, ?, ?) "
+            "ON CONFLICT(hash) DO UPDATE SET doc_count = doc_count + excluded.doc_count",
+            ((h, n, samples[h][:500]) for h, n in counts.items()))
+        self.conn.commit()
+        return added
+
+    def frequencies(self, hashes: Iterable[int]) -> Dict[int, int]:
+        """句子哈希 → 出现过的文章数（未收录的不返回）"""
+        unique = list(set(hashes))
+        out: Dict[int, int] = {}
+        for i in range(0, len(unique), _LOOKUP_CHUNK):
+            chunk = unique[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            out.update(self.conn.execute(f"SELECT hash, doc_count FROM sentences WHERE hash IN ({marks})", chunk))
+        return out
+
+    def top(self, n: int = 20) -> List[Tuple[int, str]]:
+        """出现文章数最多的句子 (文章数, 示例原句)"""
+        return list(self.conn.execute("SELECT doc_count, sample FROM sentences ORDER BY doc_count DESC LIMIT ?", (n,)))
+
+    def document_count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def strip_boilerplate(
+    texts: Sequence[str],
+    index: SentenceIndex,
+    min_count: int = DEFAULT_MIN_COUNT,
+    min_chars: int = DEFAULT_MIN_CHARS,
+    mode: str = 'strip'
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    去除（或后移）样板句
+
+    Returns:
+        (处理后的文本，与 texts 对齐；统计：句子数、样板句数、改动文章数、字符数变化)
+    """
+    if mode not in MODES:
+        raise ValueError(f"未知的样板句处理方式: {mode}，可选: {MODES}")
+    split = [split_sentences(t) for t in texts]
+    hashes = [[sentence_hash(s) for s in sents] for sents in split]
+    freq = index.frequencies(h for hs in hashes for h in hs)
+
+    out: List[str] = []
+    boilerplate_sentences = changed = 0
+    for text, sents, hs in zip(texts, split, hashes):
+        is_boiler = [freq.get(h, 0) >= min_count and len(s) >= min_chars for s, h in zip(sents, hs)]
+        keep = [s for s, b in zip(sents, is_boiler) if not b]
+        drop = [s for s, b in zip(sents, is_boiler) if b]
+        if not drop or not keep:
+            out.append(text)
+            continue
+        boilerplate_sentences += len(drop)
+        changed += 1
+        out.append(' '.join(keep + drop if mode == 'demote' else keep))
+
+    chars_before = sum(len(t) for t in texts if isinstance(t, str))
+    chars_after = sum(len(t) for t in out if isinstance(t, str))
+    stats = {
+        'texts': len(texts),
+        'texts_changed': changed,
+        'sentences': sum(len(s) for s in split),
+        'boilerplate_sentences': boilerplate_sentences,
+        'chars_before': chars_before,
+        'chars_after': chars_after,
+        'chars_removed_fraction': round(1 - chars_after / chars_before, 4) if chars_before else 0.0,
+    }
+    return out, stats
+
+
+def boilerplate_texts(df: pd.DataFrame, text_column: str, config: BoilerplateConfig,
+                      id_column: str = 'uri') -> Tuple[List[str], Dict[str, Any]]:
+    """
+    df 全部文章入库更新句子频率后，返回去除样板句的文本（sentiment_top 在评分前调用）
+
+    没有 id_column 或标识缺失时以正文哈希作为文章标识（缺失值不能都记成同一篇 'nan'）
+    """
+    texts = df[text_column].astype(str).tolist()
+    raw_ids = df[id_column].tolist() if id_column in df.columns else [None] * len(texts)
+    ids = [hashlib.sha1(t.encode('utf-8')).hexdigest() if pd.isna(i) else str(i) for i, t in zip(raw_ids, texts)]
+    index = SentenceIndex(config.db_path)
+    try:
+        added = index.add_documents(zip(ids, texts))
+        stripped, stats = strip_boilerplate(texts, index, config.min_count, config.min_chars, config.mode)
+        stats['indexed_documents'] = index.document_count()
+    finally:
+        index.close()
+    logging.info(f"样板句处理（{config.mode}）：新入库 {added} 篇，{stats['texts_changed']} / {len(texts)} 篇改动，"
+                 f"{stats['boilerplate_sentences']} 句，字符减少 {stats['chars_removed_fraction']:.1%}")
+    return stripped, stats
+
+
+def boilerplate_report(
+    df: pd.DataFrame,
+    sentiment_pipeline,
+    config: BoilerplateConfig,
+    text_column: str = 'body',
+    batch_size: int = 32,
+    max_tokens: Optional[int] = None,
+    score_mapping: str = 'legacy',
+    repeats: int = 2
+) -> Dict[str, Any]:
+    """
+    原文 vs 去除样板句后的文本（不使用情感缓存，两次计时可比）
+
+    两种文本交替先后各评分 repeats 轮，各取最快一次，预热和缓存效应不偏向后评分的一方
+
+    Returns:
+        送入模型的 token 数与减少比例、两次评分耗时与加速比、标签一致率与分数相关
+    """
+    from sentiment_top import add_sentiment_scores, analyze_sentiment_batch, token_lengths
+
+    texts = df[text_column].astype(str).tolist()
+    stripped, stats = boilerplate_texts(df, text_column, config)
+    # token_lengths 按模型截断长度计数，即真正送入模型的 token
+    tokens_before = int(sum(token_lengths(texts, sentiment_pipeline)))
+    tokens_after = int(sum(token_lengths(stripped, sentiment_pipeline)))
+
+    def _timed(batch: List[str]) -> Tuple[List[Dict[str, Any]], float]:
+        start = time.perf_counter()
+        results = analyze_sentiment_batch(batch, sentiment_pipeline, batch_size, max_tokens=max_tokens)
+        return results, time.perf_counter() - start
+
+    # 预热一批，首批的初始化开销不计入
+    analyze_sentiment_batch(texts[:batch_size], sentiment_pipeline, batch_size)
+    variants = {'original': texts, 'stripped': stripped}
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    seconds: Dict[str, float] = {}
+    for round_ in range(max(1, repeats)):
+        order = ('original', 'stripped') if round_ % 2 == 0 else ('stripped', 'original')
+        for name in order:
+            scored, elapsed = _timed(variants[name])
+            results.setdefault(name, scored)
+            seconds[name] = min(seconds.get(name, elapsed), elapsed)
+    original, original_seconds = results['original'], seconds['original']
+    cleaned, cleaned_seconds = results['stripped'], seconds['stripped']
+    base = add_sentiment_scores(df, original, text_column, score_mapping)
+    after = add_sentiment_scores(df, cleaned, text_column, score_mapping)
+    changed = np.array([a != b for a, b in zip(texts, stripped)])
+
+    report: Dict[str, Any] = dict(stats)
+    report.update({
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_removed': tokens_before - tokens_after,
+        'tokens_removed_fraction': round(1 - tokens_after / tokens_before, 4) if tokens_before else 0.0,
+        'original_seconds': round(original_seconds, 2),
+        'stripped_seconds': round(cleaned_seconds, 2),
+        'speedup': round(original_seconds / cleaned_seconds, 2) if cleaned_seconds > 0 else None,
+        'timing_repeats': max(1, repeats),
+        'label_agreement': round(float(np.mean(base['sentiment_label'].to_numpy()
+                                               == after['sentiment_label'].to_numpy())), 4),
+        'label_agreement_changed': (round(float(np.mean(base['sentiment_label'].to_numpy()[changed]
+                                                        == after['sentiment_label'].to_numpy()[changed])), 4)
+                                    if changed.any() else None),
+        'score_correlation': round(float(base['sentiment_score'].corr(after['sentiment_score'])), 4),
+    })
+    return report
+
+
+def add_boilerplate_arguments(parser: argparse.ArgumentParser) -> None:
+    """样板句索引与阈值参数（sentiment_top.py 与本模块共用）"""
+    defaults = BoilerplateConfig()
+    parser.add_argument("--boilerplate_db", default=defaults.db_path, help="句子频率索引路径（跨运行累积）")
+    parser.add_argument("--boilerplate_min_count", type=int, default=defaults.min_count,
+                        help="出现在不少于 N 篇文章中的句子视为样板句")
+    parser.add_argument("--boilerplate_min_chars", type=int, default=defaults.min_chars, help="样板句最短字符数")
+    parser.add_argument("--boilerplate_mode", choices=MODES, default=defaults.mode,
+                        help="strip：去除样板句；demote：移到正文末尾（先被截断）")
+
+
+def config_from_args(args: argparse.Namespace) -> BoilerplateConfig:
+    return BoilerplateConfig(args.boilerplate_db, args.boilerplate_min_count, args.boilerplate_min_chars,
+                             args.boilerplate_mode)
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="句子级样板文本去除：token 减少与评分加速报告")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_report = sub.add_parser("report", help="原文与去除样板句后的 token 数、耗时、标签一致率")
+    p_report.add_argument("--input", "-i", required=True, help="清洗后的新闻 CSV 或 Parquet 目录")
+    p_report.add_argument("--text_column", "-t", default="body", help="文本列名")
+    p_report.add_argument("--sample", type=int, default=1000, help="评分样本条数（0 表示全部；句子频率用全部新闻）")
+    p_report.add_argument("--batch_size", "-b", type=int, default=32, help="批大小")
+    p_report.add_argument("--output", "-o", help="报告 JSON 路径（可选）")
+    add_boilerplate_arguments(p_report)
+    p_top = sub.add_parser("top", help="出现文章数最多的句子")
+    p_top.add_argument("--boilerplate_db", default=DEFAULT_BOILERPLATE_DB, help="句子频率索引路径")
+    p_top.add_argument("--n", type=int, default=20, help="条数")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        if args.command == "top":
+            index = SentenceIndex(args.boilerplate_db)
+            try:
+                print(f"📊 已索引文章数: {index.document_count()}")
+                for count, sample in index.top(args.n):
+                    print(f"{count:>8}  {sample[:160]}")
+            finally:
+                index.close()
+            return 0
+
+        from sentiment_top import DEFAULT_MAX_TOKENS, load_cleaned_data, load_sentiment_model
+
+        df = load_cleaned_data(args.input, args.text_column)
+        config = config_from_args(args)
+        # 全部新闻先入库，样本上的频率与完整语料一致
+        boilerplate_texts(df, args.text_column, config)
+        if args.sample and len(df) > args.sample:
+            df = df.sample(args.sample, random_state=0).sort_index()
+        report = boilerplate_report(df, load_sentiment_model(), config, args.text_column, args.batch_size,
+                                    DEFAULT_MAX_TOKENS)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📁 报告已保存到: {args.output}")
+
+    except Exception as e:
+        logging.error(f"执行失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -12,18 +12,45 @@ clean_data.py
 - 语言检测和过滤
 - 数据质量检查
 
+clean_news_dataframe 使用整列（向量化）版本的清洗函数：预编译正则 + pandas .str 操作，
+ASCII 文本跳过逐字符 Unicode 检查，日期整列交给 pd.to_datetime 解析；
+逐条版本（clean_text_content / normalize_datetime / detect_language）保留作为参考实现，两者输出一致。
+
 Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
 """
 
 import re
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import html
 import unicodedata
 
+from article_store import read_partitioned, write_partitioned
+from near_dup import tag_near_duplicates
+from clean_manifest import CleanManifest, read_appended
+
+DEFAULT_CHUNK_SIZE = 20000
+DEFAULT_WORKERS = 1
+
+# 预编译正则（整列清洗使用）
+_HTML_TAG_RE = re.compile(r'<[^>]+>')
+_WHITESPACE_RE = re.compile(r'\s+')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+_SPACES_RE = re.compile(r'[ \t]+')
+# ASCII 范围内的控制字符（Unicode 类别 Cc），保留 \n 和 \t
+_ASCII_CONTROL_RE = re.compile(r'[\x00-\x08\x0b-\x1f\x7f]')
+# 语言检测码点表：中文 → 'z'，韩文 → 'k'，英文字母 → 'e'（原文中的 z/k 本身映射为 'e'，计数不会混淆）
+_LANG_TABLE = {cp: 'z' for cp in range(0x4e00, 0x9fff + 1)}
+_LANG_TABLE.update({cp: 'k' for cp in range(0xac00, 0xd7af + 1)})
+_LANG_TABLE.update({ord(c): 'e' for c in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'})
+LANGUAGES = ['zh', 'en', 'ko', 'other']
+
 
 def clean_html_tags(text: str) -> str:
     """
@@ -157,6 +184,152 @@ def detect_language(text: str) -> str:
         return 'other'
 
 
+def _is_str(series: pd.Series) -> pd.Series:
+    return series.map(lambda x: isinstance(x, str)).astype(bool)
+
+
+def _sub_where(s: pd.Series, needles: Tuple[str, ...], pattern: re.Pattern, repl: str) -> pd.Series:
+    """只对包含任一 needle 的文本执行正则替换（不含时替换必为空操作）"""
+    mask = s.str.contains(needles[0], regex=False)
+    for needle in needles[1:]:
+        mask |= s.str.contains(needle, regex=False)
+    if mask.any():
+        s = s.copy()
+        s[mask] = s[mask].str.replace(pattern, repl, regex=True)
+    return s
+
+
+def _normalize_unicode_fast(text: str) -> str:
+    """normalize_unicode 的快速版本：NFKC 后全部为可打印字符时跳过逐字符检查"""
+    text = unicodedata.normalize('NFKC', text)
+    if text.isprintable():
+        return text
+    return ''.join(char for char in text if unicodedata.category(char)[0] != 'C' or char in '\n\t')
+
+
+def clean_text_series(series: pd.Series) -> pd.Series:
+    """
+    整列文本清洗，输出与逐条调用 clean_text_content 一致
+    
+    Args:
+        series: 原始文本列
+        
+    Returns:
+        清洗后的文本列（object 类型，非字符串值变为空字符串）
+    """
+    s = series.astype(object)
+    s = s.where(_is_str(s), '')
+    if s.empty:
+        return s
+    
+    # 去除HTML标签（只有含 & 的文本才需要解码实体）
+    has_entity = s.str.contains('&', regex=False)
+    if has_entity.any():
+        s = s.copy()
+        s[has_entity] = s[has_entity].map(html.unescape)
+    s = _sub_where(s, ('<',), _HTML_TAG_RE, '')
+    s = s.str.replace(_WHITESPACE_RE, ' ', regex=True).str.strip()
+    
+    # 标准化Unicode：ASCII 文本 NFKC 不变，只需去掉 ASCII 控制字符
+    is_ascii = s.map(str.isascii).astype(bool)
+    s = s.copy()
+    s[is_ascii] = s[is_ascii].str.replace(_ASCII_CONTROL_RE, '', regex=True)
+    if (~is_ascii).any():
+        s[~is_ascii] = s[~is_ascii].map(_normalize_unicode_fast)
+    
+    # 去除多余的换行符和空格
+    s = _sub_where(s, ('\n',), _BLANK_LINES_RE, '\n')
+    s = _sub_where(s, ('  ', '\t'), _SPACES_RE, ' ')
+    return s.str.strip().astype(object)
+
+
+def normalize_datetime_series(dates: pd.Series, times: pd.Series) -> pd.Series:
+    """
+    整列统一日期时间格式，输出与逐行调用 normalize_datetime 一致
+    
+    Args:
+        dates: 日期列 (YYYY-MM-DD)
+        times: 时间列 (HH:MM:SS)
+        
+    Returns:
+        datetime 列，解析失败为 NaT
+    """
+    # 与 normalize_datetime 相同的"有时间"判定
+    has_time = pd.Series(
+        [bool(t) and str(t).lower() not in ['nan', 'none', ''] for t in times.astype(object)],
+        index=times.index, dtype=bool
+    )
+    result = pd.Series(pd.NaT, index=dates.index, dtype='datetime64[ns]')
+    
+    if has_time.any():
+        combined = dates[has_time].astype(object).astype(str) + ' ' + times[has_time].astype(object).astype(str)
+        result[has_time] = pd.to_datetime(combined, format="%Y-%m-%d %H:%M:%S", errors='coerce')
+    
+    date_only = ~has_time & _is_str(dates.astype(object))
+    if date_only.any():
+        result[date_only] = pd.to_datetime(dates[date_only], format="%Y-%m-%d", errors='coerce')
+    
+    return result
+
+
+def _script_counts(text: str) -> Tuple[int, int, int, int]:
+    """单次扫描：一次 translate 后用 str.count 统计 (中文, 韩文, 英文, 总长度)"""
+    if not isinstance(text, str) or len(text) < 10:
+        return 0, 0, 0, 0
+    mapped = text.translate(_LANG_TABLE)
+    return mapped.count('z'), mapped.count('k'), mapped.count('e'), len(text)
+
+
+def detect_language_series(series: pd.Series) -> pd.Series:
+    """
+    整列语言检测，输出与逐条调用 detect_language 一致
+    
+    每条文本只扫描一次（码点表 translate + count），比例判断整列完成
+    
+    Args:
+        series: 文本列
+        
+    Returns:
+        语言代码列：'zh'、'en'、'ko'、'other'
+    """
+    counts = np.array([_script_counts(t) for t in series.astype(object)], dtype=np.int64).reshape(-1, 4)
+    total = counts[:, 3]
+    eligible = total >= 10
+    safe_total = np.where(eligible, total, 1)
+    chinese_ratio = counts[:, 0] / safe_total
+    korean_ratio = counts[:, 1] / safe_total
+    english_ratio = counts[:, 2] / safe_total
+    
+    lang = np.select(
+        [~eligible, chinese_ratio > 0.3, korean_ratio > 0.3, english_ratio > 0.5],
+        ['other', 'zh', 'ko', 'en'],
+        default='other'
+    )
+    return pd.Series(lang, index=series.index, dtype=object)
+
+
+def language_counts(df: pd.DataFrame, text_column: str = 'body') -> Dict[str, int]:
+    """
+    每种语言的文章数，优先复用数据框上已有的 detected_lang 列
+    
+    下游评分可据此按语言分批（同一语言的文本长度分布、分词结果更接近）
+    
+    Args:
+        df: 数据框
+        text_column: 没有 detected_lang 列时用于检测的文本列
+        
+    Returns:
+        {语言代码: 文章数}，按数量降序
+    """
+    if 'detected_lang' in df.columns:
+        languages = df['detected_lang']
+    elif text_column in df.columns:
+        languages = detect_language_series(df[text_column])
+    else:
+        return {}
+    return {str(k): int(v) for k, v in languages.value_counts().items()}
+
+
 def remove_duplicates(df: pd.DataFrame, subset: List[str] = None) -> pd.DataFrame:
     """
     去除重复记录
@@ -220,26 +393,22 @@ def validate_data_quality(df: pd.DataFrame) -> Dict[str, Any]:
     if 'date' in df.columns:
         report['invalid_dates'] = df['date'].isna().sum()
     
-    # 语言分布
-    if 'body' in df.columns:
-        languages = df['body'].apply(detect_language)
-        report['language_distribution'] = languages.value_counts().to_dict()
+    # 语言分布（复用清洗阶段缓存的 detected_lang 列）
+    report['language_distribution'] = language_counts(df)
     
     return report
 
 
-def clean_news_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+def transform_news_chunk(df: pd.DataFrame) -> pd.DataFrame:
     """
-    清洗新闻数据框
+    逐行独立的清洗步骤（文本清洗、日期统一、语言检测），可按块并行执行
     
     Args:
-        df: 原始数据框
+        df: 原始数据框（或其中一块）
         
     Returns:
-        清洗后的数据框
+        清洗后的数据框（尚未去重和过滤）
     """
-    logging.info(f"开始清洗数据，原始记录数: {len(df)}")
-    
     # 创建数据副本
     df_clean = df.copy()
     
@@ -247,21 +416,29 @@ def clean_news_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     text_columns = ['title', 'body']
     for col in text_columns:
         if col in df_clean.columns:
-            df_clean[col] = df_clean[col].apply(clean_text_content)
-            logging.info(f"清洗了 {col} 列")
+            df_clean[col] = clean_text_series(df_clean[col])
     
     # 2. 统一日期格式
     if 'date' in df_clean.columns and 'time' in df_clean.columns:
-        df_clean['datetime_clean'] = df_clean.apply(
-            lambda row: normalize_datetime(row['date'], row['time']), axis=1
-        )
-        logging.info("统一了日期时间格式")
+        df_clean['datetime_clean'] = normalize_datetime_series(df_clean['date'], df_clean['time'])
     
     # 3. 添加语言检测
     if 'body' in df_clean.columns:
-        df_clean['detected_lang'] = df_clean['body'].apply(detect_language)
-        logging.info("添加了语言检测")
+        df_clean['detected_lang'] = detect_language_series(df_clean['body'])
     
+    return df_clean
+
+
+def finalize_news_dataframe(df_clean: pd.DataFrame) -> pd.DataFrame:
+    """
+    需要看到全量数据的步骤：去重、过滤空内容、质量检查
+    
+    Args:
+        df_clean: transform_news_chunk 的输出（多块时按输入顺序拼接）
+        
+    Returns:
+        最终的清洗结果
+    """
     # 4. 去除重复记录
     df_clean = remove_duplicates(df_clean)
     
@@ -282,33 +459,205 @@ def clean_news_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     return df_clean
 
 
+def clean_news_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    清洗新闻数据框
+    
+    Args:
+        df: 原始数据框
+        
+    Returns:
+        清洗后的数据框
+    """
+    logging.info(f"开始清洗数据，原始记录数: {len(df)}")
+    df_clean = transform_news_chunk(df)
+    logging.info("清洗了文本列，统一了日期时间格式，添加了语言检测")
+    return finalize_news_dataframe(df_clean)
+
+
+def iter_raw_chunks(input_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    分块读取原始新闻文件（CSV / JSONL），索引在块之间连续，与整体读取一致
+    
+    Args:
+        input_file: 输入文件路径
+        chunk_size: 每块行数
+    """
+    if input_file.endswith('.csv'):
+        reader = pd.read_csv(input_file, chunksize=chunk_size)
+    elif input_file.endswith('.jsonl'):
+        reader = pd.read_json(input_file, lines=True, chunksize=chunk_size)
+    else:
+        raise ValueError(f"不支持的文件格式: {input_file}")
+    with reader:
+        for chunk in reader:
+            yield chunk
+
+
+def clean_news_parallel(
+    chunks: Iterable[pd.DataFrame],
+    workers: int = DEFAULT_WORKERS
+) -> pd.DataFrame:
+    """
+    多进程分块清洗：各块在进程池中执行 transform_news_chunk，按输入顺序拼接后全局去重
+    
+    输出与对整个文件调用 clean_news_dataframe 一致。同时在途的块数限制为 2 * workers，
+    读取不会远远领先于清洗。
+    
+    Args:
+        chunks: 原始数据块迭代器（如 iter_raw_chunks 的输出）
+        workers: 进程数
+        
+    Returns:
+        清洗后的数据框
+    """
+    parts: List[pd.DataFrame] = []
+    pending: deque = deque()
+    total = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            total += len(chunk)
+            pending.append(pool.submit(transform_news_chunk, chunk))
+            while len(pending) >= 2 * workers:
+                parts.append(pending.popleft().result())
+        while pending:
+            parts.append(pending.popleft().result())
+    
+    logging.info(f"并行清洗了 {total} 条记录（{len(parts)} 块，{workers} 个进程）")
+    if not parts:
+        return pd.DataFrame()
+    return finalize_news_dataframe(pd.concat(parts))
+
+
+def _read_cleaned_output(path: Path, file_type: str) -> pd.DataFrame:
+    """按原样读回已有的清洗输出（文本不做类型推断，保证重写时内容不变）"""
+    if file_type == "csv":
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+    return pd.read_json(path, lines=True, dtype=False)
+
+
+def _merge_incremental(df_new: pd.DataFrame, path: Path, file_type: str, replaced_uris: set) -> int:
+    """
+    把本次清洗结果合并进已有输出
+    
+    - 去重键 (uri, url, title) 含 uri，与历史输出的重复已由清单排除
+    - 有正文变化的行时，重写输出：去掉旧版本后追加新版本；否则直接追加
+    
+    Returns:
+        写入的新行数
+    """
+    rewrite = bool(replaced_uris)
+    if path.exists() and not df_new.empty:
+        # 列集合不同（如本次启用了近重复检测）时无法直接追加
+        if file_type == "csv":
+            header = list(pd.read_csv(path, nrows=0).columns)
+            if set(header) == set(df_new.columns):
+                df_new = df_new[header]
+            else:
+                rewrite = True
+    
+    if rewrite and path.exists():
+        existing = _read_cleaned_output(path, file_type)
+        existing = existing[~existing['uri'].astype(str).isin(replaced_uris)]
+        merged = pd.concat([existing, df_new], ignore_index=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        if file_type == "csv":
+            merged.to_csv(tmp_path, index=False, encoding='utf-8')
+        else:
+            merged.to_json(tmp_path, orient='records', lines=True, force_ascii=False)
+        tmp_path.replace(path)
+        logging.info(f"替换了 {len(replaced_uris)} 条正文变化的记录，重写 {path}")
+    elif file_type == "csv":
+        df_new.to_csv(path, mode='a', header=not path.exists(), index=False, encoding='utf-8')
+    else:
+        with open(path, 'a', encoding='utf-8') as f:
+            if not df_new.empty:
+                f.write(df_new.to_json(orient='records', lines=True, force_ascii=False).rstrip('\n') + '\n')
+    logging.info(f"增量写入 {len(df_new)} 条记录到: {path}")
+    return len(df_new)
+
+
 def clean_and_save_news(
     input_file: str,
     output_file: str = None,
     output_dir: str = "data/processed",
-    file_type: str = "csv"
+    file_type: str = "csv",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    symbols: Optional[List[str]] = None,
+    near_dup_db: Optional[str] = None,
+    workers: int = DEFAULT_WORKERS,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    incremental: bool = False,
+    manifest_path: Optional[str] = None
 ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     """
     清洗新闻数据并保存
     
     Args:
-        input_file: 输入文件路径
+        input_file: 输入文件路径（CSV / JSONL 文件，或按月份/股票分区的 Parquet 目录）
         output_file: 输出文件名（可选）
         output_dir: 输出目录
-        file_type: 输出文件类型 ("csv" 或 "json")
+        file_type: 输出文件类型 ("csv", "json" 或 "parquet")
+        start_date: 起始日期 YYYY-MM-DD（仅 Parquet 输入，下推过滤）
+        end_date: 结束日期 YYYY-MM-DD（仅 Parquet 输入，下推过滤）
+        symbols: 股票代码列表（仅 Parquet 输入，下推过滤）
+        near_dup_db: 近重复索引路径（可选，跨运行持久化；添加 canonical_uri 列）
+        workers: 清洗进程数（> 1 时 CSV / JSONL 输入分块并行清洗）
+        chunk_size: 并行模式下每块行数
+        incremental: 增量模式：只清洗清单中没有或正文已变化的原始行，结果合并进已有输出
+        manifest_path: 增量清单路径（默认 <输出文件>.manifest.sqlite）
         
     Returns:
-        (清洗后的数据框, 质量报告)
+        (清洗后的数据框（增量模式下仅为本次新清洗的行）, 质量报告)
     """
+    if incremental and file_type not in ("csv", "json"):
+        raise ValueError("增量模式仅支持 csv / json 输出")
+    
     # 检查输入文件
     if not Path(input_file).exists():
         raise FileNotFoundError(f"输入文件不存在: {input_file}")
     
     logging.info(f"读取输入文件: {input_file}")
     
+    # 生成输出文件名
+    if output_file is None:
+        input_name = Path(input_file).stem
+        output_file = f"{input_name}_cleaned.{file_type}"
+    
+    # 确保输出目录存在
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    full_output_path = output_path / output_file
+    
+    # 增量模式：打开清单；只追加的原始文件从上次读到的位置继续读
+    manifest = None
+    offset = 0
+    read_until = None
+    if incremental:
+        manifest = CleanManifest(manifest_path or f"{full_output_path}.manifest.sqlite")
+        if not full_output_path.exists() and manifest.has_entries():
+            logging.warning(f"输出文件 {full_output_path} 不存在，清单作废，全量重新清洗")
+            manifest.reset()
+        if not Path(input_file).is_dir():
+            offset = manifest.resume_offset(input_file)
+    
     # 读取数据
+    df = None
     try:
-        if input_file.endswith('.csv'):
+        if incremental and not Path(input_file).is_dir() and input_file.endswith(('.csv', '.jsonl')):
+            df, read_until = read_appended(input_file, offset)
+            if offset:
+                logging.info(f"增量读取: 跳过已登记的前 {offset} 字节，读取新增 {len(df)} 行")
+        elif workers > 1 and not incremental and input_file.endswith(('.csv', '.jsonl')):
+            # 分块读取，边读边分发给清洗进程
+            chunks = iter_raw_chunks(input_file, chunk_size)
+        elif Path(input_file).is_dir():
+            df = read_partitioned(input_file, start=start_date, end=end_date, symbols=symbols)
+            # 与 CSV 输入保持一致：日期列为 YYYY-MM-DD 字符串
+            if 'date' in df.columns:
+                df['date'] = df['date'].astype(str)
+        elif input_file.endswith('.csv'):
             df = pd.read_csv(input_file)
         elif input_file.endswith('.jsonl'):
             df = pd.read_json(input_file, lines=True)
@@ -317,26 +666,42 @@ def clean_and_save_news(
     except Exception as e:
         raise ValueError(f"读取文件失败: {e}")
     
-    # 清洗数据
-    df_clean = clean_news_dataframe(df)
+    # 增量模式：只保留新增或正文变化的原始行
+    replaced_uris: set = set()
+    if incremental:
+        if 'uri' not in df.columns:
+            raise ValueError("增量模式需要 uri 列")
+        new_mask, changed_mask = manifest.diff(df)
+        replaced_uris = set(df.loc[changed_mask, 'uri'].astype(str))
+        logging.info(f"增量清洗: 原始 {len(df)} 行，新增 {int(new_mask.sum())} 行，"
+                     f"正文变化 {int(changed_mask.sum())} 行")
+        raw_delta = df[new_mask | changed_mask]
+        df = raw_delta
     
-    # 生成输出文件名
-    if output_file is None:
-        input_name = Path(input_file).stem
-        output_file = f"{input_name}_cleaned.{file_type}"
+    # 清洗数据
+    if df is None:
+        df_clean = clean_news_parallel(chunks, workers)
+    elif workers > 1:
+        df_clean = clean_news_parallel(
+            (df.iloc[i:i + chunk_size] for i in range(0, len(df), chunk_size)), workers)
+    else:
+        df_clean = clean_news_dataframe(df)
     
-    # 确保输出目录存在
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+    # 近重复聚类（转载稿共享 canonical_uri，评分与计数按簇进行）
+    if near_dup_db and 'uri' in df_clean.columns and 'body' in df_clean.columns:
+        df_clean = tag_near_duplicates(df_clean, near_dup_db)
     
     # 保存清洗后的数据
-    full_output_path = output_path / output_file
-    
     try:
-        if file_type == "csv":
+        if incremental:
+            _merge_incremental(df_clean, full_output_path, file_type, replaced_uris)
+        elif file_type == "csv":
             df_clean.to_csv(full_output_path, index=False, encoding='utf-8')
         elif file_type == "json":
             df_clean.to_json(full_output_path, orient='records', lines=True, force_ascii=False)
+        elif file_type == "parquet":
+            # 分区目录：按月份/股票追加写入
+            write_partitioned(df_clean, str(full_output_path))
         else:
             raise ValueError(f"不支持的输出格式: {file_type}")
         
@@ -345,6 +710,13 @@ def clean_and_save_news(
     except Exception as e:
         raise ValueError(f"保存文件失败: {e}")
     
+    # 输出写成功后才登记清单，中途失败的行下次会重新清洗
+    if manifest is not None:
+        manifest.record(raw_delta)
+        if read_until is not None:
+            manifest.record_source(input_file, read_until)
+        manifest.close()
+    
     # 生成质量报告
     quality_report = validate_data_quality(df_clean)
     
@@ -361,7 +733,15 @@ def main():
     parser.add_argument("--input", "-i", required=True, help="输入文件路径")
     parser.add_argument("--output", "-o", help="输出文件名")
     parser.add_argument("--output_dir", "-d", default="data/processed", help="输出目录")
-    parser.add_argument("--format", "-f", choices=["csv", "json"], default="csv", help="输出格式")
+    parser.add_argument("--format", "-f", choices=["csv", "json", "parquet"], default="csv", help="输出格式")
+    parser.add_argument("--start_date", help="起始日期 YYYY-MM-DD（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--end_date", help="结束日期 YYYY-MM-DD（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--symbols", nargs="*", help="股票代码（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--near_dup_db", help="近重复 LSH 索引路径（如 data/processed/near_dup.sqlite），启用后添加 canonical_uri 列")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS, help="清洗进程数（>1 时分块并行）")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE, help="并行模式下每块行数")
+    parser.add_argument("--incremental", action="store_true", help="增量模式：只清洗新增或正文变化的行并合并进已有输出")
+    parser.add_argument("--manifest", help="增量清单路径（默认 <输出文件>.manifest.sqlite）")
     parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
     
     args = parser.parse_args()
@@ -380,7 +760,15 @@ def main():
             input_file=args.input,
             output_file=args.output,
             output_dir=args.output_dir,
-            file_type=args.format
+            file_type=args.format,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            symbols=args.symbols,
+            near_dup_db=args.near_dup_db,
+            workers=max(1, args.workers),
+            chunk_size=max(1, args.chunk_size),
+            incremental=args.incremental,
+            manifest_path=args.manifest
         )
         
         print(f"\n✅ 数据清洗完成!")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+clean_manifest.py
+---------------------------------
+Manifest of raw rows already cleaned, for incremental clean_data.py runs.
+
+Each raw row is keyed by `uri` and fingerprinted by a 64-bit hash of
+(uri, body). A daily run compares the raw file against the manifest and only
+cleans rows that are new or whose body changed since the last run.
+
+- one SQLite table, `uri` as primary key, hash stored as a signed 64-bit int
+- hashes come from pandas.util.hash_pandas_object (vectorized); a pandas
+  upgrade that changes the hash function costs one full re-clean, nothing else
+- lookups fetch only the incoming uris, in chunks (like seen_store.py)
+- raw CSV/JSONL files that data_pipe.py only appends to are read from the byte
+  offset recorded by the previous run; the file is re-read in full only when
+  the recorded prefix no longer matches (checked by the hash of its last 64 KB);
+  CSV offsets only advance to the end of the last complete record as parsed by
+  the csv module, so a quoted multi-line body cut mid-append is read next run
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+from typing import Dict, Iterable, Tuple
+
+import pandas as pd
+
+_INSERT_CHUNK = 10_000
+# SQLite caps bound parameters per statement (999 on older builds)
+_LOOKUP_CHUNK = 900
+_TAIL_BYTES = 64 * 1024
+
+
+def content_hashes(df: pd.DataFrame, key_col: str = "uri", body_col: str = "body") -> pd.Series:
+    """Signed 64-bit hash of (key, body) per row, aligned with df.index."""
+    frame = pd.DataFrame({
+        key_col: df[key_col].astype(object).astype(str),
+        body_col: df[body_col].astype(object).fillna("").astype(str) if body_col in df.columns else "",
+    }, index=df.index)
+    return pd.Series(pd.util.hash_pandas_object(frame, index=False).values.view("int64"), index=df.index)
+
+
+def _tail_sha1(path: str, end: int) -> str:
+    """sha1 of the last _TAIL_BYTES bytes before `end`."""
+    with open(path, "rb") as f:
+        f.seek(max(0, end - _TAIL_BYTES))
+        return hashlib.sha1(f.read(end - f.tell())).hexdigest()
+
+
+def _complete_csv_bytes(data: bytes) -> int:
+    """Length of the prefix of `data` holding complete CSV records (quoted fields may span lines)."""
+    consumed = 0
+
+    def _lines():
+        nonlocal consumed
+        for line in iter(io.BytesIO(data).readline, b""):
+            if not line.endswith(b"\n"):
+                # unterminated tail: never part of a complete record
+                return
+            consumed += len(line)
+            yield line.decode("utf-8", errors="replace")
+
+    complete = 0
+    reader = csv.reader(_lines(), strict=True)
+    while True:
+        try:
+            next(reader)
+        except (StopIteration, csv.Error):
+            # csv.Error: the data ends inside a quoted field
+            return complete
+        complete = consumed
+
+
+def read_appended(path: str, offset: int = 0) -> Tuple[pd.DataFrame, int]:
+    """
+    Read the complete CSV/JSONL records of `path` after byte `offset`.
+
+    Returns (rows, end offset). A trailing partial record (a writer mid-append,
+    possibly inside a quoted multi-line CSV field) is left for the next run.
+    """
+    with open(path, "rb") as f:
+        first = f.readline()
+        f.seek(offset)
+        data = f.read()
+    if path.endswith(".csv"):
+        data = data[:_complete_csv_bytes(data)]
+    else:
+        data = data[:data.rfind(b"\n") + 1]
+    end = offset + len(data)
+    if path.endswith(".csv"):
+        # later chunks carry no header line of their own
+        return pd.read_csv(io.BytesIO(first + data if offset else data)), end
+    if not data.strip():
+        return pd.read_json(io.BytesIO(first), lines=True).iloc[:0], end
+    return pd.read_json(io.BytesIO(data), lines=True), end
+
+
+class CleanManifest:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cleaned (uri TEXT PRIMARY KEY, body_hash INTEGER) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER, tail_sha1 TEXT)")
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM cleaned").fetchone()[0]
+
+    def has_entries(self) -> bool:
+        return self.conn.execute("SELECT 1 FROM cleaned LIMIT 1").fetchone() is not None
+
+    def reset(self) -> None:
+        """Forget every recorded row and source offset (forces a full re-clean)."""
+        self.conn.execute("DELETE FROM cleaned")
+        self.conn.execute("DELETE FROM sources")
+        self.conn.commit()
+
+    def lookup(self, uris: Iterable[str]) -> Dict[str, int]:
+        """Return {uri: body_hash} for the recorded subset of `uris`."""
+        uris = list(dict.fromkeys(uris))
+        found: Dict[str, int] = {}
+        for i in range(0, len(uris), _LOOKUP_CHUNK):
+            chunk = uris[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(f"SELECT uri, body_hash FROM cleaned WHERE uri IN ({marks})", chunk))
+        return found
+
+    def resume_offset(self, path: str) -> int:
+        """Byte offset already recorded for `path` if the file has only grown since; 0 otherwise."""
+        row = self.conn.execute("SELECT size, tail_sha1 FROM sources WHERE path = ?",
+                                (os.path.abspath(path),)).fetchone()
+        if row is None:
+            return 0
+        size, digest = row
+        if os.path.getsize(path) < size or _tail_sha1(path, size) != digest:
+            logging.info("Raw file %s was rewritten since the last run; reading it in full", path)
+            return 0
+        return size
+
+    def record_source(self, path: str, size: int) -> None:
+        """Remember that `path` has been processed up to byte `size`."""
+        self.conn.execute("INSERT OR REPLACE INTO sources (path, size, tail_sha1) VALUES (?, ?, ?)",
+                          (os.path.abspath(path), size, _tail_sha1(path, size)))
+        self.conn.commit()
+
+    def diff(self, raw: pd.DataFrame, key_col: str = "uri", body_col: str = "body") -> Tuple[pd.Series, pd.Series]:
+        """
+        Compare raw rows with the manifest.
+
+        Returns (new_mask, changed_mask) aligned with raw.index: rows whose uri
+        was never cleaned, and rows whose uri was cleaned with a different body.
+        """
+        keys = raw[key_col].astype(object).astype(str)
+        known = self.lookup(keys)
+        # object dtype: int64 hashes must not round-trip through float64 next to missing values
+        known_hash = pd.Series([known.get(k) for k in keys], index=raw.index, dtype=object)
+        new_mask = known_hash.isna()
+        changed_mask = pd.Series(False, index=raw.index)
+        if not new_mask.all():
+            # only rows cleaned before need a fingerprint to detect body changes
+            seen = ~new_mask
+            changed_mask[seen] = known_hash[seen].astype("int64") != content_hashes(raw[seen], key_col, body_col)
+        return new_mask, changed_mask
+
+    def record(self, raw: pd.DataFrame, key_col: str = "uri", body_col: str = "body") -> int:
+        """Store the current fingerprints of `raw` rows; returns rows written."""
+        hashes = content_hashes(raw, key_col, body_col)
+        rows = list(zip(raw[key_col].astype(object).astype(str), (int(h) for h in hashes)))
+        for i in range(0, len(rows), _INSERT_CHUNK):
+            self.conn.executemany("INSERT OR REPLACE INTO cleaned (uri, body_hash) VALUES (?, ?)",
+                                  rows[i:i + _INSERT_CHUNK])
+        self.conn.commit()
+        logging.info("Recorded %d rows in clean manifest %s", len(rows), self.db_path)
+        return len(rows)
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+cli.py
+---------------------------------
+统一命令行入口：python src/cli.py <子命令> [参数...]
+
+子命令按名字延迟导入对应模块再调用其 main()，本文件只依赖标准库：
+`cli.py --help`、`cli.py run-real x.csv --validate-only`、词典路径等轻量命令不会为
+torch / transformers / matplotlib / eventregistry 付出数秒启动时间。
+这些重依赖在各模块中也只在真正需要的代码路径里导入。
+
+importtime 子命令用 `python -X importtime` 测量每个子命令加载时的导入耗时，并与
+COMMANDS 中的预算比较。耗时随机器负载波动，tests/test_cli_imports.py 只断言
+没有导入 HEAVY_MODULES 中的重依赖。
+
+用法:
+    python src/cli.py --help
+    python src/cli.py sentiment --input data/processed/articles_recent_cleaned.csv --cascade
+    python src/cli.py run-real data/sample_news.csv --validate-only
+    python src/cli.py importtime
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SRC_DIR)
+
+# 任何子命令加载时都不应导入的重依赖（只能在使用它们的函数内导入）
+# pyarrow 不在其列：pandas 3 安装了 pyarrow 时会在 import pandas 时自动导入
+HEAVY_MODULES = ('torch', 'transformers', 'onnxruntime', 'matplotlib', 'scipy', 'eventregistry')
+
+
+class Command(NamedTuple):
+    module: str          # src 下的模块名，或 scripts/ 下的脚本路径
+    help: str
+    budget_ms: int       # 加载模块的导入耗时预算（python -X importtime 累计值）
+    has_parser: bool = True  # main() 自己解析参数；否则 --help 由本入口处理
+
+
+# 预算约为参考机器实测值的 3 倍：pandas 约 500ms，只用标准库的命令约 50-120ms
+COMMANDS: Dict[str, Command] = {
+    'fetch': Command('data_pipe', "从 Event Registry 抓取新闻", 1500),
+    'clean': Command('clean_data', "清洗原始新闻", 1500),
+    'profile': Command('data_profile', "流式数据质量画像", 1500),
+    'sentiment': Command('sentiment_top', "Transformer 情感评分（可选词典级联 / 多进程 / ONNX）", 1500),
+    'boilerplate': Command('boilerplate', "样板句去除的 token 减少与评分加速报告 / 高频句列表", 1500),
+    'cascade': Command('sentiment_cascade', "词典级联与全 Transformer 基线的比较报告", 1500),
+    'distill': Command('sentiment_student', "蒸馏学生模型训练 / 与教师的保真度和吞吐报告", 1500),
+    'rescore': Command('score_mappings', "用新的分数映射重算情感分数", 1500),
+    'onnx': Command('onnx_backend', "导出 ONNX 模型 / 后端一致性报告", 1500),
+    'tune': Command('sentiment_profile', "批大小 / 线程数 / 截断长度自动调优，写入本机 profile", 300),
+    'serve': Command('sentiment_server', "常驻情感评分服务（微批合并，HTTP / Unix socket）", 400),
+    'stream': Command('stream_pipeline', "流式抓取 → 清洗 → 评分", 1500),
+    'factors': Command('generate_factors', "生成日度情感因子并评估", 1500),
+    'analyze': Command('analyze_factors', "因子表现详细分析", 1500),
+    'validate': Command('validate_factor', "快速验证情感因子", 1500, has_parser=False),
+    'pipeline': Command('pipeline', "词典 / 预评分 → IC、分层净值与风格相关性报表", 1500, has_parser=False),
+    'run-real': Command('scripts/run_real.py', "用自备新闻 CSV 构建因子（--validate-only 只校验）", 300),
+}
+
+
+def load_command(name: str) -> Any:
+    """导入子命令对应的模块（scripts/ 下的脚本按路径加载）"""
+    module = COMMANDS[name].module
+    if module.endswith('.py'):
+        path = os.path.join(ROOT_DIR, module)
+        spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(path))[0], path)
+        mod = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(mod)
+        return mod
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    return importlib.import_module(module)
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Set[str]]:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        (顶层导入累计耗时 ms, 导入过的模块名集合)
+    """
+    total_us = 0
+    modules: Set[str] = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        # 嵌套导入的名字多缩进两格，已计入上层的累计值
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def measure_import_time(name: str) -> Dict[str, Any]:
+    """在新的解释器中加载子命令模块，返回导入耗时、预算和被导入的重依赖"""
+    code = f"import sys; sys.path.insert(0, {SRC_DIR!r}); import cli; cli.load_command({name!r})"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, cwd=ROOT_DIR)
+    total_ms, modules = parse_importtime(proc.stderr)
+    heavy = sorted(m for m in modules if m.split('.')[0] in HEAVY_MODULES)
+    budget = COMMANDS[name].budget_ms
+    return {
+        'command': name,
+        'ok': proc.returncode == 0,
+        'import_ms': round(total_ms, 1),
+        'budget_ms': budget,
+        'heavy_imports': heavy,
+        'within_budget': proc.returncode == 0 and total_ms <= budget and not heavy,
+        'error': proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+    }
+
+
+def _print_usage() -> None:
+    print("用法: python src/cli.py <子命令> [参数...]\n")
+    print("子命令:")
+    for name, cmd in COMMANDS.items():
+        print(f"  {name:<11} {cmd.help}")
+    print(f"  {'importtime':<11} 测量各子命令的导入耗时并与预算比较（--json 输出 JSON）")
+    print("\n各子命令的参数: python src/cli.py <子命令> --help")
+
+
+def _run_importtime(args: List[str]) -> int:
+    names = [a for a in args if a in COMMANDS] or list(COMMANDS)
+    results = [measure_import_time(name) for name in names]
+    if '--json' in args:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            mark = "✅" if r['within_budget'] else "❌"
+            extra = f" 重依赖: {', '.join(r['heavy_imports'])}" if r['heavy_imports'] else ""
+            extra += f" 错误: {r['error']}" if r['error'] else ""
+            print(f"{mark} {r['command']:<11} {r['import_ms']:>8.1f} ms / 预算 {r['budget_ms']} ms{extra}")
+    return 0 if all(r['within_budget'] for r in results) else 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    命令行入口函数
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        _print_usage()
+        return 0
+    name, rest = argv[0], argv[1:]
+    if name == 'importtime':
+        return _run_importtime(rest)
+    if name not in COMMANDS:
+        print(f"未知子命令: {name}\n", file=sys.stderr)
+        _print_usage()
+        return 2
+
+    command = COMMANDS[name]
+    if not command.has_parser and any(a in ('-h', '--help') for a in rest):
+        print(f"用法: python src/cli.py {name}\n\n{command.help}（无参数）")
+        return 0
+    # 子命令模块的 argparse 读取 sys.argv
+    sys.argv = [f"cli.py {name}"] + rest
+    result = load_command(name).main()
+    return result if isinstance(result, int) else 0
+
+
+if __name__ == "__main__":
+    exit(main())
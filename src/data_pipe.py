@@ -7,9 +7,10 @@ Event Registry (NewsAPI.ai) ingestion pipeline with:
 - stock/keyword loop
 - recent (last 30 days) + historical by year
 - pagination with token-aware budgeting
+- concurrent page fetching behind a shared token-bucket rate limiter
 - de-duplication (by article 'uri' and URL hash)
 - checkpoint/resume
-- clean JSONL and CSV outputs
+- clean JSONL and CSV outputs, plus an optional Parquet store (--parquet_dir)
 
 Usage
 -----
@@ -22,6 +23,7 @@ Usage
 3) Run (examples):
    python data_pipe.py --symbols 0700.HK 9988.HK --years 2024 2023 --recent_pages 2 --archive_pages 2
    python data_pipe.py --keywords "Tencent OR 0700.HK" --years 2022 2021 --archive_pages 3
+   python data_pipe.py --universe_file data/universe/hstech_current_constituents.csv --years 2024 2023 --archive_pages 3 --workers 8 --rate 5 --burst 5
 
 Notes
 -----
@@ -29,7 +31,20 @@ Notes
   * Recent (last 30 days) Article search: 1 token / page (<=100 articles)
   * Archive (since 2014) Article search: 5 tokens / year / page (<=100 articles)
 - Each page fetch is a separate "search" operation.
-- This script keeps a checkpoint and a seen set to avoid re-pulling duplicates.
+- Archive runs record every finished (query, year, page) unit in a SQLite
+  table (progress_store.py; checkpoint.json keeps counters only); a rerun
+  skips straight to unfinished units. `--shard K/N` splits the plan
+  across N processes (own checkpoint/output files, shared seen index).
+- `--batch_targets N` packs N tickers into one OR query (query_planner.py);
+  articles are routed back to tickers by title/body/concept matches.
+- Result pages are cached on disk (er_cache.py). Closed archive years are never
+  re-bought; `--cache replay` rebuilds outputs offline without an API key.
+- This script keeps a checkpoint and a SQLite seen-URI index (seen_store.py)
+  to avoid re-pulling duplicates; an old seen_uris.jsonl is imported once.
+- Work is split into (target, window, page) units. Page 1 of every window is
+  fetched first; it reports the total page count, so later pages are only
+  requested when they exist. All units share one token bucket (--rate/--burst),
+  and only the coordinating thread touches the seen index, outputs and checkpoint.
 
 Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
 """
@@ -41,9 +56,11 @@ import json
 import logging
 import os
 import sys
+import threading
 import time
 import random
-from dataclasses import dataclass, asdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, asdict, field
 from logging.handlers import RotatingFileHandler
 
 def with_retries(fn, *, max_retries=3, base=1.5):
@@ -58,11 +75,20 @@ def with_retries(fn, *, max_retries=3, base=1.5):
             time.sleep(sleep)
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Dict, Any, Optional
+from typing import TYPE_CHECKING, Callable, Iterable, List, Dict, Any, Optional, Tuple
 
 import pandas as pd
 from dateutil import tz
 
+from article_store import ParquetSink
+from er_cache import CACHE_MODES, ResponseCache, normalize_query
+from progress_store import ProgressStore
+from query_planner import DEFAULT_MAX_TERMS, QueryBatch, plan_batches, route_article, ticker_terms
+from seen_store import SeenStore
+
+if TYPE_CHECKING:  # annotations only; the client is imported lazily by _eventregistry()
+    import eventregistry
+
 def log_run_metrics(out_dir, *, mode, symbols, years, recent_pages, archive_pages,
                     items_written_recent, items_written_archive,
                     tokens_recent_est, tokens_archive_est, extra=None):
@@ -87,19 +113,26 @@ def log_run_metrics(out_dir, *, mode, symbols, years, recent_pages, archive_page
         if new: w.writeheader()
         w.writerow(row)
 
-try:
-    from eventregistry import EventRegistry, QueryArticlesIter, RequestArticlesInfo
-    from dotenv import load_dotenv
-    load_dotenv()  # 加载 .env 文件
-except Exception as e:
-    print("Failed to import 'eventregistry'. Install it first: pip install eventregistry", file=sys.stderr)
-    raise
+from dotenv import load_dotenv
+load_dotenv()  # 加载 .env 文件
+
+def _eventregistry():
+    """Import the API client on first use; --help and `--cache replay` runs never load it."""
+    try:
+        import eventregistry
+    except ImportError:
+        print("Failed to import 'eventregistry'. Install it first: pip install eventregistry", file=sys.stderr)
+        raise
+    return eventregistry
 
 # ----------------------- Configuration -----------------------
 
 DEFAULT_OUTDIR = "news_out"
 CHECKPOINT_FILE = "checkpoint.json"
-SEEN_FILE = "seen_uris.jsonl"
+PROGRESS_DB = "archive_progress.sqlite"
+SEEN_FILE = "seen_uris.jsonl"   # legacy format, migrated into SEEN_DB on first run
+SEEN_DB = "seen_uris.sqlite"
+CACHE_DIR = "http_cache"
 
 # ----------------------- Utilities -----------------------
 
@@ -160,17 +193,54 @@ def estimate_tokens_archive(pages:int, years:int) -> int:
     # 5 tokens per year per page
     return max(0, 5 * int(years) * int(pages))
 
+# ----------------------- Rate Limiter -----------------------
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every fetch worker.
+
+    Refills at `rate` tokens/sec up to `burst`; each API page costs one token.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_sec = (1 - self._tokens) / self.rate
+            time.sleep(wait_sec)
+
 # ----------------------- Fetchers -----------------------
 
-def build_req(return_body: bool = True, return_concepts: bool = True) -> RequestArticlesInfo:
-    from eventregistry import ReturnInfo
-    returnInfo = ReturnInfo()
+def build_req(return_body: bool = True, return_concepts: bool = True, page: int = 1,
+              count: int = 100) -> "eventregistry.RequestArticlesInfo":
+    er_api = _eventregistry()
+    returnInfo = er_api.ReturnInfo()
     returnInfo.articleInfo.body = return_body
     returnInfo.articleInfo.concepts = return_concepts
-    return RequestArticlesInfo(returnInfo=returnInfo)
+    return er_api.RequestArticlesInfo(page=page, count=count, returnInfo=returnInfo)
+
+def expand_keywords(keywords: str) -> str:
+    # Heuristic: if looks like HK ticker (e.g., 00700.HK), expand to company name OR code
+    # to improve recall in ER. Users can also pass names directly via --keywords.
+    if isinstance(keywords, str) and keywords.endswith('.HK'):
+        return " OR ".join(ticker_terms(keywords))
+    return keywords
 
 def pull_articles_iter(
-    er: EventRegistry,
+    er: "eventregistry.EventRegistry",
     keywords: str,
     lang: Optional[str] = None,
     date_start: Optional[str] = None,
@@ -178,15 +248,9 @@ def pull_articles_iter(
     is_duplicate_filter: str = "skipDuplicates",
     max_items: int = 100,
 ) -> Iterable[Dict[str, Any]]:
-    # Heuristic: if looks like HK ticker (e.g., 00700.HK), expand to company name OR code
-    # to improve recall in ER. Users can also pass names directly via --keywords.
-    q = keywords
-    if isinstance(q, str) and q.endswith('.HK'):
-        core = q.replace('.HK', '')
-        # broaden search: code OR HK code OR generic mention of HK code without dot
-        q = f"{core} OR {q} OR \"{core} HK\" OR \"HK{core}\""
+    q = expand_keywords(keywords)
 
-    it = QueryArticlesIter(
+    it = _eventregistry().QueryArticlesIter(
         keywords=q,
         lang=lang,
         isDuplicateFilter=is_duplicate_filter,
@@ -201,6 +265,36 @@ def pull_articles_iter(
             art.setdefault('target', keywords)
         yield art
 
+def pull_articles_page(
+    er: "eventregistry.EventRegistry",
+    keywords: str,
+    page: int = 1,
+    lang: Optional[str] = None,
+    date_start: Optional[str] = None,
+    date_end: Optional[str] = None,
+    is_duplicate_filter: str = "skipDuplicates",
+    count: int = 100,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Fetch a single result page; returns (articles, total pages for the query)."""
+    q = _eventregistry().QueryArticles(
+        keywords=expand_keywords(keywords),
+        lang=lang,
+        isDuplicateFilter=is_duplicate_filter,
+        dataType=["news"],
+        dateStart=date_start,
+        dateEnd=date_end,
+    )
+    q.setRequestedResult(build_req(return_body=True, return_concepts=True, page=page, count=count))
+    res = er.execQuery(q) or {}
+    if "error" in res:
+        raise RuntimeError(f"EventRegistry error: {res['error']}")
+    block = res.get("articles") or {}
+    arts = [a for a in (block.get("results") or []) if isinstance(a, dict)]
+    for art in arts:
+        # attach target back for downstream diagnostics
+        art.setdefault('target', keywords)
+    return arts, int(block.get("pages") or 0)
+
 @dataclass
 class PipeConfig:
     keywords: Optional[str]
@@ -210,69 +304,93 @@ class PipeConfig:
     archive_pages: int
     lang: Optional[str]
     outdir: str
-    sleep_sec: float = 0.4
+    workers: int = 1            # concurrent page fetches
+    rate_per_sec: float = 2.5   # shared token bucket refill rate (requests/sec)
+    burst: int = 1              # token bucket capacity
+    max_retries: int = 3
+    cache_mode: str = "use"     # off / use / refresh / replay (see er_cache.py)
+    cache_ttl_min: float = 60.0 # expiry for open (recent) windows; closed years never expire
+    batch_targets: int = 1      # tickers packed into one query (1 = no batching)
+    max_query_terms: int = DEFAULT_MAX_TERMS
+    aliases: Dict[str, List[str]] = field(default_factory=dict)  # extra routing names per ticker
+    parquet_dir: Optional[str] = None  # optional month/symbol partitioned Parquet sink
+    shard_index: int = 0        # this process handles windows with sha1(window) % shard_count == shard_index
+    shard_count: int = 1
 
 @dataclass
 class PipeState:
     run_started_at: str
     last_written_recent: int = 0
     last_written_archive: int = 0
+    # finished archive work units and per-window page counts live in ProgressStore
+
+def window_key(keywords: str, date_start: Optional[str], date_end: Optional[str]) -> str:
+    return f"{keywords}|{date_start or ''}|{date_end or ''}"
+
+def unit_key(wkey: str, page: int) -> str:
+    return f"{wkey}|{page}"
+
+def in_shard(wkey: str, shard_index: int, shard_count: int) -> bool:
+    # stable across processes/runs (unlike hash())
+    return shard_count <= 1 or int(sha1(wkey), 16) % shard_count == shard_index
 
 # ----------------------- Pipeline -----------------------
 
 class NewsPipeline:
-    def __init__(self, api_key: str, cfg: PipeConfig):
-        self.er = EventRegistry(apiKey=api_key)
+    def __init__(self, api_key: Optional[str], cfg: PipeConfig):
+        # replay mode is served from the response cache alone and needs no client
+        self.er = _eventregistry().EventRegistry(apiKey=api_key) if cfg.cache_mode != "replay" else None
         self.cfg = cfg
         ensure_dir(cfg.outdir)
-        self.ckpt_path = os.path.join(cfg.outdir, CHECKPOINT_FILE)
-        self.seen_path = os.path.join(cfg.outdir, SEEN_FILE)
-        self.recent_jsonl = os.path.join(cfg.outdir, "articles_recent.jsonl")
-        self.archive_jsonl = os.path.join(cfg.outdir, "articles_archive.jsonl")
-        self.recent_csv = os.path.join(cfg.outdir, "articles_recent.csv")
-        self.archive_csv = os.path.join(cfg.outdir, "articles_archive.csv")
-
+        # sharded processes keep their own checkpoint and output files; the seen index
+        # (SQLite, WAL) and the Parquet store (unique file names) are safe to share
+        sfx = f".shard{cfg.shard_index}of{cfg.shard_count}" if cfg.shard_count > 1 else ""
+        self.ckpt_path = os.path.join(cfg.outdir, CHECKPOINT_FILE.replace(".json", f"{sfx}.json"))
+        self.progress_path = os.path.join(cfg.outdir, PROGRESS_DB.replace(".sqlite", f"{sfx}.sqlite"))
+        self.seen_path = os.path.join(cfg.outdir, SEEN_DB)
+        self.recent_jsonl = os.path.join(cfg.outdir, f"articles_recent{sfx}.jsonl")
+        self.archive_jsonl = os.path.join(cfg.outdir, f"articles_archive{sfx}.jsonl")
+        self.recent_csv = os.path.join(cfg.outdir, f"articles_recent{sfx}.csv")
+        self.archive_csv = os.path.join(cfg.outdir, f"articles_archive{sfx}.csv")
+
+        self.progress = ProgressStore(self.progress_path)
         self.state = self._load_state()
-        self.seen_uris = self._load_seen()
+        # legacy seen_uris.jsonl is imported once, then only the SQLite index is used
+        self.seen = SeenStore(self.seen_path, legacy_jsonl=os.path.join(cfg.outdir, SEEN_FILE))
+        self.limiter = TokenBucket(cfg.rate_per_sec, cfg.burst)
+        self.sink = ParquetSink(cfg.parquet_dir) if cfg.parquet_dir else None
+        # optional hook receiving each page's new CSV-shaped rows (see stream_pipeline.py)
+        self.on_commit: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+        self.cache = ResponseCache(os.path.join(cfg.outdir, CACHE_DIR), mode=cfg.cache_mode,
+                                   recent_ttl_min=cfg.cache_ttl_min)
 
     # ---------- state ----------
     def _load_state(self) -> PipeState:
         if os.path.exists(self.ckpt_path):
             with open(self.ckpt_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
+            # checkpoints written before ProgressStore carried the unit lists inline; the import is
+            # idempotent and the next _save_state drops them from the JSON
+            legacy_units = data.pop("done_units", None)
+            legacy_pages = data.pop("window_pages", None)
+            if legacy_units or legacy_pages:
+                self.progress.migrate(legacy_units or [], legacy_pages or {})
             return PipeState(**data)
         return PipeState(run_started_at=now_iso())
 
     def _save_state(self) -> None:
-        with open(self.ckpt_path, "w", encoding="utf-8") as f:
+        # write-then-rename so a crash never leaves a truncated checkpoint
+        tmp = self.ckpt_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
             json.dump(asdict(self.state), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.ckpt_path)
 
-    # ---------- seen set ----------
-    def _load_seen(self) -> set:
-        seen = set()
-        if os.path.exists(self.seen_path):
-            with open(self.seen_path, "r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        obj = json.loads(line)
-                        uri = obj.get("uri")
-                        if uri:
-                            seen.add(uri)
-                    except:
-                        pass
-        return seen
-
-    def _append_seen(self, articles: List[Dict[str, Any]]):
-        # append minimal objects (uri only) to seen file
-        with open(self.seen_path, "a", encoding="utf-8") as f:
-            for a in articles:
-                uri = a.get("uri")
-                if uri:
-                    f.write(json.dumps({"uri": uri}) + "\n")
+    def _mark_done(self, wkey: str, page: int, total_pages: int) -> None:
+        self.progress.mark_done(wkey, unit_key(wkey, page), total_pages if page == 1 else None)
 
     # ---------- core steps ----------
     def _filter_new(self, arts: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        fresh = []
+        page: Dict[str, Dict[str, Any]] = {}
         for a in arts:
             uri = a.get("uri")
             if not uri:
@@ -282,93 +400,181 @@ class NewsPipeline:
                     continue
                 uri = "urlsha1:" + sha1(url)
                 a["uri"] = uri
-
-            if uri in self.seen_uris:
-                continue
-            self.seen_uris.add(uri)
-            fresh.append(a)
-        return fresh
-
-    def _pull_pages(self, keywords: str, pages: int, date_start: Optional[str], date_end: Optional[str]) -> List[Dict[str, Any]]:
-        all_new = []
-        for p in range(pages):
-            logging.debug("Fetching page %d for %s ...", p + 1, keywords)
-            arts_page = list(pull_articles_iter(
+            page.setdefault(uri, a)
+
+        known = self.seen.contains_many(page.keys())
+        return [a for uri, a in page.items() if uri not in known]
+
+    def _fetch_unit(self, keywords: str, page: int, date_start: Optional[str],
+                    date_end: Optional[str]) -> Tuple[List[Dict[str, Any]], int]:
+        # runs on a worker thread: network + cache files only, no shared state besides the limiter
+        def attempt() -> Tuple[List[Dict[str, Any]], int]:
+            # every attempt, retries included, waits for a token so 429/5xx storms stay under --rate
+            self.limiter.acquire()
+            logging.debug("Fetching page %d for %s (%s..%s) ...", page, keywords, date_start, date_end)
+            return pull_articles_page(
                 er=self.er,
                 keywords=keywords,
+                page=page,
                 lang=self.cfg.lang,
                 date_start=date_start,
                 date_end=date_end,
                 is_duplicate_filter="skipDuplicates",
-                max_items=100,
-            ))
-            new_items = self._filter_new(arts_page)
-            logging.debug("Got %d items this page; total so far=%d", len(new_items), len(all_new))
-            if not new_items and not arts_page:
-                # nothing came back — likely no more pages matching
-                logging.debug("No more pages matching, stopping")
-                break
-
-            all_new.extend(new_items)
-            # persist seen incrementally
-            self._append_seen(new_items)
-
-            # polite pacing
-            time.sleep(self.cfg.sleep_sec)
-        return all_new
+                count=100,
+            )
 
-    # ---------- public runners ----------
-    def run_recent(self) -> int:
+        def call_api() -> Tuple[List[Dict[str, Any]], int]:
+            return with_retries(attempt, max_retries=self.cfg.max_retries)
+
+        query = normalize_query(expand_keywords(keywords), self.cfg.lang, date_start, date_end, page, count=100)
+        return self.cache.fetch(query, call_api)
+
+    def _route(self, arts_page: List[Dict[str, Any]], batch: QueryBatch) -> List[Dict[str, Any]]:
+        # tag each article with the target it belongs to; cached pages may carry a stale one
+        routed = []
+        for art in arts_page:
+            matches = route_article(art, batch)
+            if not matches:
+                continue
+            art['target'] = matches[0]
+            if batch.is_batched:
+                art['matched_targets'] = matches
+            routed.append(art)
+        if len(routed) < len(arts_page):
+            logging.debug("Dropped %d unroutable articles for batch %s", len(arts_page) - len(routed), batch.targets)
+        return routed
+
+    def _commit_page(self, arts_page: List[Dict[str, Any]], jsonl_path: str, csv_path: str) -> int:
+        # runs on the coordinating thread only, so seen index / files need no lock
+        new_items = self._filter_new(arts_page)
+        if not new_items:
+            return 0
+        rows = to_rows_for_csv(new_items)
+        written = write_jsonl(jsonl_path, new_items) + write_csv(csv_path, rows)
+        if self.sink:
+            self.sink.add(rows)
+        if self.on_commit:
+            self.on_commit(rows)
+        # mark seen only after the rows are on disk, one transaction per page
+        self.seen.add_many(a["uri"] for a in new_items)
+        return written
+
+    def _pull_windows(self, windows: List[Tuple[QueryBatch, Optional[str], Optional[str]]], pages: int,
+                      jsonl_path: str, csv_path: str, resumable: bool = False) -> int:
+        """
+        Fetch every (query, window, page) unit on a bounded thread pool.
+
+        Page 1 of each window is scheduled first; its page count decides how many
+        follow-up pages (capped at `pages`) are worth paying for. With `resumable`,
+        each finished unit is checkpointed and units done by an earlier run are
+        skipped (their page count comes from the checkpoint).
+        """
+        windows = [w for w in windows
+                   if in_shard(window_key(w[0].keywords, w[1], w[2]), self.cfg.shard_index, self.cfg.shard_count)]
+        if pages <= 0 or not windows:
+            return 0
         total_written = 0
+        skipped = 0
+        found: Dict[Tuple[str, Optional[str], Optional[str]], int] = {}
+        pending = {}
+
+        def is_done(wkey: str, page: int) -> bool:
+            return resumable and self.progress.is_done(unit_key(wkey, page))
+
+        def schedule_rest(pool, batch, ds, de, total_pages):
+            nonlocal skipped
+            wkey = window_key(batch.keywords, ds, de)
+            for p in range(2, min(pages, total_pages) + 1):
+                if is_done(wkey, p):
+                    skipped += 1
+                    continue
+                pending[pool.submit(self._fetch_unit, batch.keywords, p, ds, de)] = (batch, ds, de, p)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.cfg.workers)) as pool:
+            for batch, ds, de in windows:
+                wkey = window_key(batch.keywords, ds, de)
+                known_pages = self.progress.window_pages(wkey) if is_done(wkey, 1) else None
+                if known_pages is not None:
+                    skipped += 1
+                    schedule_rest(pool, batch, ds, de, known_pages)
+                    continue
+                for tgt in batch.targets:
+                    found[(tgt, ds, de)] = 0
+                pending[pool.submit(self._fetch_unit, batch.keywords, 1, ds, de)] = (batch, ds, de, 1)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    batch, ds, de, page = pending.pop(fut)
+                    try:
+                        arts_page, total_pages = fut.result()
+                    except Exception:
+                        for other in pending:
+                            other.cancel()
+                        raise
+                    routed = self._route(arts_page, batch)
+                    for art in routed:
+                        if (art['target'], ds, de) in found:
+                            found[(art['target'], ds, de)] += 1
+                    written = self._commit_page(routed, jsonl_path, csv_path)
+                    total_written += written
+                    if resumable:
+                        self._mark_done(window_key(batch.keywords, ds, de), page, total_pages)
+                    logging.debug("Page %d for %s: %d returned, %d rows written", page, batch.targets,
+                                  len(arts_page), written)
+                    if page == 1:
+                        schedule_rest(pool, batch, ds, de, total_pages)
+
+        if skipped:
+            logging.info("Resumed from checkpoint: skipped %d work units done by an earlier run", skipped)
+        for (tgt, ds, de), n in found.items():
+            if not n:
+                logging.warning("No articles found for target: %s (%s to %s)", tgt, ds or "recent", de or "now")
+        return total_written
+
+    def _targets(self) -> List[str]:
         targets: List[str] = []
         if self.cfg.keywords:
             targets.append(self.cfg.keywords)
         targets.extend(self.cfg.symbols)
+        return targets
 
-        for tgt in targets:
-            logging.info("Processing RECENT target: %s", tgt)
-            articles = self._pull_pages(
-                keywords=tgt,
-                pages=self.cfg.recent_pages,
-                date_start=None,
-                date_end=None,
-            )
-            if not articles:
-                logging.warning("No articles found for target: %s", tgt)
-                continue
-            logging.info("Writing %d articles for target: %s", len(articles), tgt)
-            total_written += write_jsonl(self.recent_jsonl, articles)
-            total_written += write_csv(self.recent_csv, to_rows_for_csv(articles))
+    def plan(self) -> List[QueryBatch]:
+        return plan_batches(self._targets(), max_targets=max(1, self.cfg.batch_targets),
+                            max_terms=self.cfg.max_query_terms, aliases=self.cfg.aliases)
 
+    # ---------- public runners ----------
+    def run_recent(self) -> int:
+        batches = self.plan()
+        logging.info("Processing RECENT queries: %d (workers=%d)", len(batches), self.cfg.workers)
+        total_written = self._pull_windows(
+            windows=[(batch, None, None) for batch in batches],
+            pages=self.cfg.recent_pages,
+            jsonl_path=self.recent_jsonl,
+            csv_path=self.recent_csv,
+        )
+
+        if self.sink:
+            self.sink.flush()
         self.state.last_written_recent += total_written
         self._save_state()
         return total_written
 
     def run_archive(self) -> int:
-        total_written = 0
-        targets: List[str] = []
-        if self.cfg.keywords:
-            targets.append(self.cfg.keywords)
-        targets.extend(self.cfg.symbols)
-
+        batches = self.plan()
         years = self.cfg.years or []
-        for year in years:
-            ds, de = f"{year}-01-01", f"{year}-12-31"
-            logging.info("Processing ARCHIVE year: %s (%s to %s)", year, ds, de)
-            for tgt in targets:
-                logging.info("Processing ARCHIVE target: %s for year %s", tgt, year)
-                articles = self._pull_pages(
-                    keywords=tgt,
-                    pages=self.cfg.archive_pages,
-                    date_start=ds, date_end=de
-                )
-                if not articles:
-                    logging.warning("No articles found for target: %s in year %s", tgt, year)
-                    continue
-                logging.info("Writing %d articles for target: %s in year %s", len(articles), tgt, year)
-                total_written += write_jsonl(self.archive_jsonl, articles)
-                total_written += write_csv(self.archive_csv, to_rows_for_csv(articles))
-
+        windows = [(batch, f"{year}-01-01", f"{year}-12-31") for year in years for batch in batches]
+        logging.info("Processing ARCHIVE years: %s, queries: %d (workers=%d)", years, len(batches), self.cfg.workers)
+        total_written = self._pull_windows(
+            windows=windows,
+            pages=self.cfg.archive_pages,
+            jsonl_path=self.archive_jsonl,
+            csv_path=self.archive_csv,
+            resumable=True,
+        )
+
+        if self.sink:
+            self.sink.flush()
         self.state.last_written_archive += total_written
         self._save_state()
         return total_written
@@ -388,18 +594,33 @@ def parse_args() -> argparse.Namespace:
     ap.add_argument("--estimate_only", action="store_true", help="only print token estimate, do not call API")
     ap.add_argument("--logfile", type=str, default=None, help="write logs to this file")
     ap.add_argument("--max_retries", type=int, default=3, help="max retries for API calls")
+    ap.add_argument("--workers", type=int, default=1, help="concurrent page fetches (default: 1)")
+    ap.add_argument("--rate", type=float, default=2.5, help="shared request rate limit in requests/sec (default: 2.5)")
+    ap.add_argument("--burst", type=int, default=1, help="token bucket burst size (default: 1)")
+    ap.add_argument("--cache", type=str, choices=CACHE_MODES, default="use",
+                    help="response cache: off, use (read-through), refresh (re-fetch + overwrite), replay (cache only, no API). Default: use")
+    ap.add_argument("--cache_ttl_min", type=float, default=60.0,
+                    help="minutes before cached recent/open-window pages expire; closed years never expire (default: 60)")
+    ap.add_argument("--batch_targets", type=int, default=1,
+                    help="pack up to N HK tickers into one query and route results back by title/body/concepts (default: 1 = off)")
+    ap.add_argument("--max_query_terms", type=int, default=DEFAULT_MAX_TERMS,
+                    help=f"max OR terms per batched query (default: {DEFAULT_MAX_TERMS})")
+    ap.add_argument("--parquet_dir", type=str, default=None,
+                    help="also write articles to a Parquet store partitioned by month/symbol (requires pyarrow)")
+    ap.add_argument("--shard", type=str, default=None,
+                    help="run only shard K of N work windows, e.g. 0/4; start N processes with K=0..N-1 on the same plan")
     ap.add_argument("--token_cap", type=int, default=400, help="hard stop if estimated tokens > cap for this run")
     ap.add_argument("--universe_file", type=str, default=None, help="CSV file containing stock symbols to process (e.g., data/universe/hstech_current_constituents.csv)")
     return ap.parse_args()
 
 def main():
+    args = parse_args()
+
     api_key = os.getenv("ER_API_KEY")
-    if not api_key:
+    if not api_key and args.cache != "replay":
         print("ERROR: Please export ER_API_KEY before running (export ER_API_KEY=...)",
               file=sys.stderr)
         sys.exit(1)
-
-    args = parse_args()
     
     # 统一的日志配置
     log_level = logging.DEBUG if args.debug else logging.INFO
@@ -411,6 +632,7 @@ def main():
     
     # 处理股票池文件
     symbols = list(args.symbols)  # 复制原有symbols列表
+    aliases: Dict[str, List[str]] = {}
     if args.universe_file:
         if not os.path.exists(args.universe_file):
             logging.error("Universe file not found: %s", args.universe_file)
@@ -423,6 +645,9 @@ def main():
                 sys.exit(1)
             
             universe_symbols = df_universe['symbol'].tolist()
+            if 'name' in df_universe.columns:
+                # 公司名仅用于批量查询结果的回路由，不加入查询词
+                aliases = {s: [str(n)] for s, n in zip(df_universe['symbol'], df_universe['name']) if pd.notna(n)}
             symbols.extend(universe_symbols)
             logging.info("Loaded %d symbols from universe file: %s", len(universe_symbols), args.universe_file)
             logging.info("Universe symbols: %s", universe_symbols[:10] + (['...'] if len(universe_symbols) > 10 else []))
@@ -431,6 +656,15 @@ def main():
             logging.error("Failed to read universe file %s: %s", args.universe_file, e)
             sys.exit(1)
     
+    shard_index, shard_count = 0, 1
+    if args.shard:
+        try:
+            shard_index, shard_count = (int(x) for x in args.shard.split("/"))
+            assert shard_count >= 1 and 0 <= shard_index < shard_count
+        except (ValueError, AssertionError):
+            logging.error("--shard must look like K/N with 0 <= K < N, got %s", args.shard)
+            sys.exit(1)
+
     cfg = PipeConfig(
         keywords=args.keywords,
         symbols=symbols,  # 使用处理后的symbols
@@ -439,13 +673,31 @@ def main():
         archive_pages=max(0, args.archive_pages),
         lang=args.lang,
         outdir=args.outdir,
+        workers=max(1, args.workers),
+        rate_per_sec=args.rate,
+        burst=max(1, args.burst),
+        max_retries=max(0, args.max_retries),
+        cache_mode=args.cache,
+        cache_ttl_min=args.cache_ttl_min,
+        batch_targets=max(1, args.batch_targets),
+        max_query_terms=max(1, args.max_query_terms),
+        aliases=aliases,
+        parquet_dir=args.parquet_dir,
+        shard_index=shard_index,
+        shard_count=shard_count,
     )
     pipe = NewsPipeline(api_key=api_key, cfg=cfg)
 
     # Token budgeting (rough estimate, for your awareness)
-    est_recent = estimate_tokens_recent(cfg.recent_pages) * (len(cfg.symbols) + (1 if cfg.keywords else 0))
-    est_archive = estimate_tokens_archive(cfg.archive_pages, len(cfg.years)) * (len(cfg.symbols) + (1 if cfg.keywords else 0))
+    n_targets = len(cfg.symbols) + (1 if cfg.keywords else 0)
+    n_queries = len(pipe.plan())
+    est_recent = estimate_tokens_recent(cfg.recent_pages) * n_queries
+    est_archive = estimate_tokens_archive(cfg.archive_pages, len(cfg.years)) * n_queries
     print(f"[INFO] Estimated tokens -> recent: {est_recent}, archive: {est_archive}, total: {est_recent + est_archive}")
+    if n_queries < n_targets:
+        unbatched = (estimate_tokens_recent(cfg.recent_pages) + estimate_tokens_archive(cfg.archive_pages, len(cfg.years))) * n_targets
+        print(f"[INFO] Query batching: {n_targets} targets -> {n_queries} queries, "
+              f"saves {unbatched - est_recent - est_archive} of {unbatched} tokens")
     
     # 在原有"token 估算"打印之后，加：
     logging.info("[PLAN] recent_pages=%s archive_pages=%s years=%s symbols=%s keywords=%s lang=%s",
@@ -455,7 +707,7 @@ def main():
 
     # Token 上限保护
     est_total = (est_recent or 0) + (est_archive or 0)
-    if args.token_cap and est_total > args.token_cap and not args.estimate_only:
+    if args.token_cap and est_total > args.token_cap and not args.estimate_only and cfg.cache_mode != "replay":
         logging.error("Estimated tokens %s > token_cap %s. Aborting to protect quota.", est_total, args.token_cap)
         sys.exit(2)
 
@@ -479,7 +731,13 @@ def main():
     print(" - recent CSV   :", pipe.recent_csv)
     print(" - archive CSV  :", pipe.archive_csv)
     print(" - checkpoint   :", pipe.ckpt_path)
+    print(" - progress     :", pipe.progress_path)
     print(" - seen         :", pipe.seen_path)
+    if pipe.sink:
+        print(" - parquet      :", pipe.sink.root, f"({pipe.sink.written} rows this run)")
+    cache_stats = pipe.cache.stats()
+    if cfg.cache_mode != "off":
+        print(" - cache        :", pipe.cache.root, f"(mode={cfg.cache_mode}, hits={cache_stats['hits']}, misses={cache_stats['misses']})")
     
     # 记录运行指标
     mode = "mixed" if cfg.recent_pages > 0 and cfg.archive_pages > 0 else ("recent" if cfg.recent_pages > 0 else "archive")
@@ -495,7 +753,7 @@ def main():
         items_written_archive=wrote_archive,
         tokens_recent_est=est_recent,
         tokens_archive_est=est_archive,
-        extra=f"lang={args.lang or 'all'}, {universe_info}"
+        extra=f"lang={args.lang or 'all'}, {universe_info}, cache={cfg.cache_mode} hits={cache_stats['hits']} misses={cache_stats['misses']}"
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+data_profile.py
+---------------------------------
+流式数据质量画像：逐块读取，只保留可合并的近似统计量，内存占用与数据量无关
+
+- 数值列：Welford 均值/方差（块间用 Chan 公式合并）+ 最小/最大值
+- 数值列分位数：DDSketch 对数分桶（相对误差 1%，桶计数相加即可合并）
+- 标识列（uri、code 等）：HyperLogLog 去重计数（寄存器逐位取最大值即可合并）
+- 每列缺失值计数、空正文、无效日期、语言分布
+
+各进程分别画像自己的块，最后 merge 成一份报告，报告字段与 clean_data.validate_data_quality 一致，
+数值列的统计量与 DataFrame.describe() 同名。
+
+用法:
+    python src/data_profile.py --input news_out/articles_archive.csv --workers 8 --output reports/profile.json
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import json
+import logging
+import math
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from clean_data import iter_raw_chunks, language_counts
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_ID_COLUMNS = ('uri', 'code', 'target')
+DEFAULT_RELATIVE_ACCURACY = 0.01
+DEFAULT_HLL_PRECISION = 14
+_ZERO_EPS = 1e-12
+
+
+class RunningStats:
+    """Welford 均值/方差，按块批量更新，可与其它实例合并"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _combine(self, count: int, mean: float, m2: float, lo: float, hi: float) -> None:
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        mean = float(values.mean())
+        self._combine(int(values.size), mean, float(((values - mean) ** 2).sum()),
+                      float(values.min()), float(values.max()))
+
+    def merge(self, other: "RunningStats") -> None:
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    @property
+    def std(self) -> float:
+        # 与 pandas 一致使用样本标准差
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+
+
+class QuantileSketch:
+    """
+    DDSketch：按 log_gamma(|x|) 分桶计数，任意分位数的相对误差不超过 relative_accuracy
+
+    正负值分两组桶，|x| < 1e-12 计入零桶；合并即桶计数相加
+    """
+
+    def __init__(self, relative_accuracy: float = DEFAULT_RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Counter = Counter()
+        self.negative: Counter = Counter()
+        self.zero = 0
+        self.count = 0
+
+    def _add_buckets(self, store: Counter, magnitudes: np.ndarray) -> None:
+        keys, counts = np.unique(np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64),
+                                 return_counts=True)
+        store.update(dict(zip(keys.tolist(), counts.tolist())))
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self.count += int(values.size)
+        pos = values[values > _ZERO_EPS]
+        neg = values[values < -_ZERO_EPS]
+        self.zero += int(values.size - pos.size - neg.size)
+        if pos.size:
+            self._add_buckets(self.positive, pos)
+        if neg.size:
+            self._add_buckets(self.negative, -neg)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+        self.count += other.count
+
+    def _value(self, key: int) -> float:
+        # 桶 (gamma^(k-1), gamma^k] 的中心估计
+        return 2 * self.gamma ** key / (1 + self.gamma)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+
+class HyperLogLog:
+    """HyperLogLog 去重计数（2^precision 个寄存器，标准误差约 1.04 / sqrt(2^precision)）"""
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION):
+        self.p = precision
+        self.m = 1 << precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    def update(self, values: pd.Series) -> None:
+        values = values.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values.astype(str), index=False).to_numpy(dtype=np.uint64)
+        idx = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes << np.uint64(self.p)
+        # 剩余位的前导零个数 + 1；拆成高低 32 位，保证 frexp 精确
+        hi = (rest >> np.uint64(32)).astype(np.float64)
+        lo = (rest & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        width = 64 - self.p
+        rho = np.where(hi > 0, 33 - np.frexp(hi)[1], np.where(lo > 0, 65 - np.frexp(lo)[1], width + 1))
+        rho = np.minimum(rho, width + 1).astype(np.uint8)
+        np.maximum.at(self.registers, idx, rho)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> int:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            raw = self.m * math.log(self.m / zeros)  # 小基数用线性计数
+        return int(round(raw))
+
+
+class ColumnSketch:
+    """单个数值列：RunningStats + QuantileSketch，describe() 输出与 pandas 同名的统计量"""
+
+    def __init__(self):
+        self.stats = RunningStats()
+        self.quantiles = QuantileSketch()
+        self.positive = 0
+        self.negative = 0
+
+    def update(self, series: pd.Series) -> None:
+        values = pd.to_numeric(series, errors='coerce').dropna().to_numpy(dtype=np.float64)
+        self.stats.update(values)
+        self.quantiles.update(values)
+        self.positive += int((values > 0).sum())
+        self.negative += int((values < 0).sum())
+
+    def merge(self, other: "ColumnSketch") -> None:
+        self.stats.merge(other.stats)
+        self.quantiles.merge(other.quantiles)
+        self.positive += other.positive
+        self.negative += other.negative
+
+    def _quantile(self, q: float) -> float:
+        # 桶中心估计可能略超出真实极值
+        return min(max(self.quantiles.quantile(q), self.stats.min), self.stats.max)
+
+    def describe(self) -> Dict[str, float]:
+        n = self.stats.count
+        nan = float('nan')
+        return {
+            'count': float(n),
+            'mean': self.stats.mean if n else nan,
+            'std': self.stats.std,
+            'min': self.stats.min if n else nan,
+            '25%': self._quantile(0.25) if n else nan,
+            '50%': self._quantile(0.5) if n else nan,
+            '75%': self._quantile(0.75) if n else nan,
+            'max': self.stats.max if n else nan,
+        }
+
+
+class DataProfile:
+    """
+    可合并的数据画像
+
+    Args:
+        numeric_columns: 需要统计分布的数值列（None 表示自动选择数值类型的列）
+        id_columns: 需要近似去重计数的标识列
+    """
+
+    def __init__(self, numeric_columns: Optional[Sequence[str]] = None,
+                 id_columns: Sequence[str] = DEFAULT_ID_COLUMNS):
+        self.numeric_columns = list(numeric_columns) if numeric_columns is not None else None
+        self.id_columns = list(id_columns)
+        self.total_rows = 0
+        self.missing = Counter()
+        self.empty_content = 0
+        self.invalid_dates = 0
+        self.languages = Counter()
+        self.numeric: Dict[str, ColumnSketch] = {}
+        self.distinct: Dict[str, HyperLogLog] = {}
+
+    def update(self, df: pd.DataFrame) -> "DataProfile":
+        self.total_rows += len(df)
+        self.missing.update({col: int(n) for col, n in df.isna().sum().items() if n})
+        if 'body' in df.columns:
+            self.empty_content += int((df['body'].fillna('').astype(str).str.len() < 10).sum())
+        if 'date' in df.columns:
+            self.invalid_dates += int(df['date'].isna().sum())
+        if 'detected_lang' in df.columns or 'body' in df.columns:
+            self.languages.update(language_counts(df))
+
+        numeric_columns = self.numeric_columns
+        if numeric_columns is None:
+            numeric_columns = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+        for col in numeric_columns:
+            if col in df.columns:
+                self.numeric.setdefault(col, ColumnSketch()).update(df[col])
+        for col in self.id_columns:
+            if col in df.columns:
+                self.distinct.setdefault(col, HyperLogLog()).update(df[col])
+        return self
+
+    def merge(self, other: "DataProfile") -> "DataProfile":
+        self.total_rows += other.total_rows
+        self.missing.update(other.missing)
+        self.empty_content += other.empty_content
+        self.invalid_dates += other.invalid_dates
+        self.languages.update(other.languages)
+        for col, sketch in other.numeric.items():
+            if col in self.numeric:
+                self.numeric[col].merge(sketch)
+            else:
+                self.numeric[col] = sketch
+        for col, hll in other.distinct.items():
+            if col in self.distinct:
+                self.distinct[col].merge(hll)
+            else:
+                self.distinct[col] = hll
+        return self
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'total_rows': self.total_rows,
+            'missing_values': dict(self.missing),
+            'empty_content': self.empty_content,
+            'invalid_dates': self.invalid_dates,
+            'language_distribution': dict(self.languages.most_common()),
+            'numeric_stats': {col: sketch.describe() for col, sketch in self.numeric.items()},
+            'approx_distinct': {col: hll.estimate() for col, hll in self.distinct.items()},
+        }
+
+
+def profile_chunk(df: pd.DataFrame, numeric_columns: Optional[Sequence[str]] = None,
+                  id_columns: Sequence[str] = DEFAULT_ID_COLUMNS) -> DataProfile:
+    """对单个数据块画像（进程池中执行）"""
+    return DataProfile(numeric_columns, id_columns).update(df)
+
+
+def profile_chunks(
+    chunks: Iterable[pd.DataFrame],
+    workers: int = 1,
+    numeric_columns: Optional[Sequence[str]] = None,
+    id_columns: Sequence[str] = DEFAULT_ID_COLUMNS
+) -> DataProfile:
+    """
+    逐块画像并合并
+
+    Args:
+        chunks: 数据块迭代器
+        workers: 进程数（1 表示在当前进程内完成）
+        numeric_columns: 数值列
+        id_columns: 标识列
+
+    Returns:
+        合并后的 DataProfile
+    """
+    profile = DataProfile(numeric_columns, id_columns)
+    if workers <= 1:
+        for chunk in chunks:
+            profile.update(chunk)
+        return profile
+
+    pending: deque = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks:
+            pending.append(pool.submit(profile_chunk, chunk, numeric_columns, id_columns))
+            while len(pending) >= 2 * workers:
+                profile.merge(pending.popleft().result())
+        while pending:
+            profile.merge(pending.popleft().result())
+    return profile
+
+
+def profile_file(
+    input_file: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    numeric_columns: Optional[Sequence[str]] = None,
+    id_columns: Sequence[str] = DEFAULT_ID_COLUMNS
+) -> Dict[str, Any]:
+    """
+    分块读取 CSV / JSONL 文件并生成画像报告
+
+    Args:
+        input_file: 输入文件路径
+        chunk_size: 每块行数
+        workers: 进程数
+        numeric_columns: 数值列
+        id_columns: 标识列
+
+    Returns:
+        画像报告
+    """
+    profile = profile_chunks(iter_raw_chunks(input_file, chunk_size), workers, numeric_columns, id_columns)
+    logging.info(f"画像完成: {input_file}，共 {profile.total_rows} 行")
+    return profile.report()
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="流式数据质量画像")
+    parser.add_argument("--input", "-i", required=True, help="输入 CSV / JSONL 文件")
+    parser.add_argument("--output", "-o", help="报告输出路径（JSON，可选）")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块行数")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="进程数")
+    parser.add_argument("--numeric_columns", nargs="*", help="数值列（默认自动识别）")
+    parser.add_argument("--id_columns", nargs="*", default=list(DEFAULT_ID_COLUMNS), help="去重计数的标识列")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        report = profile_file(args.input, max(1, args.chunk_size), max(1, args.workers),
+                              args.numeric_columns, args.id_columns)
+        text = json.dumps(report, ensure_ascii=False, indent=2, default=float)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"📁 画像报告已保存到: {args.output}")
+        else:
+            print(text)
+
+    except Exception as e:
+        logging.error(f"画像失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+er_cache.py
+---------------------------------
+Content-addressed on-disk cache for EventRegistry result pages.
+
+Each (keywords, lang, dateStart, dateEnd, page, count) query is normalized,
+hashed with sha1 and stored as one JSON file under <root>/<aa>/<sha1>.json.
+
+TTL policy
+- closed historical windows (dateEnd before today) never expire
+- open windows (recent 30 days, or dateEnd >= today) expire after `recent_ttl_min`
+
+Modes
+- off     : no caching
+- use     : read-through; misses go to the API and are stored
+- refresh : always call the API, overwrite the cache
+- replay  : cache only, never call the API (offline rebuilds / benchmarks)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+CACHE_MODES = ("off", "use", "refresh", "replay")
+
+Page = Tuple[List[Dict[str, Any]], int]
+
+
+def normalize_query(keywords: str, lang: Optional[str], date_start: Optional[str],
+                    date_end: Optional[str], page: int, count: int = 100) -> Dict[str, Any]:
+    return {
+        "keywords": " ".join(str(keywords).split()),
+        "lang": (lang or "").lower(),
+        "dateStart": date_start or "",
+        "dateEnd": date_end or "",
+        "page": int(page),
+        "count": int(count),
+    }
+
+
+def query_key(query: Dict[str, Any]) -> str:
+    blob = json.dumps(query, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+def is_closed_window(query: Dict[str, Any], today: Optional[date] = None) -> bool:
+    end = query.get("dateEnd")
+    if not end:
+        return False
+    return end < (today or date.today()).isoformat()
+
+
+class ResponseCache:
+    def __init__(self, root: str, mode: str = "use", recent_ttl_min: float = 60.0):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"cache mode must be one of {CACHE_MODES}, got {mode!r}")
+        self.root = root
+        self.mode = mode
+        self.recent_ttl_sec = max(0.0, float(recent_ttl_min)) * 60
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if mode != "off":
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, query: Dict[str, Any]) -> Optional[Page]:
+        path = self._path(query_key(query))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        fresh = is_closed_window(query) or time.time() - entry.get("fetched_at", 0) <= self.recent_ttl_sec
+        if not fresh and self.mode != "replay":
+            return None
+        return entry.get("articles") or [], int(entry.get("pages") or 0)
+
+    def put(self, query: Dict[str, Any], result: Page) -> None:
+        path = self._path(query_key(query))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        articles, pages = result
+        entry = {"query": query, "fetched_at": time.time(), "pages": pages, "articles": articles}
+        # atomic replace: concurrent fetch workers may write side by side
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def fetch(self, query: Dict[str, Any], fetch_fn: Callable[[], Page]) -> Page:
+        """Serve `query` per the cache mode, calling `fetch_fn` only when the API is needed."""
+        if self.mode == "off":
+            return fetch_fn()
+        if self.mode in ("use", "replay"):
+            cached = self.get(query)
+            if cached is not None:
+                self._count(hit=True)
+                return cached
+        self._count(hit=False)
+        if self.mode == "replay":
+            logging.debug("Replay cache miss: %s", query)
+            return [], 0
+        result = fetch_fn()
+        self.put(query, result)
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -10,16 +10,25 @@ import pandas as pd
 import numpy as np
 from typing import Dict, Any
 
+from near_dup import cluster_keys
+
 def daily_factor_from_sentiment(sentiment_df: pd.DataFrame) -> pd.DataFrame:
     """
     从情感分析数据聚合到日度因子
     
     Args:
         sentiment_df: 包含 'date', 'code', 'sentiment_score' 列的数据框
+            （可选 'canonical_uri' 列：同一股票同一天的转载稿只计一次）
         
     Returns:
         包含 'date', 'code', 'sentiment_factor' 列的数据框
     """
+    # 近重复转载稿不应放大 news_count
+    if 'canonical_uri' in sentiment_df.columns:
+        # canonical_uri 缺失的新闻各自计数
+        keyed = sentiment_df.assign(_cluster=cluster_keys(sentiment_df))
+        sentiment_df = keyed.drop_duplicates(subset=['date', 'code', '_cluster']).drop(columns='_cluster')
+    
     # 按日期和股票代码聚合
     daily_factors = sentiment_df.groupby(['date', 'code'])['sentiment_score'].agg([
         'mean',  # 平均情感分数
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+near_dup.py
+---------------------------------
+近重复新闻检测：MinHash 签名 + LSH 分桶，索引持久化在 SQLite 中，可跨运行累积
+
+- 文本按字符 5-gram 切片（对中英文都适用），crc32 得到稳定的切片哈希
+- num_perm 个随机线性哈希取最小值得到 MinHash 签名
+- 签名切成 bands 段，每段哈希成一个桶；同桶文章才是候选，查询为亚线性
+- 候选用签名估计的 Jaccard 相似度复核，>= threshold 归为同一簇
+- 每个簇以最早入库的文章作为 canonical_uri
+
+通讯社稿件被多家媒体以不同 URL 转载时，URI 去重无效，但会落在同一簇中。
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WS_RE = re.compile(r'\s+')
+
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 32
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_SHINGLE = 5
+
+
+def shingle_hashes(text: str, k: int = DEFAULT_SHINGLE) -> np.ndarray:
+    """文本 → 字符 k-gram 的 crc32 哈希集合"""
+    if not isinstance(text, str):
+        return np.empty(0, dtype=np.uint64)
+    norm = _WS_RE.sub(' ', text.lower()).strip()
+    if len(norm) <= k:
+        grams = {norm} if norm else set()
+    else:
+        grams = {norm[i:i + k] for i in range(len(norm) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        # a, b < 2^31，保证 a*x+b 在 uint64 内不溢出（x < 2^32）
+        self.a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, text: str) -> np.ndarray:
+        hv = shingle_hashes(text)
+        if hv.size == 0:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        phv = (np.outer(hv, self.a) + self.b) % _MERSENNE & _MAX_HASH
+        return phv.min(axis=0)
+
+
+class NearDupIndex:
+    """
+    持久化的 MinHash LSH 索引
+
+    Args:
+        db_path: SQLite 文件路径
+        num_perm: 签名长度
+        bands: LSH 段数（num_perm 必须能被整除）
+        threshold: 判定为近重复的 Jaccard 阈值
+    """
+
+    def __init__(self, db_path: str, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS,
+                 threshold: float = DEFAULT_THRESHOLD):
+        if num_perm % bands:
+            raise ValueError("num_perm 必须能被 bands 整除")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, canonical_id TEXT, sig BLOB)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, doc_id TEXT, "
+                          "PRIMARY KEY (band, bucket, doc_id)) WITHOUT ROWID")
+        self.conn.commit()
+
+    def _bucket_keys(self, sig: np.ndarray) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            chunk = sig[band * self.rows:(band + 1) * self.rows].tobytes()
+            keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), 'big', signed=True))
+        return keys
+
+    def _lookup(self, doc_id: str) -> Optional[str]:
+        row = self.conn.execute("SELECT canonical_id FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row[0] if row else None
+
+    def query(self, sig: np.ndarray) -> Optional[Tuple[str, float]]:
+        """返回最相似的已入库文章 (canonical_id, 相似度)，没有则 None"""
+        candidates = set()
+        for band, key in enumerate(self._bucket_keys(sig)):
+            rows = self.conn.execute("SELECT doc_id FROM buckets WHERE band = ? AND bucket = ?", (band, key))
+            candidates.update(r[0] for r in rows)
+        best = None
+        for doc_id in candidates:
+            canonical, blob = self.conn.execute(
+                "SELECT canonical_id, sig FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+            sim = float(np.mean(np.frombuffer(blob, dtype=np.uint64) == sig))
+            if sim >= self.threshold and (best is None or sim > best[1]):
+                best = (canonical, sim)
+        return best
+
+    def add(self, doc_id: str, text: str) -> str:
+        """入库一篇文章，返回其 canonical_id（已入库则直接返回原结果）"""
+        known = self._lookup(doc_id)
+        if known is not None:
+            return known
+        sig = self.hasher.signature(text)
+        match = self.query(sig)
+        canonical = match[0] if match else doc_id
+        self.conn.execute("INSERT INTO docs (doc_id, canonical_id, sig) VALUES (?, ?, ?)",
+                          (doc_id, canonical, sig.tobytes()))
+        self.conn.executemany("INSERT OR IGNORE INTO buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                              [(band, key, doc_id) for band, key in enumerate(self._bucket_keys(sig))])
+        return canonical
+
+    def assign(self, items: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """批量入库 (doc_id, text)，返回 doc_id → canonical_id；一次事务提交"""
+        out = {doc_id: self.add(doc_id, text) for doc_id, text in items}
+        self.conn.commit()
+        return out
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+def tag_near_duplicates(
+    df: pd.DataFrame,
+    db_path: str,
+    id_column: str = 'uri',
+    text_column: str = 'body',
+    threshold: float = DEFAULT_THRESHOLD
+) -> pd.DataFrame:
+    """
+    为数据框添加 canonical_uri 列（同一近重复簇共享同一个值）
+
+    Args:
+        df: 清洗后的数据框
+        db_path: 持久化索引路径
+        id_column: 文章唯一标识列
+        text_column: 文本列
+        threshold: Jaccard 阈值
+
+    Returns:
+        添加了 canonical_uri 列的数据框
+    """
+    df = df.copy()
+    texts = df[text_column].astype(str).tolist()
+    # 缺失 uri 的文章用正文哈希作 doc_id，否则全部变成同一个 'nan' 而被并成一簇
+    ids = [f'sha1:{hashlib.sha1(t.encode("utf-8")).hexdigest()}' if pd.isna(u) else str(u)
+           for u, t in zip(df[id_column], texts)]
+    index = NearDupIndex(db_path, threshold=threshold)
+    try:
+        mapping = index.assign(zip(ids, texts))
+    finally:
+        index.close()
+    df['canonical_uri'] = [mapping[i] for i in ids]
+    dup_count = sum(mapping[i] != i for i in ids)
+    logging.info(f"近重复检测: {dup_count} / {len(df)} 条归入已有簇，共 {df['canonical_uri'].nunique()} 个簇")
+    return df
+
+
+def cluster_keys(df: pd.DataFrame, column: str = 'canonical_uri') -> pd.Series:
+    """
+    分组用的簇键：canonical_uri 缺失的行各自成簇（以行号占位），不会全部并入同一个 'nan' 簇
+    """
+    keys = df[column].astype(str).to_numpy(dtype=object)
+    missing = df[column].isna().to_numpy()
+    keys[missing] = [f'__row__:{i}' for i in np.flatnonzero(missing)]
+    return pd.Series(keys, index=df.index)
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+onnx_backend.py
+---------------------------------
+ONNX Runtime 推理后端：把 RoBERTa 情感模型导出为 ONNX，可选动态 int8 量化，在无 GPU 的机器上提速
+
+- export_onnx     : transformers 模型 → model.onnx（batch / sequence 维度动态），同时保存分词器和配置
+- quantize_int8   : onnxruntime 动态量化（权重 int8）→ model.int8.onnx
+- OnnxSentimentPipeline : 调用方式与 transformers pipeline 相同（top_k=None 返回全部类别概率），
+                          可直接交给 sentiment_top.analyze_sentiment_batch
+- agreement_report: 与 PyTorch 基线在同一样本上比较标签一致率、分数相关性、概率最大偏差和吞吐
+
+依赖（可选）: pip install onnxruntime onnx
+
+用法:
+    python src/onnx_backend.py export --quantize
+    python src/onnx_backend.py report --input data/processed/articles_recent_cleaned.csv --sample 500
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 首次使用时导入（onnxruntime 导入较慢，不走 ONNX 后端时不需要）
+ort = None
+
+DEFAULT_ONNX_DIR = 'models/onnx/twitter-roberta-base-sentiment-latest'
+ONNX_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+
+
+def _require_onnxruntime() -> None:
+    global ort
+    if ort is not None:
+        return
+    try:
+        import onnxruntime
+    except ImportError:
+        raise RuntimeError("onnxruntime 未安装，请运行: pip install onnxruntime onnx")
+    ort = onnxruntime
+
+
+def export_onnx(model_name: str, out_dir: str = DEFAULT_ONNX_DIR, opset: int = 14) -> Path:
+    """
+    导出 ONNX 模型（需要 torch + transformers）
+
+    Args:
+        model_name: Hugging Face 模型名
+        out_dir: 输出目录
+        opset: ONNX opset 版本
+
+    Returns:
+        model.onnx 路径
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+
+    dummy = tokenizer(["export sample"], return_tensors='pt')
+    onnx_path = out / ONNX_FILE
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (dummy['input_ids'], dummy['attention_mask']),
+            str(onnx_path),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'},
+            },
+            opset_version=opset,
+        )
+    tokenizer.save_pretrained(out)
+    model.config.save_pretrained(out)
+    logging.info(f"ONNX 模型已导出到: {onnx_path}")
+    return onnx_path
+
+
+def quantize_int8(onnx_path: Path) -> Path:
+    """动态 int8 量化（只量化权重，激活保持 float32，无需校准数据）"""
+    _require_onnxruntime()
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = onnx_path.with_name(INT8_FILE)
+    quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QInt8)
+    logging.info(f"int8 量化模型已保存到: {int8_path}")
+    return int8_path
+
+
+class OnnxSentimentPipeline:
+    """
+    ONNX Runtime 情感分类器，接口与 transformers 文本分类 pipeline 一致
+
+    Args:
+        model_dir: export_onnx 的输出目录
+        quantized: 是否使用 int8 量化模型
+        num_threads: ONNX Runtime 算子内线程数（None 为默认）
+    """
+
+    def __init__(self, model_dir: str = DEFAULT_ONNX_DIR, quantized: bool = False,
+                 num_threads: Optional[int] = None):
+        _require_onnxruntime()
+        from transformers import AutoConfig, AutoTokenizer
+
+        model_path = Path(model_dir) / (INT8_FILE if quantized else ONNX_FILE)
+        if not model_path.exists():
+            raise FileNotFoundError(f"ONNX 模型不存在: {model_path}，请先运行 python src/onnx_backend.py export")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(str(model_path), options, providers=['CPUExecutionProvider'])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        config = AutoConfig.from_pretrained(model_dir)
+        self.id2label = {int(k): v for k, v in config.id2label.items()}
+        self.backend = 'onnx-int8' if quantized else 'onnx'
+        # 供 sentiment_top.model_fingerprint 读取模型名
+        self.model = SimpleNamespace(config=config)
+
+    def logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """对已 padding 的 token 张量做一次前向，返回 logits（供 pipelined_scorer 使用）"""
+        return self.session.run(['logits'], {
+            'input_ids': input_ids.astype(np.int64),
+            'attention_mask': attention_mask.astype(np.int64),
+        })[0]
+
+    def __call__(self, texts: List[str], truncation: bool = True, max_length: int = 512,
+                 top_k: Optional[int] = 1, batch_size: Optional[int] = None, **kwargs) -> List[Any]:
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        step = batch_size or len(texts) or 1
+        outputs: List[Any] = []
+        for i in range(0, len(texts), step):
+            enc = self.tokenizer(texts[i:i + step], truncation=truncation, max_length=max_length,
+                                 padding=True, return_tensors='np')
+            logits = self.logits(enc['input_ids'], enc['attention_mask'])
+            shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+            probs = shifted / shifted.sum(axis=1, keepdims=True)
+            for row in probs:
+                ranked = sorted(({'label': self.id2label[j], 'score': float(p)} for j, p in enumerate(row)),
+                                key=lambda item: item['score'], reverse=True)
+                outputs.append(ranked if top_k is None else (ranked[0] if top_k == 1 else ranked[:top_k]))
+        return outputs
+
+
+def load_onnx_pipeline(model_name: str, backend: str = 'onnx', onnx_dir: str = DEFAULT_ONNX_DIR,
+                       num_threads: Optional[int] = None) -> OnnxSentimentPipeline:
+    """加载 ONNX 后端，首次使用时自动导出（int8 时再做量化）"""
+    onnx_path = Path(onnx_dir) / ONNX_FILE
+    if not onnx_path.exists():
+        export_onnx(model_name, onnx_dir)
+    quantized = backend == 'onnx-int8'
+    if quantized and not onnx_path.with_name(INT8_FILE).exists():
+        quantize_int8(onnx_path)
+    return OnnxSentimentPipeline(onnx_dir, quantized=quantized, num_threads=num_threads)
+
+
+def agreement_report(texts: List[str], baseline, candidates: Dict[str, Any],
+                     batch_size: int = 32) -> Dict[str, Any]:
+    """
+    在同一样本上比较各后端与基线的输出
+
+    Args:
+        texts: 留出样本
+        baseline: 基线 pipeline（PyTorch）
+        candidates: {后端名: pipeline}
+        batch_size: 批大小
+
+    Returns:
+        {后端名: 标签一致率、分数相关系数、概率最大偏差、articles/sec、相对基线加速比}
+    """
+    from sentiment_top import analyze_sentiment_batch
+    from score_mappings import apply_score_mapping, probability_frame
+
+    def _score(pipe):
+        start = time.perf_counter()
+        results = analyze_sentiment_batch(texts, pipe, batch_size)
+        speed = len(texts) / (time.perf_counter() - start)
+        probs = probability_frame(results)
+        return [r['label'] for r in results], probs, apply_score_mapping(probs, 'expected_value'), speed
+
+    base_labels, base_probs, base_scores, base_speed = _score(baseline)
+    report: Dict[str, Any] = {'n': len(texts), 'torch': {'articles_per_sec': round(base_speed, 2)}}
+    for name, pipe in candidates.items():
+        labels, probs, scores, speed = _score(pipe)
+        report[name] = {
+            'label_agreement': round(float(np.mean(np.array(labels) == np.array(base_labels))), 4),
+            'score_correlation': round(float(pd.Series(scores).corr(pd.Series(base_scores))), 4),
+            'max_prob_diff': round(float(np.nanmax(np.abs(probs.to_numpy() - base_probs.to_numpy()))), 4),
+            'articles_per_sec': round(speed, 2),
+            'speedup': round(speed / base_speed, 2),
+        }
+    return report
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="情感模型 ONNX 导出 / 后端一致性报告")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export", help="导出 ONNX 模型")
+    p_export.add_argument("--onnx_dir", default=DEFAULT_ONNX_DIR, help="输出目录")
+    p_export.add_argument("--quantize", action="store_true", help="同时生成 int8 量化模型")
+    p_report = sub.add_parser("report", help="与 PyTorch 基线比较一致性和吞吐")
+    p_report.add_argument("--input", "-i", required=True, help="清洗后的新闻 CSV（抽样作为留出样本）")
+    p_report.add_argument("--text_column", "-t", default="body", help="文本列名")
+    p_report.add_argument("--sample", type=int, default=500, help="样本条数")
+    p_report.add_argument("--onnx_dir", default=DEFAULT_ONNX_DIR, help="ONNX 模型目录")
+    p_report.add_argument("--batch_size", "-b", type=int, default=32, help="批大小")
+    p_report.add_argument("--output", "-o", help="报告 JSON 路径（可选）")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        from sentiment_top import MODEL_NAME, load_sentiment_model
+
+        if args.command == "export":
+            onnx_path = export_onnx(MODEL_NAME, args.onnx_dir)
+            if args.quantize:
+                quantize_int8(onnx_path)
+            print(f"✅ 导出完成: {args.onnx_dir}")
+            return 0
+
+        df = pd.read_csv(args.input, encoding='utf-8-sig')
+        texts = df[args.text_column].dropna().astype(str)
+        texts = texts.sample(min(args.sample, len(texts)), random_state=0).tolist()
+        candidates = {b: load_onnx_pipeline(MODEL_NAME, b, args.onnx_dir) for b in ('onnx', 'onnx-int8')}
+        report = agreement_report(texts, load_sentiment_model('torch'), candidates, args.batch_size)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📁 报告已保存到: {args.output}")
+
+    except Exception as e:
+        logging.error(f"执行失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
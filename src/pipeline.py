@@ -1,11 +1,8 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 from pathlib import Path
 from sentiment_lm import lm_score_news              # 仍保留 L&M 作为 fallback
 from factors import daily_factor_from_headlines
 from eval import add_fwd_return, ic_by_day, monthly_summary
-from backtest.vectorized import make_deciles_nav, plot_deciles
-from analysis.factor_corr import run_factor_corr
 
 ROOT = Path(__file__).resolve().parents[1]
 
@@ -37,6 +34,9 @@ def load_news_or_prescored():
         df = maybe_filter_universe(df)
         if "sentiment_score" not in df.columns:
             raise ValueError("Pre-scored file found but missing 'sentiment_score' column.")
+        if "sentiment_source" in df.columns:
+            # sentiment_top.py --cascade：词典 / Transformer 混合评分
+            print("[pipeline] sentiment sources:", df["sentiment_source"].value_counts().to_dict())
         # 与下游接口对齐：改名为 score_lm（仅为了复用聚合函数）
         out = df[["date","code","sentiment_score"]].rename(columns={"sentiment_score":"score_lm"})
         return out, True
@@ -52,6 +52,11 @@ def load_news_or_prescored():
         return scored, False
 
 def main():
+    # 绘图与分析模块（matplotlib）只在生成报表时导入，import 本模块保持轻量
+    import matplotlib.pyplot as plt
+    from backtest.vectorized import make_deciles_nav, plot_deciles
+    from analysis.factor_corr import run_factor_corr
+
     scored, used_prescored = load_news_or_prescored()
     prices = load_prices()
 
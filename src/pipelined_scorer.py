@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pipelined_scorer.py
+---------------------------------
+分词 / 推理 / 后处理三段流水线：三个阶段在不同线程中重叠执行
+
+逐批调用 pipeline 时，CPU 在 Python 侧的分词和 BLAS 矩阵乘之间来回切换。流水线把它们拆开：
+
+- 分词阶段：快速分词器按块批量编码（不 padding），按长度组批后 padding 为 int64 张量，放入有界队列
+- 推理阶段：从队列取张量做前向，logits 放入第二个有界队列
+- 后处理阶段：softmax → {'label', 'score', 'probs'}（与 sentiment_top._to_result 格式一致），
+  情感分数仍由 add_sentiment_scores 按所选映射计算
+
+快速分词器和 torch / onnxruntime 的算子都会释放 GIL，所以各阶段可以真正并行；
+端到端吞吐接近最慢阶段单独运行的吞吐。每次评分后 last_stats 记录各阶段忙碌时间和利用率。
+
+PipelinedScorer 可以像 pipeline 一样直接交给 sentiment_top.analyze_sentiment_batch。
+
+用法:
+    python src/sentiment_top.py --pipelined
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from score_mappings import LABEL_CLASSES
+from sentiment_top import MAX_SEQ_LENGTH, plan_token_batches
+
+# 阶段间队列长度（批）：足够吸收单批耗时抖动，又不让分词阶段跑得太远占用内存
+DEFAULT_QUEUE_SIZE = 4
+# 分词阶段每次批量编码的批数（按长度组批在块内进行）
+TOKENIZE_CHUNK_BATCHES = 8
+STAGES = ('tokenize', 'model', 'postprocess')
+
+_DONE = object()
+
+
+def pad_batch(encoded: Sequence[Sequence[int]], pad_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """右侧 padding 为 (input_ids, attention_mask) 两个 int64 张量"""
+    longest = max(len(ids) for ids in encoded)
+    input_ids = np.full((len(encoded), longest), pad_id, dtype=np.int64)
+    attention_mask = np.zeros((len(encoded), longest), dtype=np.int64)
+    for row, ids in enumerate(encoded):
+        input_ids[row, :len(ids)] = ids
+        attention_mask[row, :len(ids)] = 1
+    return input_ids, attention_mask
+
+
+class PipelinedScorer:
+    """
+    流水线情感评分器
+
+    Args:
+        sentiment_pipeline: transformers pipeline（torch）或 OnnxSentimentPipeline，需有 tokenizer 和 model.config
+        queue_size: 阶段间队列长度（批）
+    """
+
+    def __init__(self, sentiment_pipeline, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.pipeline = sentiment_pipeline
+        self.tokenizer = sentiment_pipeline.tokenizer
+        # 与被包装的 pipeline 相同，model_fingerprint 得到同一个缓存键
+        self.model = sentiment_pipeline.model
+        self.backend = getattr(sentiment_pipeline, 'backend', None)
+        self.queue_size = queue_size
+        self.pad_id = getattr(self.tokenizer, 'pad_token_id', None) or 0
+        id2label = {int(k): v for k, v in self.model.config.id2label.items()}
+        self.labels = [id2label[i] for i in range(len(id2label))]
+        # 模型输出列 → [负面, 中性, 正面] 下标
+        self.class_of_column = [LABEL_CLASSES.get(label) for label in self.labels]
+        self.last_stats: Dict[str, Any] = {}
+
+    def _logits(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        logits = getattr(self.pipeline, 'logits', None)
+        if logits is not None:
+            return logits(input_ids, attention_mask)
+        import torch
+        device = getattr(self.pipeline, 'device', None)
+        with torch.inference_mode():
+            output = self.model(input_ids=torch.from_numpy(input_ids).to(device),
+                                attention_mask=torch.from_numpy(attention_mask).to(device))
+        return output.logits.float().cpu().numpy()
+
+    def _postprocess(self, logits: np.ndarray) -> List[Dict[str, Any]]:
+        shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probs = shifted / shifted.sum(axis=1, keepdims=True)
+        top = probs.argmax(axis=1)
+        results = []
+        for row, best in zip(probs, top):
+            by_class = [float('nan')] * 3
+            for col, cls in enumerate(self.class_of_column):
+                if cls is not None:
+                    by_class[cls] = float(row[col])
+            results.append({'label': self.labels[best], 'score': float(row[best]), 'probs': by_class})
+        return results
+
+    def score_texts(self, texts: Sequence[str], batch_size: int,
+                    max_tokens: Optional[int] = None,
+                    max_length: int = MAX_SEQ_LENGTH) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        """
+        流水线评分
+
+        Returns:
+            (结果列表, 每条是否成功)，顺序与 texts 一致
+        """
+        texts = list(texts)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        succeeded = [False] * len(texts)
+        busy = dict.fromkeys(STAGES, 0.0)
+        encoded_q: queue.Queue = queue.Queue(self.queue_size)
+        logits_q: queue.Queue = queue.Queue(self.queue_size)
+
+        def tokenize_stage():
+            chunk = batch_size * TOKENIZE_CHUNK_BATCHES
+            try:
+                for start in range(0, len(texts), chunk):
+                    t0 = time.perf_counter()
+                    block = texts[start:start + chunk]
+                    try:
+                        encoded = self.tokenizer(block, truncation=True, max_length=max_length)['input_ids']
+                    except Exception as e:
+                        logging.error(f"分词失败 [{start}, {start + len(block)}): {e}")
+                        busy['tokenize'] += time.perf_counter() - t0
+                        encoded_q.put((list(range(start, start + len(block))), None, None))
+                        continue
+                    lengths = [len(ids) for ids in encoded]
+                    if max_tokens:
+                        batches = plan_token_batches(lengths, max_tokens, batch_size)
+                    else:
+                        batches = [list(range(i, min(i + batch_size, len(block))))
+                                   for i in range(0, len(block), batch_size)]
+                    busy['tokenize'] += time.perf_counter() - t0
+                    for b in batches:
+                        t0 = time.perf_counter()
+                        input_ids, attention_mask = pad_batch([encoded[j] for j in b], self.pad_id)
+                        busy['tokenize'] += time.perf_counter() - t0
+                        encoded_q.put(([start + j for j in b], input_ids, attention_mask))
+            finally:
+                encoded_q.put(_DONE)
+
+        def postprocess_stage():
+            while True:
+                item = logits_q.get()
+                if item is _DONE:
+                    return
+                indices, logits = item
+                if logits is None:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    for j, result in zip(indices, self._postprocess(logits)):
+                        results[j] = result
+                        succeeded[j] = True
+                except Exception as e:
+                    logging.error(f"后处理批次出错 ({len(indices)} 条): {e}")
+                busy['postprocess'] += time.perf_counter() - t0
+
+        logging.info(f"开始情感分析 (分词 / 推理 / 后处理流水线，共 {len(texts)} 条)...")
+        wall_start = time.perf_counter()
+        threads = [threading.Thread(target=tokenize_stage, name='sentiment-tokenize', daemon=True),
+                   threading.Thread(target=postprocess_stage, name='sentiment-postprocess', daemon=True)]
+        for thread in threads:
+            thread.start()
+        # 推理阶段在当前线程执行
+        item = None
+        try:
+            while True:
+                item = encoded_q.get()
+                if item is _DONE:
+                    break
+                indices, input_ids, attention_mask = item
+                logits = None
+                if input_ids is not None:
+                    t0 = time.perf_counter()
+                    try:
+                        logits = self._logits(input_ids, attention_mask)
+                    except Exception as e:
+                        logging.error(f"推理批次出错 ({len(indices)} 条): {e}")
+                    busy['model'] += time.perf_counter() - t0
+                logits_q.put((indices, logits))
+        finally:
+            logits_q.put(_DONE)
+            # 异常退出时排空队列，避免分词线程阻塞在 put 上
+            while item is not _DONE:
+                item = encoded_q.get()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - wall_start
+
+        for j, result in enumerate(results):
+            if result is None:
+                # 出错批次用默认值填充（succeeded 为 False，不写入缓存）
+                results[j] = {'label': 'LABEL_1', 'score': 0.5, 'probs': None}
+
+        self.last_stats = {
+            'n': len(texts),
+            'wall_seconds': round(wall, 3),
+            'articles_per_sec': round(len(texts) / max(wall, 1e-9), 2),
+            'stages': {
+                stage: {'busy_seconds': round(seconds, 3), 'utilization': round(seconds / max(wall, 1e-9), 3)}
+                for stage, seconds in busy.items()
+            },
+        }
+        logging.info(f"情感分析完成，总耗时: {wall:.2f} 秒，各阶段利用率: "
+                     + ", ".join(f"{s} {v['utilization']:.0%}" for s, v in self.last_stats['stages'].items()))
+        return results, succeeded
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+progress_store.py
+---------------------------------
+SQLite-backed record of finished archive work units for data_pipe.py.
+
+Replaces the `done_units` / `window_pages` lists that used to live in
+checkpoint.json: marking a page done is one indexed insert instead of
+re-serialising the whole checkpoint, so I/O stays linear in the number of
+pages over a large archive plan. The JSON checkpoint keeps counters only.
+
+- `units`: "<query>|<dateStart>|<dateEnd>|<page>" already written (primary key)
+- `windows`: total pages reported by page 1 of each archive window
+- one-time import of the lists from a legacy checkpoint.json
+"""
+
+import logging
+import sqlite3
+from typing import Dict, Iterable, Optional, Set
+
+
+class ProgressStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        # the coordinating thread is the only writer, but need not be the creating thread
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS units (unit TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS windows (window TEXT PRIMARY KEY, pages INTEGER) WITHOUT ROWID")
+        self.conn.commit()
+
+    # ---------- migration ----------
+    def migrate(self, done_units: Iterable[str], window_pages: Dict[str, int]) -> int:
+        """Import the lists of a legacy checkpoint.json; returns the number of units added."""
+        before = self.conn.total_changes
+        self.conn.executemany("INSERT OR IGNORE INTO units (unit) VALUES (?)", ((u,) for u in done_units))
+        added = self.conn.total_changes - before
+        self.conn.executemany("INSERT OR IGNORE INTO windows (window, pages) VALUES (?, ?)", window_pages.items())
+        self.conn.commit()
+        if added:
+            logging.info("Migrated %d finished work units from the JSON checkpoint into %s", added, self.db_path)
+        return added
+
+    # ---------- queries ----------
+    def is_done(self, unit: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM units WHERE unit = ?", (unit,)).fetchone() is not None
+
+    def done_units(self) -> Set[str]:
+        return {r[0] for r in self.conn.execute("SELECT unit FROM units")}
+
+    def window_pages(self, window: str) -> Optional[int]:
+        row = self.conn.execute("SELECT pages FROM windows WHERE window = ?", (window,)).fetchone()
+        return None if row is None else row[0]
+
+    # ---------- writes ----------
+    def mark_done(self, window: str, unit: str, total_pages: Optional[int] = None) -> None:
+        """Record a written unit (and, for page 1, its window's page count) in one transaction."""
+        if total_pages is not None:
+            self.conn.execute("INSERT OR REPLACE INTO windows (window, pages) VALUES (?, ?)", (window, total_pages))
+        self.conn.execute("INSERT OR IGNORE INTO units (unit) VALUES (?)", (unit,))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+query_planner.py
+---------------------------------
+Packs several HK tickers into one EventRegistry keyword query and routes the
+returned articles back to the ticker(s) they mention.
+
+A ticker such as 0700.HK expands to four OR terms (see `ticker_terms`); a batch
+joins the terms of several tickers while staying under `max_terms` OR terms
+and `max_chars` characters per query. Free-text keyword targets are never
+batched. Every page of a batched query costs the same tokens as a single-ticker
+page, so N tickers per query divide the planned token spend by ~N.
+
+Routing scans title/body and concept labels for each ticker's terms (plus
+optional aliases, e.g. company names from the universe file). The best-scoring
+ticker becomes `target`; all matches are kept in `matched_targets`.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Pattern
+
+DEFAULT_MAX_TERMS = 20
+DEFAULT_MAX_CHARS = 1000
+_TICKER_RE = re.compile(r"^\d{1,5}\.HK$")
+
+
+def is_hk_ticker(target: str) -> bool:
+    return isinstance(target, str) and bool(_TICKER_RE.match(target))
+
+
+def ticker_terms(target: str) -> List[str]:
+    # code OR HK code OR generic mention of HK code without dot
+    if not (isinstance(target, str) and target.endswith('.HK')):
+        return [target]
+    core = target.replace('.HK', '')
+    return [core, target, f"\"{core} HK\"", f"\"HK{core}\""]
+
+
+@dataclass
+class QueryBatch:
+    targets: List[str]
+    keywords: str                     # query string sent to EventRegistry
+    patterns: Dict[str, Pattern] = field(default_factory=dict, repr=False)
+
+    @property
+    def is_batched(self) -> bool:
+        return len(self.targets) > 1
+
+
+def _match_pattern(target: str, aliases: Optional[List[str]] = None) -> Pattern:
+    words = [t.strip('"') for t in ticker_terms(target)] + list(aliases or [])
+    alts = "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True) if w)
+    # digits/latin letters must not continue the match (0700 != 07001)
+    return re.compile(rf"(?<![0-9A-Za-z])(?:{alts})(?![0-9A-Za-z])", re.IGNORECASE)
+
+
+def plan_batches(
+    targets: List[str],
+    max_targets: int = 1,
+    max_terms: int = DEFAULT_MAX_TERMS,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    aliases: Optional[Dict[str, List[str]]] = None,
+) -> List[QueryBatch]:
+    """
+    Group targets into queries. `max_targets=1` reproduces one query per target.
+
+    Single-target batches keep the raw target as keywords so the fetcher's
+    expansion (and the response cache key) is unchanged.
+    """
+    aliases = aliases or {}
+    batches: List[QueryBatch] = []
+    current: List[str] = []
+
+    def flush():
+        if current:
+            kw = current[0] if len(current) == 1 else " OR ".join(t for c in current for t in ticker_terms(c))
+            batches.append(QueryBatch(
+                targets=list(current),
+                keywords=kw,
+                patterns={c: _match_pattern(c, aliases.get(c)) for c in current},
+            ))
+            current.clear()
+
+    for tgt in targets:
+        if not is_hk_ticker(tgt):
+            batches.append(QueryBatch(targets=[tgt], keywords=tgt))
+            continue
+        candidate = current + [tgt]
+        terms = [t for c in candidate for t in ticker_terms(c)]
+        if current and (len(candidate) > max_targets or len(terms) > max_terms
+                        or len(" OR ".join(terms)) > max_chars):
+            flush()
+        current.append(tgt)
+    flush()
+    return batches
+
+
+def _concept_labels(article: Dict[str, Any]) -> str:
+    labels = []
+    for c in article.get("concepts") or []:
+        label = c.get("label") if isinstance(c, dict) else None
+        if isinstance(label, dict):
+            labels.extend(str(v) for v in label.values())
+        elif label:
+            labels.append(str(label))
+    return " | ".join(labels)
+
+
+def route_article(article: Dict[str, Any], batch: QueryBatch) -> List[str]:
+    """Return the batch targets mentioned by `article`, best match first."""
+    if not batch.is_batched:
+        return list(batch.targets)
+    title = article.get("title") or ""
+    body = article.get("body") or ""
+    concepts = _concept_labels(article)
+    scored = []
+    for order, tgt in enumerate(batch.targets):
+        pat = batch.patterns[tgt]
+        score = 2 * len(pat.findall(title)) + len(pat.findall(body)) + 2 * len(pat.findall(concepts))
+        if score:
+            scored.append((-score, order, tgt))
+    return [tgt for _, _, tgt in sorted(scored)]
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+score_mappings.py
+---------------------------------
+情感分数映射：把模型输出的三类概率（负面/中性/正面）映射为 [-1, 1] 的情感分数
+
+评分阶段保存完整的类别概率（prob_negative / prob_neutral / prob_positive，float32），
+映射方式改变时只需对已有结果重新计算，无需重新跑 Transformer。
+
+内置映射：
+- legacy           : 与 convert_sentiment_to_score 一致（只用最高类别及其置信度）
+- expected_value   : 类别值 (-1, 0, 1) 的期望，即 p_pos - p_neg
+- polarity         : 去掉中性质量后的正负差 (p_pos - p_neg) / (p_pos + p_neg)
+- entropy_weighted : 期望值乘以 (1 - 归一化熵)，模型越犹豫分数越小
+
+基于概率的映射对没有类别概率的行一律给 NaN；词典级联确定的行（sentiment_source 为 lexicon）
+分数来自词典极性，换映射时保留原 sentiment_score。
+
+新增映射：用 @register_score_mapping("name") 装饰一个 DataFrame -> ndarray 的函数。
+
+用法:
+    python src/score_mappings.py --input data/processed/articles_with_sentiment.csv --mapping entropy_weighted
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import logging
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+PROB_COLUMNS = ['prob_negative', 'prob_neutral', 'prob_positive']
+DEFAULT_SCORE_MAPPING = 'legacy'
+# 词典级联确定的行的 sentiment_source（见 sentiment_cascade.merge_cascade）
+LEXICON_SOURCE = 'lexicon'
+
+# 模型标签 → 类别下标（0 负面，1 中性，2 正面）
+LABEL_CLASSES = {
+    'LABEL_0': 0, 'NEGATIVE': 0, 'negative': 0,
+    'LABEL_1': 1, 'NEUTRAL': 1, 'neutral': 1,
+    'LABEL_2': 2, 'POSITIVE': 2, 'positive': 2,
+}
+
+ScoreMapping = Callable[[pd.DataFrame], np.ndarray]
+SCORE_MAPPINGS: Dict[str, ScoreMapping] = {}
+
+
+def register_score_mapping(name: str) -> Callable[[ScoreMapping], ScoreMapping]:
+    """注册一个分数映射函数"""
+    def decorator(func: ScoreMapping) -> ScoreMapping:
+        SCORE_MAPPINGS[name] = func
+        return func
+    return decorator
+
+
+def _probs(df: pd.DataFrame) -> np.ndarray:
+    missing = [c for c in PROB_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"缺少类别概率列 {missing}，请用当前版本的 sentiment_top.py 重新评分")
+    return df[PROB_COLUMNS].to_numpy(dtype=np.float64)
+
+
+@register_score_mapping('legacy')
+def legacy_score(df: pd.DataFrame) -> np.ndarray:
+    classes = df['sentiment_label'].map(LABEL_CLASSES).to_numpy(dtype=np.float64)
+    confidence = df['sentiment_confidence'].to_numpy(dtype=np.float64)
+    return np.select(
+        [classes == 0, classes == 1, classes == 2],
+        [-confidence, (confidence - 0.5) * 0.2, confidence],
+        default=0.0
+    )
+
+
+@register_score_mapping('expected_value')
+def expected_value_score(df: pd.DataFrame) -> np.ndarray:
+    probs = _probs(df)
+    return probs[:, 2] - probs[:, 0]
+
+
+@register_score_mapping('polarity')
+def polarity_score(df: pd.DataFrame) -> np.ndarray:
+    probs = _probs(df)
+    polar = probs[:, 2] + probs[:, 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 正负概率都为 0 时为 0；没有概率（NaN）时保持 NaN，与其他映射一致
+        return np.where(polar > 0, (probs[:, 2] - probs[:, 0]) / polar, np.where(np.isnan(polar), np.nan, 0.0))
+
+
+@register_score_mapping('entropy_weighted')
+def entropy_weighted_score(df: pd.DataFrame) -> np.ndarray:
+    probs = _probs(df)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        entropy = -np.nansum(np.where(probs > 0, probs * np.log(probs), 0.0), axis=1)
+    return (probs[:, 2] - probs[:, 0]) * (1 - entropy / np.log(3))
+
+
+def apply_score_mapping(df: pd.DataFrame, mapping: str = DEFAULT_SCORE_MAPPING) -> pd.Series:
+    """
+    计算情感分数
+
+    Args:
+        df: 含 sentiment_label / sentiment_confidence（legacy）或类别概率列的数据框
+        mapping: 映射名称（见 SCORE_MAPPINGS）
+
+    Returns:
+        与 df 对齐的 sentiment_score 列（词典级联确定的行保留原分数）
+    """
+    if mapping not in SCORE_MAPPINGS:
+        raise ValueError(f"未知的分数映射: {mapping}，可选: {sorted(SCORE_MAPPINGS)}")
+    scores = pd.Series(SCORE_MAPPINGS[mapping](df), index=df.index, name='sentiment_score')
+    if 'sentiment_source' in df.columns and 'sentiment_score' in df.columns:
+        lexicon = (df['sentiment_source'] == LEXICON_SOURCE).to_numpy()
+        scores[lexicon] = df['sentiment_score'].to_numpy(dtype=np.float64)[lexicon]
+    return scores
+
+
+def probability_frame(results: List[Dict], index: Optional[pd.Index] = None) -> pd.DataFrame:
+    """把评分结果中的 probs 展开为 float32 概率列（缺失为 NaN）"""
+    rows = [r.get('probs') or [np.nan] * 3 for r in results]
+    return pd.DataFrame(np.asarray(rows, dtype=np.float32).reshape(-1, 3), columns=PROB_COLUMNS, index=index)
+
+
+def main():
+    """
+    命令行入口函数：对已评分的结果重新计算 sentiment_score
+    """
+    parser = argparse.ArgumentParser(description="用新的分数映射重新计算情感分数（无需重新推理）")
+    parser.add_argument("--input", "-i", required=True, help="带类别概率的情感结果 CSV")
+    parser.add_argument("--output", "-o", help="输出路径（默认覆盖输入文件）")
+    parser.add_argument("--mapping", "-m", default=DEFAULT_SCORE_MAPPING, choices=sorted(SCORE_MAPPINGS),
+                        help="分数映射")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        df = pd.read_csv(args.input, encoding='utf-8-sig')
+        df['sentiment_score'] = apply_score_mapping(df, args.mapping)
+        output = args.output or args.input
+        df.to_csv(output, index=False, encoding='utf-8-sig')
+        print(f"✅ 已用 {args.mapping} 映射重新计算 {len(df)} 条情感分数")
+        print(f"📁 结果已保存到: {output}")
+
+    except Exception as e:
+        logging.error(f"重新计算失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
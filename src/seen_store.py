@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+seen_store.py
+---------------------------------
+SQLite-backed de-duplication index for article URIs.
+
+Replaces the "load every line of seen_uris.jsonl into a set" approach used by
+data_pipe.py: membership checks hit a primary-key index on disk, so startup
+cost and memory no longer grow with the number of articles ever pulled.
+
+- one table, `uri` as primary key (WITHOUT ROWID -> the index *is* the table)
+- batched lookups / inserts per result page
+- one-time import of a legacy seen_uris.jsonl file
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from typing import Iterable, Optional, Set
+
+# SQLite caps bound parameters per statement (999 on older builds)
+_LOOKUP_CHUNK = 900
+_MIGRATE_CHUNK = 10_000
+
+
+class SeenStore:
+    def __init__(self, db_path: str, legacy_jsonl: Optional[str] = None):
+        self.db_path = db_path
+        # generous busy timeout: sharded archive processes share one index.
+        # callers serialize access (one coordinating thread), which need not be the creating thread
+        self.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (uri TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        if legacy_jsonl:
+            self.migrate_jsonl(legacy_jsonl)
+
+    # ---------- migration ----------
+    def migrate_jsonl(self, path: str) -> int:
+        """Import a legacy seen_uris.jsonl once; later calls are no-ops."""
+        if not os.path.exists(path):
+            return 0
+        key = "migrated:" + os.path.abspath(path)
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+
+        n = 0
+        batch = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    uri = json.loads(line).get("uri")
+                except (ValueError, AttributeError):
+                    continue
+                if uri:
+                    batch.append(uri)
+                if len(batch) >= _MIGRATE_CHUNK:
+                    n += self.add_many(batch, commit=False)
+                    batch = []
+        n += self.add_many(batch, commit=False)
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(n)))
+        self.conn.commit()
+        logging.info("Migrated %d URIs from %s into %s", n, path, self.db_path)
+        return n
+
+    # ---------- queries ----------
+    def __contains__(self, uri: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM seen WHERE uri = ?", (uri,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def contains_many(self, uris: Iterable[str]) -> Set[str]:
+        """Return the subset of `uris` already stored."""
+        uris = list(dict.fromkeys(u for u in uris if u))
+        found: Set[str] = set()
+        for i in range(0, len(uris), _LOOKUP_CHUNK):
+            chunk = uris[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            rows = self.conn.execute(f"SELECT uri FROM seen WHERE uri IN ({marks})", chunk)
+            found.update(r[0] for r in rows)
+        return found
+
+    # ---------- writes ----------
+    def add_many(self, uris: Iterable[str], commit: bool = True) -> int:
+        """Insert URIs (duplicates ignored); returns the number newly added."""
+        before = self.conn.total_changes
+        self.conn.executemany("INSERT OR IGNORE INTO seen (uri) VALUES (?)", ((u,) for u in uris if u))
+        if commit:
+            self.conn.commit()
+        return self.conn.total_changes - before
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_cache.py
+---------------------------------
+Durable cache of sentiment model outputs, so daily rescoring only runs the
+model on articles it has not seen before.
+
+Key   : sha1(model id + revision, preprocessing version, text)
+Value : the full model output for that text, stored as JSON
+
+- SQLite, one row per text, `key` as primary key
+- hit/miss counters for the current session, lifetime totals in `meta`
+- size-based eviction: when the table exceeds `max_entries`, the least
+  recently used rows are deleted (last-use time is refreshed on every hit);
+  inserts bump an upper-bound row count, and the table is only counted
+  exactly when that bound passes `max_entries`
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+DEFAULT_MAX_ENTRIES = 2_000_000
+# SQLite caps bound parameters per statement (999 on older builds)
+_LOOKUP_CHUNK = 900
+
+
+def text_key(model_id: str, preprocess_version: str, text: str) -> str:
+    h = hashlib.sha1()
+    for part in (model_id, preprocess_version, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class SentimentCache:
+    def __init__(self, db_path: str, model_id: str, preprocess_version: str,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = db_path
+        self.model_id = model_id
+        self.preprocess_version = preprocess_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS scores "
+                          "(key TEXT PRIMARY KEY, model_id TEXT, result TEXT, last_used REAL) WITHOUT ROWID")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS scores_last_used ON scores (last_used)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self.conn.commit()
+        # upper bound on the row count (replaced keys are counted as new)
+        self._entries = len(self)
+
+    def key(self, text: str) -> str:
+        return text_key(self.model_id, self.preprocess_version, text)
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def get_many(self, texts: Sequence[str]) -> List[Optional[Any]]:
+        """Cached results aligned with `texts` (None for misses)."""
+        keys = [self.key(t) for t in texts]
+        found: Dict[str, Any] = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), _LOOKUP_CHUNK):
+            chunk = unique[i:i + _LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for key, result in self.conn.execute(f"SELECT key, result FROM scores WHERE key IN ({marks})", chunk):
+                found[key] = json.loads(result)
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE scores SET last_used = ? WHERE key = ?", ((now, k) for k in found))
+            self.conn.commit()
+        out = [found.get(k) for k in keys]
+        hits = sum(r is not None for r in out)
+        self.hits += hits
+        self.misses += len(out) - hits
+        return out
+
+    def put_many(self, texts: Sequence[str], results: Sequence[Any]) -> None:
+        now = time.time()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO scores (key, model_id, result, last_used) VALUES (?, ?, ?, ?)",
+            ((self.key(t), self.model_id, json.dumps(r, ensure_ascii=False), now) for t, r in zip(texts, results)),
+        )
+        self.conn.commit()
+        self._entries += len(results)
+        if self._entries > self.max_entries:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used rows beyond `max_entries`; returns rows removed."""
+        self._entries = len(self)
+        excess = self._entries - self.max_entries
+        if excess <= 0:
+            return 0
+        self.conn.execute("DELETE FROM scores WHERE key IN "
+                          "(SELECT key FROM scores ORDER BY last_used LIMIT ?)", (excess,))
+        self.conn.commit()
+        self._entries = self.max_entries
+        logging.info("Evicted %d least recently used sentiment cache entries", excess)
+        return excess
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        # fold this session's counters into the lifetime totals
+        for name, value in (("hits", self.hits), ("misses", self.misses)):
+            self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                              "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value", (name, value))
+        self.conn.commit()
+        self.conn.close()
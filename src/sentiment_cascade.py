@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_cascade.py
+---------------------------------
+词典优先的级联评分：Loughran-McDonald 词典先给全部新闻打分，信号强且方向明确的新闻直接
+采用词典分数，只有不确定的剩余部分送入 Transformer
+
+判定"明确"的阈值（CascadeThresholds，均可在命令行调整）：
+- min_hits    : 词典命中总数（正面 + 负面）下限
+- min_purity  : 主导方向命中数占全部命中的比例下限
+- min_density : |正面 - 负面| / 总词数 下限（即 lm_score_news 的分数绝对值）
+
+词典确定的新闻 sentiment_score = (正面 - 负面) / (正面 + 负面)，与 Transformer 分数同在 [-1, 1]；
+三类概率列为空，sentiment_source 列标明来源（lexicon / transformer；--backend student 时为 student）。
+
+report 子命令在同一批新闻上比较级联与全部走 Transformer 的基线：送入模型的比例、节省的时间、
+词典判定与模型标签的一致率，以及两者日度因子的秩相关。
+
+用法:
+    python src/sentiment_top.py --cascade --cascade_min_hits 3 --cascade_min_purity 0.8
+    python src/sentiment_cascade.py report --input data/processed/articles_recent_cleaned.csv --sample 2000
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import json
+import logging
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from score_mappings import LEXICON_SOURCE, PROB_COLUMNS
+from sentiment_lm import lm_counts
+
+DEFAULT_LM_POSITIVE = 'data/lm_positive.txt'
+DEFAULT_LM_NEGATIVE = 'data/lm_negative.txt'
+
+
+@dataclass
+class CascadeThresholds:
+    min_hits: int = 3             # 词典命中总数下限
+    min_purity: float = 0.8       # 主导方向命中占比下限
+    min_density: float = 0.02     # |正面 - 负面| / 总词数 下限
+
+
+def lexicon_decisions(
+    texts: pd.Series,
+    positive_words: Iterable[str],
+    negative_words: Iterable[str],
+    thresholds: CascadeThresholds
+) -> pd.DataFrame:
+    """
+    词典打分并判定是否可以跳过 Transformer
+
+    Returns:
+        与 texts 对齐的数据框：lm_pos / lm_neg / lm_words 命中数，
+        lm_polarity（(正面 - 负面) / 命中数），lm_purity（主导方向占比），confident（是否采用词典分数）
+    """
+    decisions = lm_counts(texts, positive_words, negative_words)
+    pos = decisions['lm_pos'].to_numpy(dtype=np.float64)
+    neg = decisions['lm_neg'].to_numpy(dtype=np.float64)
+    hits = pos + neg
+    words = decisions['lm_words'].to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        polarity = np.where(hits > 0, (pos - neg) / hits, 0.0)
+        purity = np.where(hits > 0, np.maximum(pos, neg) / hits, 0.0)
+        density = np.where(words > 0, np.abs(pos - neg) / words, 0.0)
+    decisions['lm_polarity'] = polarity
+    decisions['lm_purity'] = purity
+    decisions['confident'] = ((hits >= thresholds.min_hits) & (purity >= thresholds.min_purity)
+                              & (density >= thresholds.min_density) & (pos != neg))
+    return decisions
+
+
+def merge_cascade(df: pd.DataFrame, decisions: pd.DataFrame, scored: pd.DataFrame,
+                  source: str = 'transformer') -> pd.DataFrame:
+    """
+    合并级联结果，行顺序与 df 一致
+
+    Args:
+        df: 全部新闻
+        decisions: lexicon_decisions 的输出
+        scored: df 中未被词典确定的行（原顺序）经模型评分后的结果
+        source: 模型评分行的 sentiment_source（transformer / student）
+    """
+    confident = decisions['confident'].to_numpy()
+    lexicon = df[confident].copy()
+    polarity = decisions['lm_polarity'].to_numpy()[confident]
+    lexicon['sentiment_label'] = np.where(polarity > 0, 'positive', 'negative')
+    lexicon['sentiment_confidence'] = decisions['lm_purity'].to_numpy()[confident]
+    for col in PROB_COLUMNS:
+        lexicon[col] = np.full(len(lexicon), np.nan, dtype=np.float32)
+    lexicon['sentiment_score'] = polarity
+    lexicon['sentiment_source'] = LEXICON_SOURCE
+    scored = scored.assign(sentiment_source=source)
+
+    merged = pd.concat([scored, lexicon])
+    order = np.concatenate([np.flatnonzero(~confident), np.flatnonzero(confident)])
+    return merged.iloc[np.argsort(order, kind='stable')]
+
+
+def factor_rank_correlation(baseline: pd.DataFrame, cascade: pd.DataFrame) -> Dict[str, Optional[float]]:
+    """两组情感结果的日度因子秩相关（逐日横截面平均，以及全样本），也用于学生模型的保真度报告"""
+    from factors import daily_factor_from_sentiment
+
+    base = daily_factor_from_sentiment(baseline)[['date', 'code', 'sentiment_factor']]
+    casc = daily_factor_from_sentiment(cascade)[['date', 'code', 'sentiment_factor']]
+    merged = base.merge(casc, on=['date', 'code'], suffixes=('_base', '_cascade'))
+    if merged.empty:
+        return {'factor_rank_corr_mean': None, 'factor_rank_corr_pooled': None}
+
+    def _rank_corr(g: pd.DataFrame) -> float:
+        if len(g) < 3:
+            return np.nan
+        return g['sentiment_factor_base'].rank().corr(g['sentiment_factor_cascade'].rank())
+
+    per_day = pd.Series([_rank_corr(g) for _, g in merged.groupby('date')]).dropna()
+    pooled = _rank_corr(merged)
+    return {
+        'factor_rank_corr_mean': round(float(per_day.mean()), 4) if len(per_day) else None,
+        'factor_rank_corr_pooled': None if pd.isna(pooled) else round(float(pooled), 4),
+        'factor_days': int(len(per_day)),
+    }
+
+
+def cascade_report(
+    df: pd.DataFrame,
+    sentiment_pipeline,
+    positive_words: Iterable[str],
+    negative_words: Iterable[str],
+    thresholds: CascadeThresholds,
+    text_column: str = 'body',
+    batch_size: int = 32,
+    max_tokens: Optional[int] = None,
+    score_mapping: str = 'legacy'
+) -> Dict[str, Any]:
+    """
+    级联 vs 全部走 Transformer 的基线（不使用情感缓存，两次计时可比）
+
+    Returns:
+        送入模型的比例、两种方式耗时与节省时间、词典标签与模型一致率、日度因子秩相关
+    """
+    from sentiment_top import add_sentiment_scores, score_articles
+
+    start = time.perf_counter()
+    baseline = add_sentiment_scores(
+        df, score_articles(df, sentiment_pipeline, text_column, batch_size, None, max_tokens), text_column, score_mapping)
+    baseline_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decisions = lexicon_decisions(df[text_column], positive_words, negative_words, thresholds)
+    routed = df[~decisions['confident'].to_numpy()]
+    scored = add_sentiment_scores(
+        routed, score_articles(routed, sentiment_pipeline, text_column, batch_size, None, max_tokens),
+        text_column, score_mapping)
+    cascade = merge_cascade(df, decisions, scored)
+    cascade_seconds = time.perf_counter() - start
+
+    confident = decisions['confident'].to_numpy()
+    agreement = (cascade['sentiment_label'].to_numpy()[confident]
+                 == baseline['sentiment_label'].to_numpy()[confident])
+    report: Dict[str, Any] = {
+        'n': len(df),
+        'thresholds': asdict(thresholds),
+        'routed_to_transformer': len(routed),
+        'routed_fraction': round(len(routed) / max(len(df), 1), 4),
+        'lexicon_label_agreement': round(float(agreement.mean()), 4) if confident.any() else None,
+        'baseline_seconds': round(baseline_seconds, 2),
+        'cascade_seconds': round(cascade_seconds, 2),
+        'time_saved_seconds': round(baseline_seconds - cascade_seconds, 2),
+        'time_saved_fraction': round(1 - cascade_seconds / baseline_seconds, 4) if baseline_seconds > 0 else None,
+    }
+    if {'date', 'code'} <= set(df.columns):
+        report.update(factor_rank_correlation(baseline, cascade))
+    return report
+
+
+def add_cascade_arguments(parser: argparse.ArgumentParser) -> None:
+    """词典文件与级联阈值参数（sentiment_top.py 与本模块共用）"""
+    defaults = CascadeThresholds()
+    parser.add_argument("--lm_positive", default=DEFAULT_LM_POSITIVE, help="L&M 正面词典")
+    parser.add_argument("--lm_negative", default=DEFAULT_LM_NEGATIVE, help="L&M 负面词典")
+    parser.add_argument("--cascade_min_hits", type=int, default=defaults.min_hits, help="词典命中总数下限")
+    parser.add_argument("--cascade_min_purity", type=float, default=defaults.min_purity, help="主导方向命中占比下限")
+    parser.add_argument("--cascade_min_density", type=float, default=defaults.min_density,
+                        help="|正面 - 负面| / 总词数 下限")
+
+
+def thresholds_from_args(args: argparse.Namespace) -> CascadeThresholds:
+    return CascadeThresholds(args.cascade_min_hits, args.cascade_min_purity, args.cascade_min_density)
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="词典优先级联评分：与全部走 Transformer 的基线比较")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_report = sub.add_parser("report", help="送入模型比例、节省时间、日度因子秩相关")
+    p_report.add_argument("--input", "-i", required=True, help="清洗后的新闻 CSV 或 Parquet 目录")
+    p_report.add_argument("--text_column", "-t", default="body", help="文本列名")
+    p_report.add_argument("--sample", type=int, default=2000, help="样本条数（0 表示全部）")
+    p_report.add_argument("--batch_size", "-b", type=int, default=32, help="批大小")
+    p_report.add_argument("--output", "-o", help="报告 JSON 路径（可选）")
+    add_cascade_arguments(p_report)
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        from sentiment_lm import load_lexicon
+        from sentiment_top import DEFAULT_MAX_TOKENS, load_cleaned_data, load_sentiment_model
+
+        df = load_cleaned_data(args.input, args.text_column)
+        if args.sample and len(df) > args.sample:
+            df = df.sample(args.sample, random_state=0).sort_index()
+        report = cascade_report(df, load_sentiment_model(), load_lexicon(args.lm_positive),
+                                load_lexicon(args.lm_negative), thresholds_from_args(args),
+                                args.text_column, args.batch_size, DEFAULT_MAX_TOKENS)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📁 报告已保存到: {args.output}")
+
+    except Exception as e:
+        logging.error(f"执行失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -9,7 +9,9 @@ Loughran & McDonald sentiment analysis using lexicon approach
 import pandas as pd
 import re
 from pathlib import Path
-from typing import List, Dict
+from typing import Iterable, List, Dict
+
+_WORD_RE = re.compile(r'\b\w+\b')
 
 def load_lexicon(file_path: str) -> List[str]:
     """加载情感词典"""
@@ -21,7 +23,28 @@ def load_lexicon(file_path: str) -> List[str]:
         print(f"Warning: Lexicon file {file_path} not found")
         return []
 
-def lm_score_news(news_df: pd.DataFrame, positive_file: str, negative_file: str) -> pd.DataFrame:
+def lm_counts(texts: pd.Series, positive_words: Iterable[str], negative_words: Iterable[str]) -> pd.DataFrame:
+    """
+    逐条统计词典命中数
+
+    Args:
+        texts: 文本列（非字符串视为空文本）
+        positive_words: 正面词
+        negative_words: 负面词
+
+    Returns:
+        与 texts 对齐的 'lm_pos', 'lm_neg', 'lm_words' 三列（正面词数、负面词数、总词数）
+    """
+    positive, negative = set(positive_words), set(negative_words)
+    rows = []
+    for text in texts:
+        words = _WORD_RE.findall(text.lower()) if isinstance(text, str) else []
+        rows.append((sum(w in positive for w in words), sum(w in negative for w in words), len(words)))
+    return pd.DataFrame(rows, columns=['lm_pos', 'lm_neg', 'lm_words'], index=texts.index, dtype='int64')
+
+
+def lm_score_news(news_df: pd.DataFrame, positive_file: str, negative_file: str,
+                  text_column: str = 'headline') -> pd.DataFrame:
     """
     使用Loughran & McDonald词典对新闻进行情感分析
     
@@ -29,6 +52,7 @@ def lm_score_news(news_df: pd.DataFrame, positive_file: str, negative_file: str)
         news_df: 包含 'headline' 列的新闻数据框
         positive_file: 正面词典文件路径
         negative_file: 负面词典文件路径
+        text_column: 文本列名
         
     Returns:
         包含 'score_lm' 列的数据框
@@ -36,27 +60,10 @@ def lm_score_news(news_df: pd.DataFrame, positive_file: str, negative_file: str)
     # 加载词典
     positive_words = load_lexicon(positive_file)
     negative_words = load_lexicon(negative_file)
+    counts = lm_counts(news_df[text_column], positive_words, negative_words)
     
-    def calculate_sentiment_score(text: str) -> float:
-        if not isinstance(text, str):
-            return 0.0
-        
-        text = text.lower()
-        words = re.findall(r'\b\w+\b', text)
-        
-        positive_count = sum(1 for word in words if word in positive_words)
-        negative_count = sum(1 for word in words if word in negative_words)
-        
-        total_words = len(words)
-        if total_words == 0:
-            return 0.0
-        
-        # 计算情感分数 (正面词数 - 负面词数) / 总词数
-        score = (positive_count - negative_count) / total_words
-        return score
-    
-    # 计算情感分数
+    # 计算情感分数 (正面词数 - 负面词数) / 总词数
     news_df = news_df.copy()
-    news_df['score_lm'] = news_df['headline'].apply(calculate_sentiment_score)
+    news_df['score_lm'] = ((counts['lm_pos'] - counts['lm_neg']) / counts['lm_words'].where(counts['lm_words'] > 0)).fillna(0.0)
     
     return news_df
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_profile.py
+---------------------------------
+情感评分参数自动调优：在真实语料样本上网格测量批大小 × 算子内线程数 × 截断长度，
+把本机最优配置写入 profile 文件，sentiment_top.py / sentiment_server.py 启动时自动读取
+
+- 每个配置记录 articles/sec、批延迟 p50 / p99 和峰值 RSS（后台线程采样 /proc/self/statm）
+- 截断长度会改变模型输出：每个 max_length 的标签与 512 基线比较，一致率低于 --min_agreement 的
+  配置不参与选优；--max_rss_mb 可排除内存超限的配置
+- profile 按机器（主机名 / 架构 / CPU 核数）和推理后端分别保存；命令行显式给出的参数优先于 profile
+- 只调单进程内的参数；多进程组合（--workers × --threads_per_worker）用 scripts/bench_sentiment.py 比较
+
+用法:
+    python src/sentiment_profile.py tune --input data/processed/articles_recent_cleaned.csv --n 500
+    python src/sentiment_profile.py tune --backend onnx-int8 --batch_sizes 16 32 64 --threads 2 4 8
+    python src/sentiment_profile.py show
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+DEFAULT_PROFILE_PATH = 'data/processed/sentiment_profile.json'
+DEFAULT_BATCH_SIZES = (8, 16, 32, 64)
+DEFAULT_MAX_LENGTHS = (128, 256, 512)
+DEFAULT_MIN_AGREEMENT = 0.98
+# 峰值 RSS 采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+@dataclass
+class ScoringProfile:
+    batch_size: int
+    num_threads: Optional[int]
+    max_length: int
+    backend: str = 'torch'
+    articles_per_sec: float = 0.0
+    tuned_at: str = ''
+
+
+def machine_key() -> str:
+    """profile 按机器区分：主机名 / 架构 / CPU 核数"""
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}cpu"
+
+
+def _read_profiles(path: str) -> Dict[str, Any]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"无法读取调优 profile {path}: {e}")
+        return {}
+
+
+def load_profile(backend: str = 'torch', path: str = DEFAULT_PROFILE_PATH) -> Optional[ScoringProfile]:
+    """本机、该后端的调优结果（没有时返回 None）"""
+    entry = _read_profiles(path).get(machine_key(), {}).get(backend)
+    if not entry:
+        return None
+    names = {f.name for f in fields(ScoringProfile)}
+    try:
+        return ScoringProfile(**{k: v for k, v in entry.items() if k in names})
+    except TypeError as e:
+        logging.warning(f"调优 profile 格式不正确，忽略: {e}")
+        return None
+
+
+def save_profile(profile: ScoringProfile, path: str = DEFAULT_PROFILE_PATH) -> None:
+    """写入（或覆盖）本机该后端的配置，其他机器 / 后端的条目保留"""
+    profiles = _read_profiles(path)
+    profiles.setdefault(machine_key(), {})[profile.backend] = asdict(profile)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, ensure_ascii=False, indent=2)
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    """调优 profile 参数（sentiment_top.py 与 sentiment_server.py 共用）"""
+    parser.add_argument("--profile", default=DEFAULT_PROFILE_PATH,
+                        help="调优 profile 路径（sentiment_profile.py tune 生成）")
+    parser.add_argument("--no_profile", action="store_true", help="不读取调优 profile，未指定的参数用默认值")
+
+
+def apply_profile(args: argparse.Namespace) -> Optional[ScoringProfile]:
+    """
+    用本机调优结果填充命令行未显式给出（None）的 batch_size / max_length / threads_per_worker
+
+    threads_per_worker 只在单进程（workers == 1）时采用：profile 的线程数是按单进程调出来的
+    """
+    profile = None if args.no_profile else load_profile(args.backend, args.profile)
+    if profile is None:
+        return None
+    if args.batch_size is None:
+        args.batch_size = profile.batch_size
+    if args.max_length is None:
+        args.max_length = profile.max_length
+    if args.threads_per_worker is None and getattr(args, 'workers', 1) == 1:
+        args.threads_per_worker = profile.num_threads
+    logging.info(f"使用调优 profile ({args.profile}): batch_size={args.batch_size}, "
+                 f"max_length={args.max_length}, threads={args.threads_per_worker}")
+    return profile
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）；没有 /proc 时退回 getrusage 的历史峰值"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为 KB，macOS 为字节
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class PeakRss:
+    """with 块内后台线程采样 RSS，退出后 peak_mb 为期间峰值"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while True:
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            if self._stop.wait(self.interval):
+                break
+
+    def __enter__(self) -> 'PeakRss':
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure_config(
+    texts: List[str],
+    sentiment_pipeline,
+    batch_size: int,
+    max_length: int,
+    max_tokens: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    按评分时相同的方式分批，逐批计时
+
+    Returns:
+        articles_per_sec、批延迟 p50 / p99（ms）、峰值 RSS（MB），以及 labels（与 texts 对齐，用于一致率）
+    """
+    from sentiment_top import analyze_sentiment_batch, plan_token_batches, token_lengths
+
+    if max_tokens:
+        batches = plan_token_batches(token_lengths(texts, sentiment_pipeline, max_length), max_tokens, batch_size)
+    else:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+    # 预热一批，首批的初始化开销不计入
+    analyze_sentiment_batch([texts[i] for i in batches[0]], sentiment_pipeline, batch_size, max_length=max_length)
+
+    labels: List[Optional[str]] = [None] * len(texts)
+    latencies: List[float] = []
+    with PeakRss() as rss:
+        start = time.perf_counter()
+        for b in batches:
+            t0 = time.perf_counter()
+            results = analyze_sentiment_batch([texts[i] for i in b], sentiment_pipeline, len(b),
+                                              max_length=max_length)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            for i, r in zip(b, results):
+                labels[i] = r['label']
+        elapsed = time.perf_counter() - start
+    return {
+        'batch_size': batch_size,
+        'max_length': max_length,
+        'batches': len(batches),
+        'articles_per_sec': round(len(texts) / elapsed, 2) if elapsed > 0 else float('inf'),
+        'latency_p50_ms': round(_percentile(latencies, 0.5), 2),
+        'latency_p99_ms': round(_percentile(latencies, 0.99), 2),
+        'peak_rss_mb': round(rss.peak_mb, 1),
+        'labels': labels,
+    }
+
+
+def tune(
+    texts: List[str],
+    loader: Callable[..., Any],
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    thread_counts: Sequence[Optional[int]] = (None,),
+    max_lengths: Sequence[int] = DEFAULT_MAX_LENGTHS,
+    max_tokens: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    网格测量
+
+    Args:
+        texts: 语料样本
+        loader: loader(num_threads=...) 返回情感 pipeline（每个线程数加载一次）
+        batch_sizes / thread_counts / max_lengths: 网格
+        max_tokens: 与评分时相同的 token 上限分批（None / 0 为固定条数分批）
+
+    Returns:
+        每个配置一行；label_agreement 为该 max_length 与 512 基线的标签一致率
+    """
+    from sentiment_top import MAX_SEQ_LENGTH, analyze_sentiment_batch
+
+    rows: List[Dict[str, Any]] = []
+    reference: Optional[List[str]] = None
+    for threads in thread_counts:
+        sentiment_pipeline = loader(num_threads=threads)
+        try:
+            if reference is None:
+                reference = [r['label'] for r in analyze_sentiment_batch(
+                    texts, sentiment_pipeline, max(batch_sizes), max_tokens=max_tokens, max_length=MAX_SEQ_LENGTH)]
+            for max_length in max_lengths:
+                for batch_size in batch_sizes:
+                    row = measure_config(texts, sentiment_pipeline, batch_size, max_length, max_tokens)
+                    labels = row.pop('labels')
+                    row['num_threads'] = threads
+                    row['label_agreement'] = round(sum(a == b for a, b in zip(labels, reference))
+                                                   / max(len(texts), 1), 4)
+                    logging.info(f"threads={threads} max_length={max_length} batch_size={batch_size}: "
+                                 f"{row['articles_per_sec']} articles/sec, p99 {row['latency_p99_ms']} ms, "
+                                 f"RSS {row['peak_rss_mb']} MB")
+                    rows.append(row)
+        finally:
+            if hasattr(sentiment_pipeline, 'close'):
+                sentiment_pipeline.close()
+    return rows
+
+
+def best_config(
+    rows: List[Dict[str, Any]],
+    min_agreement: float = DEFAULT_MIN_AGREEMENT,
+    max_rss_mb: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """满足一致率与内存约束的配置中吞吐最高的一个"""
+    eligible = [r for r in rows if r['label_agreement'] >= min_agreement
+                and (max_rss_mb is None or r['peak_rss_mb'] <= max_rss_mb)]
+    return max(eligible, key=lambda r: r['articles_per_sec']) if eligible else None
+
+
+def _default_thread_counts() -> List[int]:
+    cpus = os.cpu_count() or 1
+    return sorted({1, max(1, cpus // 2), cpus})
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="情感评分参数自动调优（批大小 × 线程数 × 截断长度）")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_tune = sub.add_parser("tune", help="网格测量并把最优配置写入 profile")
+    p_tune.add_argument("--input", "-i", default=None, help="清洗后的新闻 CSV 或 Parquet 目录（默认 sentiment_top 输入）")
+    p_tune.add_argument("--text_column", "-t", default="body", help="文本列名")
+    p_tune.add_argument("--n", type=int, default=500, help="样本条数")
+    p_tune.add_argument("--backend", default="torch", help="推理后端（torch / onnx / onnx-int8）")
+    p_tune.add_argument("--batch_sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES), help="批大小网格")
+    p_tune.add_argument("--threads", type=int, nargs="+", default=None,
+                        help="算子内线程数网格（默认 1、CPU 核数 / 2、CPU 核数）")
+    p_tune.add_argument("--max_lengths", type=int, nargs="+", default=list(DEFAULT_MAX_LENGTHS), help="截断长度网格")
+    p_tune.add_argument("--max_tokens", type=int, default=None,
+                        help="每批 token 上限（默认与 sentiment_top 相同，0 表示按条数分批）")
+    p_tune.add_argument("--min_agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="与 512 截断基线的标签一致率下限")
+    p_tune.add_argument("--max_rss_mb", type=float, default=None, help="峰值内存上限（MB）")
+    p_tune.add_argument("--profile", default=DEFAULT_PROFILE_PATH, help="profile 路径")
+    p_tune.add_argument("--no_save", action="store_true", help="只输出结果，不写 profile")
+    p_tune.add_argument("--output", "-o", help="全部配置结果 JSON 路径（可选）")
+    p_show = sub.add_parser("show", help="显示本机的调优结果")
+    p_show.add_argument("--profile", default=DEFAULT_PROFILE_PATH, help="profile 路径")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        if args.command == "show":
+            profiles = _read_profiles(args.profile).get(machine_key(), {})
+            print(json.dumps({'machine': machine_key(), 'profiles': profiles}, ensure_ascii=False, indent=2))
+            return 0
+
+        from functools import partial
+        from sentiment_top import DEFAULT_INPUT_FILE, DEFAULT_MAX_TOKENS, load_cleaned_data, load_sentiment_model
+
+        df = load_cleaned_data(args.input or DEFAULT_INPUT_FILE, args.text_column)
+        if len(df) > args.n:
+            df = df.sample(args.n, random_state=0).sort_index()
+        texts = df[args.text_column].astype(str).tolist()
+        max_tokens = DEFAULT_MAX_TOKENS if args.max_tokens is None else args.max_tokens
+        rows = tune(texts, partial(load_sentiment_model, args.backend), args.batch_sizes,
+                    args.threads or _default_thread_counts(), args.max_lengths, max_tokens)
+
+        best = best_config(rows, args.min_agreement, args.max_rss_mb)
+        print(json.dumps({'machine': machine_key(), 'n': len(texts), 'best': best, 'configs': rows},
+                         ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, ensure_ascii=False, indent=2)
+        if best is None:
+            print("❌ 没有满足一致率 / 内存约束的配置，profile 未更新")
+            return 1
+        if not args.no_save:
+            save_profile(ScoringProfile(best['batch_size'], best['num_threads'], best['max_length'], args.backend,
+                                        best['articles_per_sec'], datetime.now().isoformat(timespec='seconds')),
+                         args.profile)
+            print(f"📁 最优配置已写入: {args.profile}（{machine_key()} / {args.backend}）")
+
+    except Exception as e:
+        logging.error(f"调优失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_server.py
+---------------------------------
+本地常驻情感评分服务：模型只加载一次，多个脚本 / notebook 共用
+
+- 传输：HTTP（--host / --port）或 Unix socket（--unix_socket），JSON 请求体，只依赖标准库
+- 微批合并：asyncio 请求队列把并发的小请求合并为接近 --max_batch_size 的批次，
+  第一条请求最多等待 --max_wait_ms；推理在单独线程执行，不阻塞事件循环
+- 推理复用 sentiment_top：load_sentiment_model（可多进程 / ONNX / 流水线）+ 持久化情感缓存
+- GET /metrics：请求延迟 p50 / p90 / p99、批大小与批填充率、队列长度
+
+接口:
+    POST /score    {"texts": [...]}  →  {"results": [...], "ok": [...]}
+    GET  /health   →  {"status": "ok", "fingerprint": 模型版本, "max_length": 截断长度, "backend": 推理后端}
+    GET  /metrics  →  延迟分位数与批处理统计
+
+SentimentClient 是对应的轻量客户端；它实现 score_texts，可以像 pipeline 一样交给
+sentiment_top.analyze_sentiment_batch，也是 sentiment_top.py --server 和 run_real.py --server 的实现。
+
+用法:
+    python src/sentiment_server.py --port 8765 --max_batch_size 64 --max_wait_ms 10
+    （--batch_size / --threads_per_worker / --max_length 未给出时取 sentiment_profile.py tune 的本机结果）
+    python src/sentiment_top.py --server http://127.0.0.1:8765
+    python scripts/run_real.py data/sample_news.csv --server unix:///tmp/sentiment.sock
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+from sentiment_profile import add_profile_arguments, apply_profile
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10.0
+# 客户端单次请求的文本条数上限（更大的输入拆成多次请求）
+DEFAULT_REQUEST_SIZE = 256
+# 延迟 / 批大小统计保留最近的样本数
+METRICS_WINDOW = 10000
+
+ScoreFn = Callable[[List[str]], Tuple[List[Dict[str, Any]], List[bool]]]
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+
+def _percentile(sorted_values: Sequence[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return round(sorted_values[idx], 2)
+
+
+class ServerMetrics:
+    """请求延迟与批处理统计（最近 METRICS_WINDOW 个样本）"""
+
+    def __init__(self, max_batch_size: int):
+        self.max_batch_size = max_batch_size
+        self.started = time.time()
+        self.requests = 0
+        self.texts = 0
+        self.errors = 0
+        self.batches = 0
+        self.latencies_ms: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self.batch_sizes: Deque[int] = deque(maxlen=METRICS_WINDOW)
+        self.requests_per_batch: Deque[int] = deque(maxlen=METRICS_WINDOW)
+
+    def record_request(self, n_texts: int, latency_ms: float, failed: bool = False) -> None:
+        self.requests += 1
+        self.texts += n_texts
+        self.errors += failed
+        self.latencies_ms.append(latency_ms)
+
+    def record_batch(self, n_texts: int, n_requests: int) -> None:
+        self.batches += 1
+        self.batch_sizes.append(n_texts)
+        self.requests_per_batch.append(n_requests)
+
+    def snapshot(self, queue_depth: int = 0) -> Dict[str, Any]:
+        latencies = sorted(self.latencies_ms)
+        sizes = list(self.batch_sizes)
+        return {
+            'uptime_sec': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'texts': self.texts,
+            'errors': self.errors,
+            'batches': self.batches,
+            'queue_depth': queue_depth,
+            'latency_ms': {'p50': _percentile(latencies, 0.5), 'p90': _percentile(latencies, 0.9),
+                           'p99': _percentile(latencies, 0.99), 'max': latencies[-1] if latencies else None},
+            'batch_size_mean': round(sum(sizes) / len(sizes), 2) if sizes else None,
+            'batch_fill_mean': (round(sum(min(n, self.max_batch_size) for n in sizes)
+                                      / (len(sizes) * self.max_batch_size), 4) if sizes else None),
+            'requests_per_batch_mean': (round(sum(self.requests_per_batch) / len(self.requests_per_batch), 2)
+                                        if self.requests_per_batch else None),
+            'max_batch_size': self.max_batch_size,
+        }
+
+
+class MicroBatcher:
+    """
+    把并发请求合并成模型批次
+
+    第一条请求到达后继续收集，直到累计条数达到 max_batch_size 或等待超过 max_wait_ms；
+    合并后的批次在单个推理线程中评分，结果按请求拆回。
+    """
+
+    def __init__(self, score_fn: ScoreFn, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, metrics: Optional[ServerMetrics] = None):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServerMetrics(max_batch_size)
+        self.queue: Optional[asyncio.Queue] = None
+        # 模型只在这一个线程里使用（SQLite 缓存连接同样要求单线程）
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sentiment-model')
+
+    async def submit(self, texts: List[str]) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self) -> None:
+        self.queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            n_texts = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while n_texts < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_texts += len(item[0])
+
+            texts = [t for item_texts, _ in batch for t in item_texts]
+            self.metrics.record_batch(len(texts), len(batch))
+            try:
+                results, ok = await loop.run_in_executor(self.executor, self.score_fn, texts)
+            except Exception as e:
+                logging.error(f"评分批次出错 ({len(texts)} 条): {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for item_texts, future in batch:
+                end = start + len(item_texts)
+                if not future.done():
+                    future.set_result((results[start:end], ok[start:end]))
+                start = end
+
+
+class SentimentServer:
+    """
+    HTTP / Unix socket 评分服务
+
+    Args:
+        score_fn: texts -> (结果列表, 每条是否成功)，在推理线程中调用
+        fingerprint: 模型版本（客户端据此选择情感缓存）
+        max_batch_size: 合并批次的目标条数
+        max_wait_ms: 第一条请求的最长等待时间
+        max_length: score_fn 使用的截断长度（客户端据此选择情感缓存版本）
+        backend: 推理后端（客户端据此标注 sentiment_source）
+    """
+
+    def __init__(self, score_fn: ScoreFn, fingerprint: str, max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_length: Optional[int] = None,
+                 backend: Optional[str] = None):
+        self.fingerprint = fingerprint
+        self.max_length = max_length
+        self.backend = backend
+        self.metrics = ServerMetrics(max_batch_size)
+        self.batcher = MicroBatcher(score_fn, max_batch_size, max_wait_ms, self.metrics)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stopped: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'fingerprint': self.fingerprint, 'max_length': self.max_length,
+                         'backend': self.backend}
+        if method == 'GET' and path == '/metrics':
+            return 200, self.metrics.snapshot(self.batcher.queue.qsize())
+        if method == 'POST' and path == '/score':
+            start = time.perf_counter()
+            try:
+                texts = json.loads(body or b'{}')['texts']
+                if not isinstance(texts, list):
+                    raise TypeError("texts 必须是列表")
+                texts = [str(t) for t in texts]
+            except Exception as e:
+                return 400, {'error': f"请求体应为 {{\"texts\": [...]}}: {e}"}
+            try:
+                results, ok = await self.batcher.submit(texts)
+            except Exception as e:
+                self.metrics.record_request(len(texts), (time.perf_counter() - start) * 1000, failed=True)
+                return 500, {'error': str(e)}
+            self.metrics.record_request(len(texts), (time.perf_counter() - start) * 1000)
+            return 200, {'results': results, 'ok': ok}
+        return 404, {'error': f"未知路径: {method} {path}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self._route(method, path.split('?', 1)[0], body)
+                data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                             f"Content-Type: application/json; charset=utf-8\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                    unix_socket: Optional[str] = None, ready: Optional[Callable[[str], None]] = None) -> None:
+        """运行直到 stop()；ready(url) 在开始监听后调用"""
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        batcher_task = asyncio.create_task(self.batcher.run())
+        try:
+            if unix_socket:
+                server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+                url = f"unix://{unix_socket}"
+            else:
+                server = await asyncio.start_server(self._handle, host, port)
+                url = f"http://{host}:{server.sockets[0].getsockname()[1]}"
+            logging.info(f"情感评分服务已启动: {url}")
+            if ready:
+                ready(url)
+            async with server:
+                await self._stopped.wait()
+        finally:
+            batcher_task.cancel()
+            self.batcher.executor.shutdown(wait=True)
+
+    def run_in_thread(self, host: str = DEFAULT_HOST, port: int = 0, unix_socket: Optional[str] = None,
+                      timeout: float = 30.0) -> str:
+        """
+        在后台线程中启动（notebook / 测试用），返回服务地址
+
+        启动失败（端口被占用、socket 路径无效等）时在调用方重新抛出该异常；timeout 秒内未开始监听则抛 RuntimeError
+        """
+        started = threading.Event()
+        address: List[str] = []
+        failure: List[BaseException] = []
+
+        def _ready(url: str) -> None:
+            address.append(url)
+            started.set()
+
+        def _run() -> None:
+            try:
+                asyncio.run(self.serve(host, port, unix_socket, _ready))
+            except BaseException as e:
+                # 交给调用方重新抛出
+                failure.append(e)
+            finally:
+                started.set()
+
+        self._thread = threading.Thread(target=_run, name='sentiment-server', daemon=True)
+        self._thread.start()
+        if not started.wait(timeout):
+            raise RuntimeError(f"情感评分服务 {timeout:.0f} 秒内未启动")
+        if not address:
+            self._thread.join()
+            self._thread = None
+            if failure:
+                raise failure[0]
+            raise RuntimeError("情感评分服务启动失败")
+        return address[0]
+
+    def stop(self) -> None:
+        if self._loop is not None and self._stopped is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def model_score_fn(sentiment_pipeline, batch_size: int, max_tokens: Optional[int],
+                   cache_db: Optional[str] = None, cache_max_entries: Optional[int] = None,
+                   max_length: Optional[int] = None) -> ScoreFn:
+    """包装 sentiment_top 的批量评分；情感缓存在推理线程中首次使用时打开"""
+    from sentiment_top import MAX_SEQ_LENGTH, _analyze_with_status, open_sentiment_cache
+
+    max_length = max_length or MAX_SEQ_LENGTH
+    state: Dict[str, Any] = {}
+
+    def score(texts: List[str]) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        if cache_db and 'cache' not in state:
+            kwargs = {'max_entries': cache_max_entries} if cache_max_entries else {}
+            state['cache'] = open_sentiment_cache(sentiment_pipeline, cache_db, max_length=max_length, **kwargs)
+        return _analyze_with_status(texts, sentiment_pipeline, batch_size, state.get('cache'), max_tokens, max_length)
+
+    return score
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class SentimentClient:
+    """
+    评分服务客户端
+
+    Args:
+        url: http://host:port 或 unix:///path/to/socket
+        timeout: 单次请求超时（秒）
+        request_size: 单次请求的文本条数上限
+    """
+
+    def __init__(self, url: str, timeout: float = 600, request_size: int = DEFAULT_REQUEST_SIZE):
+        self.url = url
+        self.timeout = timeout
+        self.request_size = request_size
+        # 与服务端模型、截断长度一致，客户端侧的情感缓存键不会和本地模型混用
+        health = self.health()
+        self.fingerprint = health['fingerprint']
+        self.max_length = health.get('max_length')
+        # 学生模型服务的结果不能再作为蒸馏的教师输出
+        self.backend = health.get('backend')
+        self.sentiment_source = 'student' if self.backend == 'student' else 'transformer'
+
+    def _connection(self) -> http.client.HTTPConnection:
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'unix':
+            return _UnixHTTPConnection(parsed.path, self.timeout)
+        return http.client.HTTPConnection(parsed.hostname, parsed.port or DEFAULT_PORT, timeout=self.timeout)
+
+    def _request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        conn = self._connection()
+        try:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else None
+            headers = {'Content-Type': 'application/json', 'Connection': 'close'}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = json.loads(response.read() or b'{}')
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise RuntimeError(f"情感评分服务返回 {response.status}: {data.get('error')}")
+        return data
+
+    def health(self) -> Dict[str, Any]:
+        return self._request('GET', '/health')
+
+    def metrics(self) -> Dict[str, Any]:
+        return self._request('GET', '/metrics')
+
+    def score_texts(self, texts: Sequence[str], batch_size: Optional[int] = None, max_tokens: Optional[int] = None,
+                    max_length: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        """按 request_size 分段请求（批大小与截断长度由服务端决定），返回 (结果列表, 每条是否成功)"""
+        texts = list(texts)
+        results: List[Dict[str, Any]] = []
+        ok: List[bool] = []
+        for start in range(0, len(texts), self.request_size):
+            data = self._request('POST', '/score', {'texts': texts[start:start + self.request_size]})
+            results.extend(data['results'])
+            ok.extend(data['ok'])
+        return results, ok
+
+    def score(self, texts: Sequence[str]) -> List[Dict[str, Any]]:
+        return self.score_texts(texts)[0]
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="本地常驻情感评分服务（微批合并）")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--unix_socket", help="改为监听 Unix socket 路径")
+    parser.add_argument("--max_batch_size", type=int, default=DEFAULT_MAX_BATCH_SIZE, help="合并批次的目标条数")
+    parser.add_argument("--max_wait_ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="第一条请求的最长等待时间（毫秒）")
+    parser.add_argument("--batch_size", "-b", type=int, default=None,
+                        help="合并批次内的模型批大小（默认取调优 profile，没有时等于 --max_batch_size）")
+    parser.add_argument("--max_length", type=int, default=None, help="每条文本截断的 token 数（默认取调优 profile）")
+    parser.add_argument("--max_tokens", type=int, default=None,
+                        help="每批 padding 后 token 上限（默认 sentiment_top.DEFAULT_MAX_TOKENS，0 表示按条数分批）")
+    parser.add_argument("--backend", default='torch', help="推理后端（torch / onnx / onnx-int8 / student）")
+    parser.add_argument("--student_model", default=None, help="学生模型路径（--backend student）")
+    parser.add_argument("--workers", "-w", type=int, default=1, help="推理进程数")
+    parser.add_argument("--threads_per_worker", type=int, help="每个进程的算子内线程数")
+    parser.add_argument("--pipelined", action="store_true", help="分词 / 推理 / 后处理流水线")
+    parser.add_argument("--cache_db", default=None, help="持久化情感缓存路径（默认 sentiment_top.DEFAULT_CACHE_DB）")
+    parser.add_argument("--no_cache", action="store_true", help="不使用情感缓存")
+    add_profile_arguments(parser)
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    server = None
+    try:
+        from sentiment_top import (DEFAULT_CACHE_DB, DEFAULT_MAX_TOKENS, MAX_SEQ_LENGTH, load_sentiment_model,
+                                   model_fingerprint)
+
+        apply_profile(args)
+        max_length = args.max_length or MAX_SEQ_LENGTH
+        kwargs = {'student_model': args.student_model} if args.student_model else {}
+        sentiment_pipeline = load_sentiment_model(args.backend, num_threads=args.threads_per_worker,
+                                                  workers=args.workers, pipelined=args.pipelined, **kwargs)
+        max_tokens = DEFAULT_MAX_TOKENS if args.max_tokens is None else args.max_tokens
+        cache_db = None if args.no_cache else (args.cache_db or DEFAULT_CACHE_DB)
+        score_fn = model_score_fn(sentiment_pipeline, args.batch_size or args.max_batch_size, max_tokens, cache_db,
+                                  max_length=max_length)
+        server = SentimentServer(score_fn, model_fingerprint(sentiment_pipeline), args.max_batch_size,
+                                 args.max_wait_ms, max_length, args.backend)
+        print("✅ 模型已加载，按 Ctrl+C 停止服务")
+        asyncio.run(server.serve(args.host, args.port, args.unix_socket))
+
+    except KeyboardInterrupt:
+        if server is not None:
+            print(f"\n📊 服务统计: {json.dumps(server.metrics.snapshot(), ensure_ascii=False)}")
+    except Exception as e:
+        logging.error(f"服务启动失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
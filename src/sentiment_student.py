@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_student.py
+---------------------------------
+蒸馏学生模型：用 Transformer 的三类概率作为软标签，训练哈希 n-gram 线性模型，
+覆盖全市场新闻量时代替 CPU 上的 RoBERTa（每条亚毫秒级）
+
+- 特征：小写词的 1-gram + 2-gram，crc32 哈希到 2^n_bits 维，次线性词频后 L2 归一化；
+  只取前 max_words 个词，与 Transformer 的截断对应
+- 模型：多项逻辑回归（softmax），对教师概率做交叉熵，小批量 AdaGrad + L2；只依赖 numpy
+- 训练数据：sentiment_top.py 输出的 articles_with_sentiment.csv（需要 prob_* 列；
+  词典级联行没有概率，自动跳过）
+- StudentScorer 与其他评分器接口一致（score_texts），sentiment_top.py --backend student 直接使用，
+  情感缓存、词典级联、评分服务都可以照常工作
+- 保真度报告：留出集上与教师的标签一致率、分数相关、概率偏差、日度因子秩相关，以及吞吐与加速比
+
+用法:
+    python src/sentiment_student.py train --input data/processed/articles_with_sentiment.csv
+    python src/sentiment_student.py report --input data/processed/articles_with_sentiment.csv --teacher_sample 200
+    python src/sentiment_top.py --backend student --cascade
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from score_mappings import PROB_COLUMNS, apply_score_mapping, probability_frame
+
+DEFAULT_STUDENT_MODEL = 'models/student/sentiment_student.npz'
+DEFAULT_N_BITS = 20
+DEFAULT_MAX_WORDS = 400
+LABELS = ('negative', 'neutral', 'positive')
+# 特征定义版本，修改分词 / 哈希方式时递增（旧模型拒绝加载）
+FEATURE_VERSION = 'crc32-uni-bi-v1'
+
+_WORD_RE = re.compile(r"\w+(?:'\w+)?")
+
+
+def hash_features(texts: Sequence[str], n_bits: int = DEFAULT_N_BITS,
+                  max_words: int = DEFAULT_MAX_WORDS) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    文本 → CSR 稀疏特征
+
+    Returns:
+        (indptr, indices, values)：第 i 条的特征为 indices[indptr[i]:indptr[i+1]]
+    """
+    mask = (1 << n_bits) - 1
+    indptr = [0]
+    indices: List[np.ndarray] = []
+    values: List[np.ndarray] = []
+    for text in texts:
+        words = _WORD_RE.findall(text.lower())[:max_words] if isinstance(text, str) else []
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        counts: Dict[int, int] = {}
+        for g in grams:
+            h = zlib.crc32(g.encode('utf-8')) & mask
+            counts[h] = counts.get(h, 0) + 1
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        val = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+        norm = np.sqrt((val * val).sum())
+        indices.append(idx)
+        values.append(val / norm if norm > 0 else val)
+        indptr.append(indptr[-1] + len(idx))
+    if not indices:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return (np.asarray(indptr, dtype=np.int64), np.concatenate(indices),
+            np.concatenate(values).astype(np.float32))
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    z = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return z / z.sum(axis=1, keepdims=True)
+
+
+class StudentModel:
+    """哈希特征上的三类线性 softmax 模型"""
+
+    def __init__(self, n_bits: int = DEFAULT_N_BITS, max_words: int = DEFAULT_MAX_WORDS,
+                 weights: Optional[np.ndarray] = None, bias: Optional[np.ndarray] = None):
+        self.n_bits = n_bits
+        self.max_words = max_words
+        self.weights = weights if weights is not None else np.zeros((1 << n_bits, len(LABELS)), dtype=np.float32)
+        self.bias = bias if bias is not None else np.zeros(len(LABELS), dtype=np.float32)
+
+    def _logits(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        n = len(indptr) - 1
+        rows = np.repeat(np.arange(n), np.diff(indptr))
+        contrib = self.weights[indices] * values[:, None]
+        logits = np.empty((n, len(LABELS)), dtype=np.float64)
+        for k in range(len(LABELS)):
+            logits[:, k] = np.bincount(rows, weights=contrib[:, k], minlength=n)
+        return logits + self.bias
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """[负面, 中性, 正面] 概率，形状 (len(texts), 3)"""
+        return _softmax(self._logits(*hash_features(texts, self.n_bits, self.max_words)))
+
+    def fit(self, texts: Sequence[str], soft_labels: np.ndarray, epochs: int = 5, batch_size: int = 256,
+            learning_rate: float = 0.5, l2: float = 1e-6, seed: int = 0) -> List[float]:
+        """
+        小批量 AdaGrad 拟合教师概率（交叉熵）
+
+        Returns:
+            每轮的平均交叉熵
+        """
+        indptr, indices, values = hash_features(texts, self.n_bits, self.max_words)
+        targets = np.asarray(soft_labels, dtype=np.float64)
+        targets = targets / targets.sum(axis=1, keepdims=True)
+        grad_sq_w = np.full(self.weights.shape, 1e-8, dtype=np.float32)
+        grad_sq_b = np.full(self.bias.shape, 1e-8, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        history: List[float] = []
+        n = len(targets)
+        for epoch in range(epochs):
+            loss = 0.0
+            order = rng.permutation(n)
+            for start in range(0, n, batch_size):
+                rows = order[start:start + batch_size]
+                b_indptr, b_indices, b_values = _take_rows(indptr, indices, values, rows)
+                probs = _softmax(self._logits(b_indptr, b_indices, b_values))
+                y = targets[rows]
+                loss += float(-(y * np.log(np.clip(probs, 1e-12, None))).sum())
+                g = (probs - y) / len(rows)
+
+                # 稀疏梯度：同一特征在批内出现多次时合并
+                feat, inverse = np.unique(b_indices, return_inverse=True)
+                row_of = np.repeat(np.arange(len(rows)), np.diff(b_indptr))
+                grad = np.empty((len(feat), len(LABELS)), dtype=np.float64)
+                for k in range(len(LABELS)):
+                    grad[:, k] = np.bincount(inverse, weights=g[row_of, k] * b_values, minlength=len(feat))
+                grad += l2 * self.weights[feat]
+                grad_sq_w[feat] += (grad * grad).astype(np.float32)
+                self.weights[feat] -= (learning_rate * grad / np.sqrt(grad_sq_w[feat])).astype(np.float32)
+                grad_b = g.sum(axis=0)
+                grad_sq_b += (grad_b * grad_b).astype(np.float32)
+                self.bias -= (learning_rate * grad_b / np.sqrt(grad_sq_b)).astype(np.float32)
+            history.append(loss / max(n, 1))
+            logging.info(f"第 {epoch + 1} / {epochs} 轮，平均交叉熵 {history[-1]:.4f}")
+        return history
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        config = {'n_bits': self.n_bits, 'max_words': self.max_words, 'feature_version': FEATURE_VERSION}
+        # 只保存非零行，2^20 维的权重大多为 0
+        rows = np.flatnonzero(np.any(self.weights != 0, axis=1))
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, rows=rows, weights=self.weights[rows], bias=self.bias,
+                                config=np.array(json.dumps(config)))
+
+    @classmethod
+    def load(cls, path: str) -> 'StudentModel':
+        with np.load(path) as data:
+            config = json.loads(str(data['config']))
+            if config.get('feature_version') != FEATURE_VERSION:
+                raise ValueError(f"学生模型特征版本 {config.get('feature_version')} 与当前 {FEATURE_VERSION} 不一致，"
+                                 f"请重新训练")
+            weights = np.zeros((1 << config['n_bits'], len(LABELS)), dtype=np.float32)
+            weights[data['rows']] = data['weights']
+            return cls(config['n_bits'], config['max_words'], weights, data['bias'].astype(np.float32))
+
+
+def _take_rows(indptr: np.ndarray, indices: np.ndarray, values: np.ndarray,
+               rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """从 CSR 中取出若干行"""
+    starts, ends = indptr[rows], indptr[rows + 1]
+    lengths = ends - starts
+    sub_indptr = np.concatenate([[0], np.cumsum(lengths)])
+    positions = np.repeat(starts - sub_indptr[:-1], lengths) + np.arange(sub_indptr[-1])
+    return sub_indptr, indices[positions], values[positions]
+
+
+class StudentScorer:
+    """
+    学生模型评分器，接口与多进程推理池 / 流水线评分器相同
+
+    Args:
+        model_path: train 子命令保存的 .npz 模型
+    """
+
+    backend = 'student'
+    sentiment_source = 'student'
+
+    def __init__(self, model_path: str = DEFAULT_STUDENT_MODEL):
+        self.model = StudentModel.load(model_path)
+        with open(model_path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()[:12]
+        # 缓存键：重新训练后的模型不会命中旧结果
+        self.fingerprint = f"student/{Path(model_path).stem}@{digest}"
+
+    def score_texts(self, texts: Sequence[str], batch_size: int = 1024, max_tokens: Optional[int] = None,
+                    max_length: Optional[int] = None) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        """
+        Returns:
+            (结果列表, 每条是否成功)；批大小只影响内存，max_tokens / max_length 不适用（截断由 max_words 决定）
+        """
+        texts = list(texts)
+        results: List[Dict[str, Any]] = []
+        # 学生模型很便宜，用更大的批摊薄 numpy 调用开销
+        step = max(batch_size, 1024)
+        for start in range(0, len(texts), step):
+            probs = self.model.predict_proba(texts[start:start + step])
+            for row in probs:
+                best = int(row.argmax())
+                results.append({'label': LABELS[best], 'score': float(row[best]), 'probs': [float(p) for p in row]})
+        return results, [True] * len(texts)
+
+
+def load_teacher_outputs(input_file: str, text_column: str = 'body') -> pd.DataFrame:
+    """
+    读取 sentiment_top.py 的输出，只保留 transformer 评分的行（词典级联行没有概率）
+
+    没有 sentiment_source 列（无法确认来源）或含学生模型结果的文件直接拒绝，避免学生用自己的输出再训练
+    """
+    df = pd.read_csv(input_file, encoding='utf-8-sig')
+    missing = [c for c in [text_column, 'sentiment_source'] + PROB_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"缺少列 {missing}，请用当前版本的 sentiment_top.py 重新评分")
+    if (df['sentiment_source'] == StudentScorer.sentiment_source).any():
+        raise ValueError(f"{input_file} 含学生模型评分结果，不能作为教师输出（请用 transformer 后端重新评分）")
+    df = df.dropna(subset=[text_column] + PROB_COLUMNS)
+    df = df[df['sentiment_source'] == 'transformer']
+    logging.info(f"教师输出: {len(df)} 条")
+    return df.reset_index(drop=True)
+
+
+def fidelity_report(
+    df: pd.DataFrame,
+    scorer: StudentScorer,
+    text_column: str = 'body',
+    score_mapping: str = 'legacy',
+    teacher_articles_per_sec: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    学生模型与教师在同一批新闻上的比较
+
+    Args:
+        df: 含教师 sentiment_label / sentiment_confidence / prob_* 列的留出集
+        scorer: 学生模型
+        teacher_articles_per_sec: 教师吞吐（用于加速比，可选）
+
+    Returns:
+        标签一致率、分数相关、概率偏差、日度因子秩相关、吞吐与加速比
+    """
+    from sentiment_cascade import factor_rank_correlation
+    from sentiment_top import add_sentiment_scores
+
+    texts = df[text_column].astype(str).tolist()
+    start = time.perf_counter()
+    results, _ = scorer.score_texts(texts)
+    elapsed = time.perf_counter() - start
+    student = add_sentiment_scores(df.drop(columns=['sentiment_score'], errors='ignore'), results, text_column,
+                                   score_mapping)
+    teacher = df.copy()
+    teacher['sentiment_score'] = apply_score_mapping(teacher, score_mapping)
+
+    teacher_probs = df[PROB_COLUMNS].to_numpy(dtype=np.float64)
+    student_probs = probability_frame(results).to_numpy(dtype=np.float64)
+    teacher_labels = teacher_probs.argmax(axis=1)
+    speed = len(texts) / elapsed if elapsed > 0 else float('inf')
+    report: Dict[str, Any] = {
+        'n': len(df),
+        'label_agreement': round(float(np.mean(student_probs.argmax(axis=1) == teacher_labels)), 4),
+        'score_correlation': round(float(student['sentiment_score'].corr(teacher['sentiment_score'])), 4),
+        'score_rank_correlation': round(float(student['sentiment_score'].rank().corr(
+            teacher['sentiment_score'].rank())), 4),
+        'mean_prob_diff': round(float(np.abs(student_probs - teacher_probs).mean()), 4),
+        'max_prob_diff': round(float(np.abs(student_probs - teacher_probs).max()), 4),
+        'articles_per_sec': round(speed, 2),
+        'ms_per_article': round(1000 / speed, 4) if speed else None,
+    }
+    if teacher_articles_per_sec:
+        report['teacher_articles_per_sec'] = round(teacher_articles_per_sec, 2)
+        report['speedup'] = round(speed / teacher_articles_per_sec, 1)
+    if {'date', 'code'} <= set(df.columns):
+        report.update(factor_rank_correlation(teacher, student))
+    return report
+
+
+def teacher_throughput(texts: List[str], backend: str = 'torch', batch_size: int = 32) -> float:
+    """在样本上实测教师模型吞吐（articles/sec）"""
+    from sentiment_top import DEFAULT_MAX_TOKENS, analyze_sentiment_batch, load_sentiment_model
+
+    sentiment_pipeline = load_sentiment_model(backend)
+    try:
+        # 预热一批
+        analyze_sentiment_batch(texts[:batch_size], sentiment_pipeline, batch_size)
+        start = time.perf_counter()
+        analyze_sentiment_batch(texts, sentiment_pipeline, batch_size, max_tokens=DEFAULT_MAX_TOKENS)
+        return len(texts) / (time.perf_counter() - start)
+    finally:
+        if hasattr(sentiment_pipeline, 'close'):
+            sentiment_pipeline.close()
+
+
+def _teacher_speed(args: argparse.Namespace, df: pd.DataFrame) -> Optional[float]:
+    """--teacher_sample 时实测教师吞吐，否则取本机调优 profile 记录的吞吐"""
+    if args.teacher_sample:
+        sample = df[args.text_column].astype(str).sample(min(args.teacher_sample, len(df)), random_state=0)
+        return teacher_throughput(sample.tolist(), args.teacher_backend)
+    from sentiment_profile import load_profile
+    profile = load_profile(args.teacher_backend)
+    if profile is not None and profile.articles_per_sec:
+        logging.info(f"教师吞吐取自调优 profile: {profile.articles_per_sec} articles/sec")
+        return profile.articles_per_sec
+    return None
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="蒸馏学生模型：训练 / 与教师的保真度和吞吐报告")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_train = sub.add_parser("train", help="用 Transformer 输出训练学生模型，并在留出集上出报告")
+    p_report = sub.add_parser("report", help="已训练的学生模型与教师输出比较")
+    for p in (p_train, p_report):
+        p.add_argument("--input", "-i", default='data/processed/articles_with_sentiment.csv',
+                       help="sentiment_top.py 的输出（含 prob_* 列）")
+        p.add_argument("--text_column", "-t", default="body", help="文本列名")
+        p.add_argument("--model", "-m", default=DEFAULT_STUDENT_MODEL, help="学生模型路径")
+        p.add_argument("--score_mapping", default='legacy', help="比较分数时使用的映射")
+        p.add_argument("--teacher_backend", default='torch', help="教师推理后端（吞吐对比用）")
+        p.add_argument("--teacher_sample", type=int, default=0,
+                       help="实测教师吞吐的样本条数（0 表示取调优 profile 中的吞吐）")
+        p.add_argument("--output", "-o", help="报告 JSON 路径（可选）")
+    p_train.add_argument("--holdout", type=float, default=0.1, help="留出比例")
+    p_train.add_argument("--n_bits", type=int, default=DEFAULT_N_BITS, help="哈希维度 2^n_bits")
+    p_train.add_argument("--max_words", type=int, default=DEFAULT_MAX_WORDS, help="每条只取前 N 个词")
+    p_train.add_argument("--epochs", type=int, default=5, help="训练轮数")
+    p_train.add_argument("--learning_rate", type=float, default=0.5, help="AdaGrad 学习率")
+    p_train.add_argument("--l2", type=float, default=1e-6, help="L2 正则")
+    p_report.add_argument("--sample", type=int, default=0, help="样本条数（0 表示全部）")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        df = load_teacher_outputs(args.input, args.text_column)
+        if args.command == "train":
+            holdout = np.random.default_rng(0).random(len(df)) < args.holdout
+            train, test = df[~holdout], df[holdout]
+            model = StudentModel(args.n_bits, args.max_words)
+            model.fit(train[args.text_column].astype(str).tolist(), train[PROB_COLUMNS].to_numpy(),
+                      epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2)
+            model.save(args.model)
+            print(f"📁 学生模型已保存到: {args.model}（训练 {len(train)} 条，留出 {len(test)} 条）")
+            evaluated = test if len(test) else train
+        else:
+            evaluated = df.sample(args.sample, random_state=0) if args.sample and len(df) > args.sample else df
+
+        report = fidelity_report(evaluated, StudentScorer(args.model), args.text_column, args.score_mapping,
+                                 _teacher_speed(args, df))
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"📁 报告已保存到: {args.output}")
+
+    except Exception as e:
+        logging.error(f"执行失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
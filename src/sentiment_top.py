@@ -14,20 +14,28 @@ sentiment.py
 Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
 """
 
+import numpy as np
 import pandas as pd
 import logging
 import argparse
+import re
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import time
-try:
-    import torch
-    from transformers import pipeline
-except ImportError as e:
-    print(f"警告: 无法导入 torch 或 transformers: {e}")
-    print("请安装: pip install torch transformers")
-    torch = None
-    pipeline = None
+
+from article_store import read_partitioned, write_partitioned
+from boilerplate import BoilerplateConfig, add_boilerplate_arguments, boilerplate_texts, config_from_args
+from clean_data import language_counts
+from sentiment_cache import DEFAULT_MAX_ENTRIES, SentimentCache
+from near_dup import cluster_keys
+from onnx_backend import BACKENDS, DEFAULT_ONNX_DIR, load_onnx_pipeline
+from sentiment_cascade import (DEFAULT_LM_NEGATIVE, DEFAULT_LM_POSITIVE, CascadeThresholds, add_cascade_arguments,
+                               lexicon_decisions, merge_cascade, thresholds_from_args)
+from sentiment_lm import load_lexicon
+from sentiment_profile import add_profile_arguments, apply_profile
+from sentiment_student import DEFAULT_STUDENT_MODEL, StudentScorer
+from score_mappings import (DEFAULT_SCORE_MAPPING, LABEL_CLASSES, SCORE_MAPPINGS, apply_score_mapping,
+                            probability_frame)
 
 # --- 配置 ---
 DEFAULT_INPUT_FILE = 'data/processed/articles_recent_cleaned.csv'
@@ -35,6 +43,18 @@ DEFAULT_OUTPUT_FILE = 'data/processed/articles_with_sentiment.csv'
 DEFAULT_TEXT_COLUMN = 'body'  # 清洗后数据中的文本列名
 DEFAULT_BATCH_SIZE = 32  # 根据内存情况调整
 MODEL_NAME = 'cardiffnlp/twitter-roberta-base-sentiment-latest'
+DEFAULT_BACKEND = 'torch'
+# 第三种评分器：蒸馏的哈希 n-gram 学生模型（sentiment_student.py train 生成）
+STUDENT_BACKEND = 'student'
+SCORER_BACKENDS = BACKENDS + (STUDENT_BACKEND,)
+MAX_SEQ_LENGTH = 512
+# 每批 padding 后的 token 上限（批内条数 × 批内最长序列），0 表示按固定条数分批
+DEFAULT_MAX_TOKENS = 8192
+# 中日韩字符（粗估 token 数时单独计）
+_WIDE_CHARS = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]')
+DEFAULT_CACHE_DB = 'data/processed/sentiment_cache.sqlite'
+# 预处理与输出格式版本（截断方式、是否保存全部类别概率等），修改时递增，旧缓存自动失效
+PREPROCESS_VERSION = 'truncate-512-allprobs-v2'
 # --- 结束配置 ---
 
 def convert_sentiment_to_score(sentiment_label: str, confidence: float) -> float:
@@ -63,13 +83,22 @@ def convert_sentiment_to_score(sentiment_label: str, confidence: float) -> float
         return 0.0
 
 
-def load_cleaned_data(input_file: str, text_column: str) -> pd.DataFrame:
+def load_cleaned_data(
+    input_file: str,
+    text_column: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    symbols: Optional[List[str]] = None
+) -> pd.DataFrame:
     """
     加载清洗后的数据
     
     Args:
-        input_file: 输入文件路径
+        input_file: 输入文件路径（CSV，或按月份/股票分区的 Parquet 目录）
         text_column: 文本列名
+        start_date: 起始日期 YYYY-MM-DD（仅 Parquet 目录，下推过滤）
+        end_date: 结束日期 YYYY-MM-DD（仅 Parquet 目录，下推过滤）
+        symbols: 股票代码列表（仅 Parquet 目录，下推过滤）
         
     Returns:
         加载的数据框
@@ -79,20 +108,11 @@ def load_cleaned_data(input_file: str, text_column: str) -> pd.DataFrame:
     if not Path(input_file).exists():
         raise FileNotFoundError(f"输入文件不存在: {input_file}")
     
-    try:
-        # 尝试不同的编码方式
-        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
-            try:
-                df = pd.read_csv(input_file, encoding=encoding)
-                logging.info(f"成功使用 {encoding} 编码加载数据")
-                break
-            except UnicodeDecodeError:
-                continue
-        else:
-            raise ValueError("无法使用任何编码方式读取文件")
-            
-    except Exception as e:
-        raise ValueError(f"加载文件时出错: {e}")
+    if Path(input_file).is_dir():
+        # Parquet 分区目录：只读取日期/股票范围内的分区，无需猜测编码
+        df = read_partitioned(input_file, start=start_date, end=end_date, symbols=symbols)
+    else:
+        df = _read_csv_any_encoding(input_file)
     
     # 检查文本列是否存在
     if text_column not in df.columns:
@@ -112,20 +132,76 @@ def load_cleaned_data(input_file: str, text_column: str) -> pd.DataFrame:
     
     return df
 
-def load_sentiment_model() -> pipeline:
+
+def _read_csv_any_encoding(input_file: str) -> pd.DataFrame:
+    """依次尝试常见编码读取 CSV"""
+    try:
+        # 尝试不同的编码方式
+        for encoding in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
+            try:
+                df = pd.read_csv(input_file, encoding=encoding)
+                logging.info(f"成功使用 {encoding} 编码加载数据")
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise ValueError("无法使用任何编码方式读取文件")
+            
+    except Exception as e:
+        raise ValueError(f"加载文件时出错: {e}")
+    
+    return df
+
+def load_sentiment_model(
+    backend: str = DEFAULT_BACKEND,
+    onnx_dir: str = DEFAULT_ONNX_DIR,
+    num_threads: Optional[int] = None,
+    workers: int = 1,
+    pipelined: bool = False,
+    student_model: str = DEFAULT_STUDENT_MODEL
+) -> Any:
     """
     加载情感分析模型
     
+    Args:
+        backend: 推理后端 "torch"、"onnx"、"onnx-int8"（ONNX 首次使用时自动导出）或 "student"（蒸馏学生模型）
+        onnx_dir: ONNX 模型目录
+        num_threads: 算子内线程数（多进程时为每个进程的线程数，None 为库默认值）
+        workers: 推理进程数，大于 1 时返回 SentimentWorkerPool（用完需 close）
+        pipelined: 是否包装为分词 / 推理 / 后处理流水线（PipelinedScorer；多进程时在每个进程内包装）
+        student_model: 学生模型路径（backend 为 student 时使用；学生模型不需要多进程和流水线）
+    
     Returns:
         加载的pipeline对象
     """
+    if backend == STUDENT_BACKEND:
+        logging.info(f"加载蒸馏学生模型: {student_model}")
+        return StudentScorer(student_model)
+    if workers > 1:
+        from sentiment_workers import SentimentWorkerPool
+        return SentimentWorkerPool(workers, num_threads, backend, onnx_dir, pipelined=pipelined)
+    if pipelined:
+        from pipelined_scorer import PipelinedScorer
+        return PipelinedScorer(load_sentiment_model(backend, onnx_dir, num_threads))
+    
+    if backend != 'torch':
+        logging.info(f"正在加载 ONNX Runtime 情感分析模型 ({backend})...")
+        return load_onnx_pipeline(MODEL_NAME, backend, onnx_dir, num_threads)
+    
     logging.info("正在加载 Transformer 情感分析模型 (可能需要几分钟)...")
     start_load_time = time.time()
     
-    # 检查是否有可用的GPU
-    if torch is None:
-        raise RuntimeError("torch 未安装，请运行: pip install torch")
+    # torch / transformers 导入需要数秒，只在真正加载 PyTorch 模型时导入
+    try:
+        import torch
+        from transformers import pipeline
+    except ImportError as e:
+        raise RuntimeError(f"无法导入 torch 或 transformers: {e}，请安装: pip install torch transformers")
     
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    
+    # 检查是否有可用的GPU
     device_num = 0 if torch.cuda.is_available() else -1
     device_name = "GPU" if device_num == 0 else "CPU"
     logging.info(f"将使用设备: {device_name}")
@@ -148,10 +224,43 @@ def load_sentiment_model() -> pipeline:
         raise RuntimeError("请检查网络连接和库安装情况")
 
 
+def model_fingerprint(sentiment_pipeline) -> str:
+    """模型名 + 版本（Hub commit hash），作为缓存键的一部分"""
+    # 多进程推理池由工作进程中的模型给出
+    fingerprint = getattr(sentiment_pipeline, 'fingerprint', None)
+    if fingerprint:
+        return fingerprint
+    config = getattr(getattr(sentiment_pipeline, 'model', None), 'config', None)
+    name = getattr(config, '_name_or_path', None) or MODEL_NAME
+    revision = getattr(config, '_commit_hash', None) or 'unknown'
+    # 量化 / ONNX 后端的输出与 PyTorch 略有差异，缓存分开
+    backend = getattr(sentiment_pipeline, 'backend', None)
+    return f"{name}@{revision}" + (f"+{backend}" if backend else "")
+
+
+def preprocess_version(max_length: int = MAX_SEQ_LENGTH) -> str:
+    """缓存的预处理版本：截断长度不是默认值时单独成版本"""
+    return PREPROCESS_VERSION if max_length == MAX_SEQ_LENGTH else f"{PREPROCESS_VERSION}+maxlen{max_length}"
+
+
+def open_sentiment_cache(
+    sentiment_pipeline,
+    cache_db: str = DEFAULT_CACHE_DB,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    max_length: int = MAX_SEQ_LENGTH
+) -> SentimentCache:
+    """打开与当前模型、预处理版本对应的持久化情感缓存"""
+    Path(cache_db).parent.mkdir(parents=True, exist_ok=True)
+    return SentimentCache(cache_db, model_fingerprint(sentiment_pipeline), preprocess_version(max_length), max_entries)
+
+
 def analyze_sentiment_batch(
     texts: List[str], 
-    sentiment_pipeline: pipeline, 
-    batch_size: int = DEFAULT_BATCH_SIZE
+    sentiment_pipeline, 
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: Optional[SentimentCache] = None,
+    max_tokens: Optional[int] = None,
+    max_length: int = MAX_SEQ_LENGTH
 ) -> List[Dict[str, Any]]:
     """
     批量进行情感分析
@@ -159,35 +268,159 @@ def analyze_sentiment_batch(
     Args:
         texts: 文本列表
         sentiment_pipeline: 情感分析pipeline
-        batch_size: 批处理大小
+        batch_size: 批处理大小（动态分批时为每批条数上限）
+        cache: 持久化情感缓存（可选）：只有未命中的文本送入模型，结果按原顺序拼回
+        max_tokens: 每批 padding 后 token 上限（可选）：先分词、按长度排序后组批，结果恢复原顺序
+        max_length: 每条文本截断的 token 数（缓存需用同一 max_length 打开）
         
     Returns:
         情感分析结果列表
     """
-    logging.info(f"开始情感分析 (分批处理，每批 {batch_size} 条)...")
+    return _analyze_with_status(texts, sentiment_pipeline, batch_size, cache, max_tokens, max_length)[0]
+
+
+def _analyze_with_status(
+    texts: List[str],
+    sentiment_pipeline,
+    batch_size: int,
+    cache: Optional[SentimentCache] = None,
+    max_tokens: Optional[int] = None,
+    max_length: int = MAX_SEQ_LENGTH
+) -> Tuple[List[Dict[str, Any]], List[bool]]:
+    """同 analyze_sentiment_batch，另返回每条是否成功（缓存命中视为成功）"""
+    if cache is None:
+        return _run_pipeline(texts, sentiment_pipeline, batch_size, max_tokens, max_length)
+    
+    results = cache.get_many(texts)
+    succeeded = [r is not None for r in results]
+    miss_idx = [i for i, r in enumerate(results) if r is None]
+    logging.info(f"情感缓存命中 {len(texts) - len(miss_idx)} / {len(texts)} 条")
+    if miss_idx:
+        miss_texts = [texts[i] for i in miss_idx]
+        fresh, ok = _run_pipeline(miss_texts, sentiment_pipeline, batch_size, max_tokens, max_length)
+        # 出错批次的默认值不写入缓存，下次重新评分
+        cache.put_many([t for t, good in zip(miss_texts, ok) if good],
+                       [r for r, good in zip(fresh, ok) if good])
+        for i, result, good in zip(miss_idx, fresh, ok):
+            results[i] = result
+            succeeded[i] = good
+    return results, succeeded
+
+
+def _to_result(output: Any) -> Dict[str, Any]:
+    """
+    统一模型输出格式：{'label': 最高类别, 'score': 其概率, 'probs': [负面, 中性, 正面]}
+    
+    top_k=None 时每条输出是全部类别的列表；只返回最高类别的旧式输出 probs 为 None
+    """
+    if isinstance(output, dict):
+        return {'label': output['label'], 'score': float(output['score']), 'probs': None}
+    probs = [float('nan')] * 3
+    for item in output:
+        idx = LABEL_CLASSES.get(item['label'])
+        if idx is not None:
+            probs[idx] = float(item['score'])
+    top = max(output, key=lambda item: item['score'])
+    return {'label': top['label'], 'score': float(top['score']), 'probs': probs}
+
+
+def estimate_token_length(text: str, max_length: int = MAX_SEQ_LENGTH) -> int:
+    """没有分词器时按字符粗估截断后的 token 数：拉丁文字约 4 字符 / token，中日韩字符按 2 token 计"""
+    wide = len(_WIDE_CHARS.findall(text))
+    return min(max_length, 2 * wide + (len(text) - wide) // 4 + 2)
+
+
+def token_lengths(texts: List[str], sentiment_pipeline, max_length: int = MAX_SEQ_LENGTH) -> List[int]:
+    """
+    每条文本截断后的 token 数，用模型分词器精确计数（max_tokens 才是真正的 padding 上限）
+
+    没有分词器时按 estimate_token_length 粗估
+    """
+    tokenizer = getattr(sentiment_pipeline, 'tokenizer', None)
+    if tokenizer is None:
+        return [estimate_token_length(t, max_length) for t in texts]
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)['input_ids']
+    return [len(ids) for ids in encoded]
+
+
+def plan_token_batches(lengths: List[int], max_tokens: int, max_batch_size: int) -> List[List[int]]:
+    """
+    按 token 长度组批：从长到短排序，贪心装入，使 批内条数 × 批内最长长度 不超过 max_tokens
+    
+    Args:
+        lengths: 每条文本的 token 数
+        max_tokens: 每批 padding 后 token 上限
+        max_batch_size: 每批条数上限
+        
+    Returns:
+        批次列表，每批为原始下标列表
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for i in order:
+        # 降序排列，批内最长的就是第一条
+        longest = lengths[current[0]] if current else lengths[i]
+        if current and (longest * (len(current) + 1) > max_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _run_pipeline(
+    texts: List[str],
+    sentiment_pipeline,
+    batch_size: int,
+    max_tokens: Optional[int] = None,
+    max_length: int = MAX_SEQ_LENGTH
+) -> Tuple[List[Dict[str, Any]], List[bool]]:
+    """分批调用模型，返回 (结果列表, 每条是否成功)，顺序与 texts 一致"""
+    score_texts = getattr(sentiment_pipeline, 'score_texts', None)
+    if score_texts is not None:
+        # 自带调度的评分器（多进程推理池、分词/推理流水线、评分服务）
+        return score_texts(texts, batch_size, max_tokens, max_length)
+    
+    if max_tokens:
+        lengths = token_lengths(texts, sentiment_pipeline, max_length)
+        batches = plan_token_batches(lengths, max_tokens, batch_size)
+        padded = sum(max(lengths[j] for j in b) * len(b) for b in batches)
+        counted = '分词器计数' if getattr(sentiment_pipeline, 'tokenizer', None) is not None else '按字符粗估'
+        logging.info(f"开始情感分析 (按长度动态分批，每批不超过 {max_tokens} token，共 {len(batches)} 批，"
+                     f"padding 利用率 {sum(lengths) / max(padded, 1):.1%}，长度{counted})...")
+    else:
+        batches = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+        logging.info(f"开始情感分析 (分批处理，每批 {batch_size} 条)...")
     logging.info("这可能需要较长时间，尤其是在CPU上。请耐心等待...")
     
-    all_results = []
+    all_results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+    succeeded = [False] * len(texts)
     analysis_start_time = time.time()
+    processed = 0
     
     # 分批处理
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i : i + batch_size]
+    for batch_no, indices in enumerate(batches, 1):
+        batch = [texts[j] for j in indices]
         try:
-            # 使用pipeline进行情感分析
-            results = sentiment_pipeline(batch, truncation=True, max_length=512)
-            all_results.extend(results)
+            # 使用pipeline进行情感分析（top_k=None 返回全部类别的概率；整批一次前向）
+            results = sentiment_pipeline(batch, truncation=True, max_length=max_length, top_k=None,
+                                         batch_size=len(batch))
+            for j, output in zip(indices, results):
+                all_results[j] = _to_result(output)
+                succeeded[j] = True
             
         except Exception as e:
-            logging.error(f"处理批次 {i//batch_size + 1} 时出错: {e}")
+            logging.error(f"处理批次 {batch_no} 时出错: {e}")
             # 如果一批出错，用默认值填充
-            error_results = [{'label': 'LABEL_1', 'score': 0.5} for _ in batch]
-            all_results.extend(error_results)
+            for j in indices:
+                all_results[j] = {'label': 'LABEL_1', 'score': 0.5, 'probs': None}
         
         # 打印进度
-        if (i // batch_size + 1) % 10 == 0 or i + len(batch) >= len(texts):
+        processed += len(batch)
+        if batch_no % 10 == 0 or batch_no == len(batches):
             elapsed_time = time.time() - analysis_start_time
-            processed = min(i + len(batch), len(texts))
             estimated_total_time = (elapsed_time / processed) * len(texts) if processed > 0 else 0
             logging.info(f"已处理 {processed} / {len(texts)} 条新闻。"
                         f"耗时: {elapsed_time:.1f}s (预计总耗时: {estimated_total_time:.1f}s)")
@@ -195,20 +428,26 @@ def analyze_sentiment_batch(
     analysis_time = time.time() - analysis_start_time
     logging.info(f"情感分析完成，总耗时: {analysis_time:.2f} 秒")
     
-    return all_results
+    return all_results, succeeded
 
 def add_sentiment_scores(
     df: pd.DataFrame, 
     sentiment_results: List[Dict[str, Any]], 
-    text_column: str
+    text_column: str,
+    score_mapping: str = DEFAULT_SCORE_MAPPING,
+    source: str = 'transformer'
 ) -> pd.DataFrame:
     """
     将情感分析结果添加到数据框
     
+    除最高类别和置信度外，还保存三类概率（float32），之后换映射只需 score_mappings.apply_score_mapping
+    
     Args:
         df: 原始数据框
         sentiment_results: 情感分析结果
         text_column: 文本列名
+        score_mapping: 分数映射名称（见 score_mappings.SCORE_MAPPINGS）
+        source: 写入 sentiment_source 列的结果来源（transformer / student；词典级联行由 merge_cascade 标注）
         
     Returns:
         添加了情感分数列的数据框
@@ -223,15 +462,17 @@ def add_sentiment_scores(
     sentiment_labels = [result['label'] for result in sentiment_results]
     sentiment_scores = [result['score'] for result in sentiment_results]
     
-    # 转换为数值分数
-    numeric_scores = [
-        convert_sentiment_to_score(label, score) 
-        for label, score in zip(sentiment_labels, sentiment_scores)
-    ]
-    
-    # 添加新列
+    # 添加新列：标签、置信度、三类概率
     df_result['sentiment_label'] = sentiment_labels
     df_result['sentiment_confidence'] = sentiment_scores
+    probs = probability_frame(sentiment_results, index=df_result.index)
+    for col in probs.columns:
+        df_result[col] = probs[col]
+    
+    # 先标注来源：输入里旧的 lexicon 标注不能让新评分的行沿用旧分数
+    df_result['sentiment_source'] = source
+    # 转换为数值分数（向量化映射）
+    numeric_scores = apply_score_mapping(df_result, score_mapping)
     df_result['sentiment_score'] = numeric_scores
     
     # 统计情感分布
@@ -239,7 +480,7 @@ def add_sentiment_scores(
     logging.info(f"情感标签分布:\n{sentiment_distribution}")
     
     # 统计分数分布
-    score_stats = pd.Series(numeric_scores).describe()
+    score_stats = numeric_scores.describe()
     logging.info(f"情感分数统计:\n{score_stats}")
     
     return df_result
@@ -251,7 +492,7 @@ def save_results(df: pd.DataFrame, output_file: str) -> None:
     
     Args:
         df: 结果数据框
-        output_file: 输出文件路径
+        output_file: 输出文件路径（以 .parquet 结尾时写入分区目录）
     """
     # 确保输出目录存在
     output_path = Path(output_file)
@@ -260,8 +501,12 @@ def save_results(df: pd.DataFrame, output_file: str) -> None:
     logging.info(f"正在将结果保存到: {output_file}")
     
     try:
-        # 使用 utf-8-sig 编码以便 Excel 能更好地识别 UTF-8
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')
+        if output_path.suffix == '.parquet':
+            # 以 .parquet 结尾视为分区目录，按月份/股票追加写入
+            write_partitioned(df, output_file)
+        else:
+            # 使用 utf-8-sig 编码以便 Excel 能更好地识别 UTF-8
+            df.to_csv(output_file, index=False, encoding='utf-8-sig')
         logging.info("文件保存成功")
         
     except Exception as e:
@@ -269,11 +514,67 @@ def save_results(df: pd.DataFrame, output_file: str) -> None:
         raise
 
 
+def score_articles(
+    df: pd.DataFrame,
+    sentiment_pipeline,
+    text_column: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: Optional[SentimentCache] = None,
+    max_tokens: Optional[int] = None,
+    max_length: int = MAX_SEQ_LENGTH
+) -> List[Dict[str, Any]]:
+    """
+    为数据框中每一行评分，结果与 df 行顺序一致
+    
+    有 canonical_uri 时每个近重复簇只送模型一次（缺失的行各自评分）；有 detected_lang 时同一语言的文本连续成批
+    """
+    if 'canonical_uri' in df.columns:
+        keys = cluster_keys(df)
+        positions = np.flatnonzero(~keys.duplicated().to_numpy())
+        logging.info(f"近重复簇去重：{len(df)} 条新闻只需评分 {len(positions)} 次")
+    else:
+        positions = np.arange(len(df))
+    if 'detected_lang' in df.columns:
+        # 同一语言的文本连续成批（清洗阶段已缓存语言列）
+        to_score = df.iloc[positions]
+        logging.info(f"待评分语言分布: {language_counts(to_score)}")
+        positions = positions[np.argsort(to_score['detected_lang'].astype(str).to_numpy(), kind='stable')]
+    texts = df[text_column].iloc[positions].astype(str).tolist()
+    
+    scored = analyze_sentiment_batch(texts, sentiment_pipeline, batch_size, cache, max_tokens, max_length)
+    if 'canonical_uri' in df.columns:
+        # 结果按簇广播回每一行
+        by_cluster = dict(zip(keys.iloc[positions], scored))
+        return [by_cluster[k] for k in keys]
+    sentiment_results = [None] * len(df)
+    for pos, result in zip(positions, scored):
+        sentiment_results[pos] = result
+    return sentiment_results
+
+
 def process_sentiment_analysis(
     input_file: str,
     output_file: str,
     text_column: str = DEFAULT_TEXT_COLUMN,
-    batch_size: int = DEFAULT_BATCH_SIZE
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    symbols: Optional[List[str]] = None,
+    cache_db: Optional[str] = DEFAULT_CACHE_DB,
+    cache_max_entries: int = DEFAULT_MAX_ENTRIES,
+    score_mapping: str = DEFAULT_SCORE_MAPPING,
+    max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+    backend: str = DEFAULT_BACKEND,
+    workers: int = 1,
+    threads_per_worker: Optional[int] = None,
+    pipelined: bool = False,
+    cascade: Optional[CascadeThresholds] = None,
+    lm_positive: str = DEFAULT_LM_POSITIVE,
+    lm_negative: str = DEFAULT_LM_NEGATIVE,
+    server: Optional[str] = None,
+    max_length: int = MAX_SEQ_LENGTH,
+    student_model: str = DEFAULT_STUDENT_MODEL,
+    boilerplate: Optional[BoilerplateConfig] = None
 ) -> pd.DataFrame:
     """
     执行完整的情感分析流程
@@ -283,26 +584,74 @@ def process_sentiment_analysis(
         output_file: 输出文件路径
         text_column: 文本列名
         batch_size: 批处理大小
+        start_date / end_date / symbols: Parquet 目录输入时的下推过滤条件
+        cache_db: 持久化情感缓存路径（None 表示不使用缓存）
+        cache_max_entries: 缓存最大条数，超出后淘汰最久未使用的条目
+        score_mapping: 分数映射名称（类别概率 → 情感分数）
+        max_tokens: 每批 padding 后 token 上限（0 / None 表示按固定条数分批）
+        backend: 推理后端（torch / onnx / onnx-int8 / student）
+        workers: 推理进程数（每个进程加载一份模型）
+        threads_per_worker: 每个进程的算子内线程数（None 时为 CPU 核数 / workers）
+        pipelined: 分词、推理、后处理三段流水线并行
+        cascade: 词典级联阈值（None 表示全部送入模型）
+        lm_positive / lm_negative: 级联使用的 L&M 词典文件
+        server: 常驻评分服务地址（http://host:port 或 unix:///path），设置后不在本进程加载模型
+        max_length: 每条文本截断的 token 数（使用评分服务时以服务端设置为准）
+        student_model: backend 为 student 时的学生模型路径
+        boilerplate: 样板句去除配置（None 表示原文送入模型）
         
     Returns:
         处理后的数据框
     """
     # 1. 加载数据
-    df = load_cleaned_data(input_file, text_column)
-    
-    # 2. 加载模型
-    sentiment_pipeline = load_sentiment_model()
-    
-    # 3. 获取文本列表
-    texts = df[text_column].astype(str).tolist()
-    
-    # 4. 进行情感分析
-    sentiment_results = analyze_sentiment_batch(texts, sentiment_pipeline, batch_size)
-    
-    # 5. 添加情感分数
-    df_with_sentiment = add_sentiment_scores(df, sentiment_results, text_column)
-    
-    # 6. 保存结果
+    df = load_cleaned_data(input_file, text_column, start_date, end_date, symbols)
+    
+    # 2. 加载模型（或连接已加载模型的常驻服务，见 sentiment_server.py）
+    if server:
+        from sentiment_server import SentimentClient
+        sentiment_pipeline = SentimentClient(server)
+        max_length = sentiment_pipeline.max_length or max_length
+        logging.info(f"使用情感评分服务: {server} ({sentiment_pipeline.fingerprint})")
+    else:
+        sentiment_pipeline = load_sentiment_model(backend, num_threads=threads_per_worker, workers=workers,
+                                                  pipelined=pipelined, student_model=student_model)
+    
+    # 3. 样板句去除（可选）：只改变送入词典 / 模型的文本，输出保留原文
+    scoring_df = df
+    if boilerplate is not None:
+        stripped, _ = boilerplate_texts(df, text_column, boilerplate)
+        scoring_df = df.assign(**{text_column: stripped})
+    
+    # 4. 词典级联（可选）：信号强且方向明确的新闻直接采用词典分数，其余送入模型
+    decisions = None
+    to_model, to_score = df, scoring_df
+    if cascade is not None:
+        decisions = lexicon_decisions(scoring_df[text_column], load_lexicon(lm_positive), load_lexicon(lm_negative),
+                                      cascade)
+        routed = ~decisions['confident'].to_numpy()
+        to_model, to_score = df[routed], scoring_df[routed]
+        logging.info(f"词典级联：{len(df) - len(to_model)} / {len(df)} 条新闻采用词典分数，"
+                     f"{len(to_model)} 条送入模型")
+    
+    # 5. 进行情感分析（命中缓存的文本不再送入模型）
+    cache = open_sentiment_cache(sentiment_pipeline, cache_db, cache_max_entries, max_length) if cache_db else None
+    try:
+        sentiment_results = score_articles(to_score, sentiment_pipeline, text_column, batch_size, cache, max_tokens,
+                                           max_length)
+    finally:
+        if cache is not None:
+            logging.info(f"情感缓存统计: {cache.stats()}")
+            cache.close()
+        if hasattr(sentiment_pipeline, 'close'):
+            sentiment_pipeline.close()
+    
+    # 6. 添加情感分数（sentiment_source 标明来源，学生模型的输出不会被当作蒸馏教师数据）
+    source = getattr(sentiment_pipeline, 'sentiment_source', 'transformer')
+    df_with_sentiment = add_sentiment_scores(to_model, sentiment_results, text_column, score_mapping, source)
+    if decisions is not None:
+        df_with_sentiment = merge_cascade(df, decisions, df_with_sentiment, source)
+    
+    # 7. 保存结果
     save_results(df_with_sentiment, output_file)
     
     return df_with_sentiment
@@ -316,7 +665,40 @@ def main():
     parser.add_argument("--input", "-i", default=DEFAULT_INPUT_FILE, help="输入文件路径")
     parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT_FILE, help="输出文件路径")
     parser.add_argument("--text_column", "-t", default=DEFAULT_TEXT_COLUMN, help="文本列名")
-    parser.add_argument("--batch_size", "-b", type=int, default=DEFAULT_BATCH_SIZE, help="批处理大小")
+    parser.add_argument("--batch_size", "-b", type=int, default=None,
+                        help=f"批处理大小（默认取调优 profile，没有时为 {DEFAULT_BATCH_SIZE}）")
+    parser.add_argument("--start_date", help="起始日期 YYYY-MM-DD（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--end_date", help="结束日期 YYYY-MM-DD（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--symbols", nargs="*", help="股票代码（Parquet 目录输入时下推过滤）")
+    parser.add_argument("--cache_db", default=DEFAULT_CACHE_DB, help="持久化情感缓存路径")
+    parser.add_argument("--no_cache", action="store_true", help="不使用情感缓存，全部重新评分")
+    parser.add_argument("--cache_max_entries", type=int, default=DEFAULT_MAX_ENTRIES, help="缓存最大条数（LRU 淘汰）")
+    parser.add_argument("--max_tokens", type=int, default=DEFAULT_MAX_TOKENS,
+                        help="每批 padding 后 token 上限（按长度动态分批），0 表示按 --batch_size 固定条数分批")
+    parser.add_argument("--backend", choices=SCORER_BACKENDS, default=DEFAULT_BACKEND,
+                        help="推理后端（onnx / onnx-int8 需要 onnxruntime，选择前先看 onnx_backend.py report；"
+                             "student 为蒸馏学生模型，选择前先看 sentiment_student.py report）")
+    parser.add_argument("--student_model", default=DEFAULT_STUDENT_MODEL, help="学生模型路径（--backend student）")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="推理进程数（每个进程加载一份模型，多核 CPU 上配合 --threads_per_worker 调优）")
+    parser.add_argument("--threads_per_worker", type=int,
+                        help="每个进程的算子内线程数（默认 CPU 核数 / workers；单进程时默认取调优 profile）")
+    parser.add_argument("--max_length", type=int, default=None,
+                        help=f"每条文本截断的 token 数（默认取调优 profile，没有时为 {MAX_SEQ_LENGTH}）")
+    add_profile_arguments(parser)
+    parser.add_argument("--pipelined", action="store_true",
+                        help="分词 / 推理 / 后处理三段流水线并行（各阶段利用率写入日志）")
+    parser.add_argument("--cascade", action="store_true",
+                        help="词典优先级联：词典信号明确的新闻不再送入模型（先用 sentiment_cascade.py report 评估阈值）")
+    add_cascade_arguments(parser)
+    parser.add_argument("--strip_boilerplate", action="store_true",
+                        help="评分前去除多篇文章重复出现的样板句（先用 boilerplate.py report 评估阈值）")
+    add_boilerplate_arguments(parser)
+    parser.add_argument("--server",
+                        help="常驻评分服务地址（http://host:port 或 unix:///path，见 sentiment_server.py），"
+                             "设置后忽略 --backend / --workers")
+    parser.add_argument("--score_mapping", default=DEFAULT_SCORE_MAPPING, choices=sorted(SCORE_MAPPINGS),
+                        help="类别概率 → 情感分数的映射（事后可用 score_mappings.py 重算）")
     parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
     
     args = parser.parse_args()
@@ -330,12 +712,33 @@ def main():
     )
     
     try:
+        # 命令行未给出的批大小 / 线程数 / 截断长度取本机调优结果（sentiment_profile.py tune）
+        apply_profile(args)
+        
         # 执行情感分析
         df_result = process_sentiment_analysis(
             input_file=args.input,
             output_file=args.output,
             text_column=args.text_column,
-            batch_size=args.batch_size
+            batch_size=args.batch_size or DEFAULT_BATCH_SIZE,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            symbols=args.symbols,
+            cache_db=None if args.no_cache else args.cache_db,
+            cache_max_entries=args.cache_max_entries,
+            score_mapping=args.score_mapping,
+            max_tokens=args.max_tokens,
+            backend=args.backend,
+            workers=args.workers,
+            threads_per_worker=args.threads_per_worker,
+            pipelined=args.pipelined,
+            cascade=thresholds_from_args(args) if args.cascade else None,
+            lm_positive=args.lm_positive,
+            lm_negative=args.lm_negative,
+            server=args.server,
+            max_length=args.max_length or MAX_SEQ_LENGTH,
+            student_model=args.student_model,
+            boilerplate=config_from_args(args) if args.strip_boilerplate else None
         )
         
         print(f"\n✅ 情感分析完成!")
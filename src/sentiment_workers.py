@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sentiment_workers.py
+---------------------------------
+多进程情感推理：N 个工作进程各自加载一次模型，文本分片流式分发，结果按原顺序合并
+
+- 多核 CPU 上单个 torch 进程的算子内并行扩展性有限；workers × threads_per_worker 的组合
+  （如 32 核上 8 × 4）通常吞吐更高，用 sentiment_top.py --workers / --threads_per_worker 调优
+- 工作进程以 spawn 方式启动：父进程里 torch / OpenMP 线程池已初始化，fork 后可能死锁
+- 同时在途的分片不超过 2 × workers，内存不随文本总量增长
+- 失败按分片处理：分片抛异常或工作进程崩溃时，该分片在（必要时重建的）进程池中单独重试一次，
+  仍失败则填默认值并标记为未成功（不写入情感缓存），其余分片不受影响
+
+SentimentWorkerPool 可以像 pipeline 一样直接交给 sentiment_top.analyze_sentiment_batch。
+
+用法:
+    python src/sentiment_top.py --workers 8 --threads_per_worker 4
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from onnx_backend import DEFAULT_ONNX_DIR
+from sentiment_top import MAX_SEQ_LENGTH, _run_pipeline, load_sentiment_model, model_fingerprint
+
+# 每个分片的文本条数：足够大，使工作进程内按长度动态分批仍然有效
+DEFAULT_SHARD_SIZE = 512
+
+# 工作进程内的模型（每个进程加载一次）
+_WORKER_PIPELINE = None
+
+
+def _init_worker(loader: Callable[..., Any], num_threads: int) -> None:
+    global _WORKER_PIPELINE
+    _WORKER_PIPELINE = loader(num_threads=num_threads)
+
+
+def _worker_fingerprint() -> str:
+    return model_fingerprint(_WORKER_PIPELINE)
+
+
+def _score_shard(texts: List[str], batch_size: int, max_tokens: Optional[int],
+                 max_length: int) -> Tuple[List[Dict[str, Any]], List[bool]]:
+    return _run_pipeline(texts, _WORKER_PIPELINE, batch_size, max_tokens, max_length)
+
+
+class SentimentWorkerPool:
+    """
+    多进程情感推理池
+
+    Args:
+        workers: 工作进程数
+        threads_per_worker: 每个进程的算子内线程数（None 时为 CPU 核数 / workers）
+        backend: 推理后端（torch / onnx / onnx-int8）
+        onnx_dir: ONNX 模型目录
+        shard_size: 每个分片的文本条数
+        loader: 在工作进程中加载模型的函数 loader(num_threads=...)（须可 pickle，默认 load_sentiment_model）
+        pipelined: 工作进程内使用分词 / 推理 / 后处理流水线
+    """
+
+    def __init__(self, workers: int, threads_per_worker: Optional[int] = None, backend: str = 'torch',
+                 onnx_dir: str = DEFAULT_ONNX_DIR, shard_size: int = DEFAULT_SHARD_SIZE,
+                 loader: Optional[Callable[..., Any]] = None, pipelined: bool = False):
+        if loader is None:
+            loader = partial(load_sentiment_model, backend, onnx_dir, pipelined=pipelined)
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.shard_size = shard_size
+        self.loader = loader
+        self._pool: Optional[ProcessPoolExecutor] = None
+        logging.info(f"启动 {workers} 个推理进程，每个进程 {self.threads_per_worker} 个线程...")
+        start = time.time()
+        # 同时确认工作进程能加载模型；缓存键使用工作进程中模型的版本
+        self.fingerprint = self._ensure_pool().submit(_worker_fingerprint).result()
+        logging.info(f"推理进程就绪，耗时: {time.time() - start:.2f} 秒")
+
+    def _ensure_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.loader, self.threads_per_worker),
+            )
+        return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor) -> None:
+        """进程崩溃后进程池不可再用，丢弃后下次提交时重建"""
+        if self._pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def score_texts(self, texts: Sequence[str], batch_size: int,
+                    max_tokens: Optional[int] = None,
+                    max_length: int = MAX_SEQ_LENGTH) -> Tuple[List[Dict[str, Any]], List[bool]]:
+        """
+        分片并行评分
+
+        Returns:
+            (结果列表, 每条是否成功)，顺序与 texts 一致
+        """
+        texts = list(texts)
+        shards = [(start, texts[start:start + self.shard_size]) for start in range(0, len(texts), self.shard_size)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        succeeded = [False] * len(texts)
+        logging.info(f"开始多进程情感分析：{len(texts)} 条，{len(shards)} 个分片，{self.workers} 个进程")
+
+        failed = self._map_shards(shards, batch_size, max_tokens, max_length, results, succeeded)
+        if failed:
+            # 逐个重试：进程崩溃会连带同一进程池里在途的其他分片，一起重试会再次被拖垮
+            logging.warning(f"{len(failed)} 个分片失败，逐个重试一次...")
+            failed = self._map_shards(failed, batch_size, max_tokens, max_length, results, succeeded, max_in_flight=1)
+        for start, shard in failed:
+            logging.error(f"分片 [{start}, {start + len(shard)}) 重试后仍失败，使用默认值")
+            for j in range(start, start + len(shard)):
+                results[j] = {'label': 'LABEL_1', 'score': 0.5, 'probs': None}
+        return results, succeeded
+
+    def _map_shards(self, shards: List[Tuple[int, List[str]]], batch_size: int, max_tokens: Optional[int],
+                    max_length: int, results: List[Optional[Dict[str, Any]]], succeeded: List[bool],
+                    max_in_flight: Optional[int] = None) -> List[Tuple[int, List[str]]]:
+        """提交分片（在途默认不超过 2 × workers），结果写回原位置；返回失败的分片"""
+        max_in_flight = max_in_flight or 2 * self.workers
+        queue = deque(shards)
+        pending: Dict[Any, Tuple[ProcessPoolExecutor, int, List[str]]] = {}
+        failed: List[Tuple[int, List[str]]] = []
+        total = sum(len(shard) for _, shard in shards)
+        processed = 0
+        start_time = time.time()
+        while queue or pending:
+            while queue and len(pending) < max_in_flight:
+                start, shard = queue.popleft()
+                pool = self._ensure_pool()
+                try:
+                    future = pool.submit(_score_shard, shard, batch_size, max_tokens, max_length)
+                except BrokenProcessPool:
+                    self._discard_pool(pool)
+                    queue.appendleft((start, shard))
+                    continue
+                pending[future] = (pool, start, shard)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pool, start, shard = pending.pop(future)
+                try:
+                    shard_results, ok = future.result()
+                except Exception as e:
+                    logging.error(f"分片 [{start}, {start + len(shard)}) 失败: {e!r}")
+                    if isinstance(e, BrokenProcessPool):
+                        self._discard_pool(pool)
+                    failed.append((start, shard))
+                    continue
+                results[start:start + len(shard)] = shard_results
+                succeeded[start:start + len(shard)] = ok
+                processed += len(shard)
+                elapsed = time.time() - start_time
+                logging.info(f"已处理 {processed} / {total} 条新闻。耗时: {elapsed:.1f}s "
+                             f"({processed / max(elapsed, 1e-9):.1f} 条/秒)")
+        return failed
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> 'SentimentWorkerPool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+stream_pipeline.py
+---------------------------------
+流式模式：抓取 → 清洗 → 情感评分 → 追加写出，各阶段之间只传递有界大小的数据块
+
+- 数据源：EventRegistry（FetchStream：NewsPipeline 每提交一页即推入有界队列）或本地原始 CSV（分块读取）
+- 每块调用 clean_news_dataframe，再经 sentiment_top.score_articles 评分（情感缓存、按 token 分批、
+  近重复簇只评一次，与批处理模式相同），最后逐块写出
+- CSV 输出每次运行重新写（开始时清空旧文件）；.parquet 输出追加到分区目录（与 data_pipe 的 Parquet 存储一致）
+- 启用近重复检测时，最近 DEFAULT_RECENT_CLUSTERS 个簇的结果留在内存中，后续块里的转载稿直接复用
+- 峰值内存只与 chunk_size 和队列长度有关，与语料总量无关
+- 第一页抓到后即开始评分，无需等待整个抓取任务结束
+
+用法:
+    python src/stream_pipeline.py --source api --symbols 0700.HK 9988.HK --recent_pages 2
+    python src/stream_pipeline.py --source file --input news_out/articles_archive.csv --chunk_size 256
+
+Author: ChatGPT (Market Alpha: NLP-Driven Factor Study)
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from clean_data import clean_news_dataframe
+from article_store import write_partitioned
+from er_cache import CACHE_MODES
+from near_dup import tag_near_duplicates
+
+DEFAULT_CHUNK_SIZE = 128
+DEFAULT_QUEUE_PAGES = 8
+# 最近评过分的近重复簇数（转载稿常晚于原稿几页到达，落在后面的块里）
+DEFAULT_RECENT_CLUSTERS = 10000
+DEFAULT_OUTPUT_FILE = 'data/processed/articles_with_sentiment_stream.csv'
+
+_DONE = object()
+
+
+class FetchStream:
+    """
+    在后台线程运行 NewsPipeline，逐页产出新写入的文章行
+
+    Args:
+        pipe: NewsPipeline 实例
+        mode: "recent"、"archive" 或 "both"
+        queue_pages: 队列最多缓存的页数（背压：下游慢时抓取线程阻塞）
+    """
+
+    def __init__(self, pipe, mode: str = "recent", queue_pages: int = DEFAULT_QUEUE_PAGES):
+        self.pipe = pipe
+        self.mode = mode
+        self._q: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, queue_pages))
+        self._errors: List[BaseException] = []
+
+    def _produce(self) -> None:
+        pipe = self.pipe
+        pipe.on_commit = self._q.put
+        try:
+            if self.mode in ("recent", "both") and pipe.cfg.recent_pages > 0:
+                pipe.run_recent()
+            if self.mode in ("archive", "both") and pipe.cfg.archive_pages > 0 and pipe.cfg.years:
+                pipe.run_archive()
+        except BaseException as e:  # 传回主线程再抛出
+            self._errors.append(e)
+        finally:
+            pipe.on_commit = None
+            self._q.put(_DONE)
+
+    def idle(self) -> bool:
+        """抓取线程暂时没有新页可取"""
+        return self._q.empty()
+
+    def __iter__(self) -> Iterator[List[Dict[str, Any]]]:
+        worker = threading.Thread(target=self._produce, name="stream-fetch", daemon=True)
+        worker.start()
+        while True:
+            item = self._q.get()
+            if item is _DONE:
+                break
+            yield item
+        worker.join()
+        if self._errors:
+            raise self._errors[0]
+
+
+def iter_file_pages(input_file: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """分块读取原始 CSV / JSONL 文件"""
+    if input_file.endswith('.jsonl'):
+        reader = pd.read_json(input_file, lines=True, chunksize=chunk_size)
+    else:
+        reader = pd.read_csv(input_file, chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk.to_dict('records')
+
+
+def rechunk(pages: Iterable[List[Dict[str, Any]]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """
+    将任意大小的页重新切分为不超过 chunk_size 行的数据块
+
+    缓冲区凑满即产出；数据源为 FetchStream 且暂时没有新页时也会提前产出不满的块，保证首批评分的延迟
+    """
+    idle = getattr(pages, "idle", None)
+    buf: List[Dict[str, Any]] = []
+    for page in pages:
+        buf.extend(page)
+        while len(buf) >= chunk_size:
+            yield pd.DataFrame(buf[:chunk_size])
+            buf = buf[chunk_size:]
+        if buf and idle is not None and idle():
+            yield pd.DataFrame(buf)
+            buf = []
+    if buf:
+        yield pd.DataFrame(buf)
+
+
+def append_results(df: pd.DataFrame, output_file: str) -> int:
+    """
+    追加写出：.parquet 结尾写入分区目录，否则追加到 CSV（首次写表头）
+
+    CSV 已有表头时按表头列顺序追加；列集合不同（如某块多了 canonical_uri）时合并后重写整个文件
+    """
+    if df.empty:
+        return 0
+    if Path(output_file).suffix == '.parquet':
+        return write_partitioned(df, output_file)
+    path = Path(output_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        header = list(pd.read_csv(path, nrows=0).columns)
+        if set(header) != set(df.columns):
+            merged = pd.concat([pd.read_csv(path), df], ignore_index=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            merged.to_csv(tmp_path, index=False, encoding='utf-8')
+            tmp_path.replace(path)
+            logging.info(f"输出列变化，重写 {path}")
+            return len(df)
+        df = df[header]
+    df.to_csv(path, mode='a', header=not path.exists(), index=False, encoding='utf-8')
+    return len(df)
+
+
+def run_stream(
+    pages: Iterable[List[Dict[str, Any]]],
+    output_file: str,
+    text_column: str = 'body',
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: Optional[int] = None,
+    sentiment_pipeline=None,
+    cache_db: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+    near_dup_db: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    执行流式清洗 + 评分 + 写出
+
+    Args:
+        pages: 页迭代器（FetchStream / iter_file_pages）
+        output_file: 输出文件路径（CSV 在开始时清空；.parquet 分区目录只追加）
+        text_column: 文本列名
+        chunk_size: 每块最大行数
+        batch_size: 情感模型批大小（默认 sentiment_top.DEFAULT_BATCH_SIZE）
+        sentiment_pipeline: 已加载的模型（可选，默认现场加载）
+        cache_db: 持久化情感缓存路径（None 表示不使用缓存）
+        max_tokens: 每批 padding 后 token 上限（0 / None 表示按固定条数分批）
+        near_dup_db: 近重复索引路径（可选；转载稿跨块归入同一簇，最近的簇只评分一次）
+
+    Returns:
+        运行统计
+    """
+    from sentiment_top import (DEFAULT_BATCH_SIZE, add_sentiment_scores, load_sentiment_model,
+                               open_sentiment_cache, score_articles)
+
+    if sentiment_pipeline is None:
+        sentiment_pipeline = load_sentiment_model()
+    batch_size = batch_size or DEFAULT_BATCH_SIZE
+    source = getattr(sentiment_pipeline, 'sentiment_source', 'transformer')
+
+    if Path(output_file).suffix != '.parquet' and os.path.exists(output_file):
+        # 重跑不应把同一批结果再追加一遍
+        logging.info(f"覆盖上次运行的输出: {output_file}")
+        os.remove(output_file)
+    stats = {'chunks': 0, 'rows_in': 0, 'rows_scored': 0, 'first_score_sec': None}
+    start = time.time()
+    cache = open_sentiment_cache(sentiment_pipeline, cache_db) if cache_db else None
+    clusters: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+    try:
+        for chunk in rechunk(pages, chunk_size):
+            stats['chunks'] += 1
+            stats['rows_in'] += len(chunk)
+            cleaned = clean_news_dataframe(chunk)
+            if cleaned.empty or text_column not in cleaned.columns:
+                continue
+            keys = None
+            if near_dup_db and 'uri' in cleaned.columns:
+                cleaned = tag_near_duplicates(cleaned, near_dup_db, text_column=text_column)
+                keys = cleaned['canonical_uri'].tolist()
+            # 前面块里已评分的簇直接复用结果，其余交给 score_articles（块内同簇也只评一次）
+            if keys is None:
+                known = np.zeros(len(cleaned), dtype=bool)
+            else:
+                known = np.array([k in clusters for k in keys], dtype=bool)
+            results: List[Optional[Dict[str, Any]]] = [clusters[keys[i]] if known[i] else None
+                                                       for i in range(len(cleaned))]
+            fresh = np.flatnonzero(~known)
+            if len(fresh):
+                fresh_results = score_articles(cleaned.iloc[fresh], sentiment_pipeline, text_column, batch_size,
+                                               cache, max_tokens)
+                for pos, result in zip(fresh, fresh_results):
+                    results[pos] = result
+            if keys is not None:
+                for key, result in zip(keys, results):
+                    clusters[key] = result
+                    clusters.move_to_end(key)
+                while len(clusters) > DEFAULT_RECENT_CLUSTERS:
+                    clusters.popitem(last=False)
+            scored = add_sentiment_scores(cleaned, results, text_column, source=source)
+            stats['rows_scored'] += append_results(scored, output_file)
+            if stats['first_score_sec'] is None:
+                stats['first_score_sec'] = round(time.time() - start, 2)
+                logging.info(f"首批评分已写出，距启动 {stats['first_score_sec']} 秒")
+    finally:
+        if cache is not None:
+            stats['cache'] = cache.stats()
+            cache.close()
+    stats['elapsed_sec'] = round(time.time() - start, 2)
+    logging.info(f"流式处理完成: {stats}")
+    return stats
+
+
+def main():
+    """
+    命令行入口函数
+    """
+    parser = argparse.ArgumentParser(description="流式抓取 → 清洗 → 情感评分")
+    parser.add_argument("--source", choices=["api", "file"], default="file", help="数据源")
+    parser.add_argument("--input", "-i", help="原始新闻 CSV / JSONL（--source file）")
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT_FILE, help="输出路径（CSV 每次运行重写；.parquet 结尾追加到分区目录）")
+    parser.add_argument("--text_column", "-t", default="body", help="文本列名")
+    parser.add_argument("--chunk_size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块最大行数")
+    parser.add_argument("--batch_size", "-b", type=int, default=None, help="情感模型批大小")
+    parser.add_argument("--queue_pages", type=int, default=DEFAULT_QUEUE_PAGES, help="抓取队列最多缓存的页数")
+    parser.add_argument("--sentiment_cache_db", default=None,
+                        help="持久化情感缓存路径（默认同 sentiment_top.py 的 --cache_db）")
+    parser.add_argument("--no_sentiment_cache", action="store_true", help="不使用情感缓存")
+    parser.add_argument("--max_tokens", type=int, default=None,
+                        help="每批 padding 后 token 上限（默认同 sentiment_top.py），0 表示按 --batch_size 固定条数分批")
+    parser.add_argument("--near_dup_db", help="近重复 LSH 索引路径（启用后转载稿每簇只评分一次）")
+    # --source api 时的抓取参数（含义同 data_pipe.py）
+    parser.add_argument("--symbols", nargs="*", default=[], help="股票代码")
+    parser.add_argument("--universe_file", help="股票池 CSV（需含 symbol 列）")
+    parser.add_argument("--years", type=int, nargs="*", default=[], help="历史年份")
+    parser.add_argument("--recent_pages", type=int, default=0, help="近期页数")
+    parser.add_argument("--archive_pages", type=int, default=0, help="每年历史页数")
+    parser.add_argument("--outdir", default="news_out", help="抓取输出目录")
+    parser.add_argument("--workers", type=int, default=1, help="并发抓取线程数")
+    parser.add_argument("--rate", type=float, default=2.5, help="请求速率上限（次/秒）")
+    parser.add_argument("--cache", choices=CACHE_MODES, default="use", help="响应缓存模式")
+    parser.add_argument("--verbose", "-v", action="store_true", help="详细日志")
+
+    args = parser.parse_args()
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    logging.basicConfig(
+        level=log_level,
+        format='%(asctime)s %(levelname)s %(message)s',
+        handlers=[logging.StreamHandler()]
+    )
+
+    try:
+        if args.source == "file":
+            if not args.input:
+                parser.error("--source file 需要 --input")
+            pages = iter_file_pages(args.input, args.chunk_size)
+        else:
+            # 仅 API 模式才需要 eventregistry
+            from data_pipe import NewsPipeline, PipeConfig
+            symbols = list(args.symbols)
+            if args.universe_file:
+                symbols.extend(pd.read_csv(args.universe_file)['symbol'].tolist())
+            cfg = PipeConfig(
+                keywords=None,
+                symbols=symbols,
+                years=args.years,
+                recent_pages=max(0, args.recent_pages),
+                archive_pages=max(0, args.archive_pages),
+                lang=None,
+                outdir=args.outdir,
+                workers=max(1, args.workers),
+                rate_per_sec=args.rate,
+                cache_mode=args.cache,
+            )
+            api_key = os.getenv("ER_API_KEY")
+            if not api_key and cfg.cache_mode != "replay":
+                logging.error("请先设置 ER_API_KEY")
+                return 1
+            pages = FetchStream(NewsPipeline(api_key, cfg), mode="both", queue_pages=args.queue_pages)
+
+        from sentiment_top import DEFAULT_CACHE_DB, DEFAULT_MAX_TOKENS
+        cache_db = None if args.no_sentiment_cache else (args.sentiment_cache_db or DEFAULT_CACHE_DB)
+        max_tokens = DEFAULT_MAX_TOKENS if args.max_tokens is None else args.max_tokens
+        stats = run_stream(pages, args.output, args.text_column, args.chunk_size, args.batch_size,
+                           cache_db=cache_db, max_tokens=max_tokens, near_dup_db=args.near_dup_db)
+        print("\n✅ 流式处理完成!")
+        print(f"📊 输入 {stats['rows_in']} 行，评分写出 {stats['rows_scored']} 行，共 {stats['chunks']} 块")
+        print(f"⏱️  首批评分: {stats['first_score_sec']}s，总耗时: {stats['elapsed_sec']}s")
+        print(f"📁 结果已{'追加' if Path(args.output).suffix == '.parquet' else '保存'}到: {args.output}")
+
+    except Exception as e:
+        logging.error(f"流式处理失败: {e}")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
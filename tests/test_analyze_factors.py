@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from analyze_factors import analyze_factor_distribution, analyze_factor_distribution_streaming, load_factor_data
+
+
+def test_streaming_distribution_matches_in_memory(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=50).strftime("%Y-%m-%d").repeat(n // 50),
+        "code": [f"{i % 30:04d}" for i in range(n)],
+        "sentiment_factor": np.round(rng.normal(size=n), 1),
+        "weighted_factor": rng.normal(size=n),
+        "news_count": rng.integers(1, 5, size=n),
+    })
+    path = tmp_path / "factors.csv"
+    df.to_csv(path, index=False)
+
+    exact = analyze_factor_distribution(load_factor_data(str(path)))
+    streamed = analyze_factor_distribution_streaming(str(path), chunk_size=700)
+
+    assert streamed["sentiment_distribution"] == exact["sentiment_distribution"]
+    assert streamed["news_count_distribution"] == exact["news_count_distribution"]
+    assert streamed["overview"]["records"] == exact["overview"]["records"] == n
+    assert streamed["overview"]["dates"] == pytest.approx(50, rel=0.05)
+    assert streamed["overview"]["codes"] == pytest.approx(30, rel=0.05)
+    for key in ("sentiment_stats", "weighted_stats", "news_count_stats"):
+        for stat in ("mean", "std", "min", "max"):
+            assert streamed[key][stat] == pytest.approx(exact[key][stat], rel=1e-6, abs=1e-9)
+        assert streamed[key]["50%"] == pytest.approx(exact[key]["50%"], rel=0.05, abs=0.05)
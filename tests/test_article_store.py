@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+pytest.importorskip("pyarrow")
+
+from article_store import ParquetSink, read_partitioned
+
+
+def test_partitioned_roundtrip_with_pushdown(tmp_path):
+    rows = [
+        {"uri": "1", "body": "a", "date": "2025-07-30", "dateTime": "2025-07-30T01:00:00Z", "target": "0700.HK"},
+        {"uri": "2", "body": "b", "date": "2025-08-01", "dateTime": "2025-08-01T01:00:00Z", "target": "0700.HK"},
+        {"uri": "3", "body": None, "date": "2025-08-15", "dateTime": "2025-08-15T01:00:00Z", "target": "9988.HK"},
+    ]
+    sink = ParquetSink(str(tmp_path))
+    sink.add(rows)
+    assert sink.flush() == 3
+    assert (tmp_path / "month=2025-08" / "symbol=9988.HK").is_dir()
+
+    aug = read_partitioned(str(tmp_path), start="2025-08-01", end="2025-08-31")
+    assert sorted(aug["uri"]) == ["2", "3"]
+    assert "month" not in aug.columns
+
+    tencent = read_partitioned(str(tmp_path), symbols=["0700.HK"])
+    assert sorted(tencent["uri"]) == ["1", "2"]
+    assert pd.api.types.is_datetime64_any_dtype(tencent["dateTime"])
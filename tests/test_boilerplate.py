@@ -0,0 +1,95 @@
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from boilerplate import (BoilerplateConfig, SentenceIndex, boilerplate_report, boilerplate_texts, sentence_hash,
+                         split_sentences, strip_boilerplate)
+
+DISCLAIMER = "This article is for information only and does not constitute investment advice of any kind."
+WRAP = "The Hang Seng Index closed down 1.2% at 17,250 points in afternoon trading."
+
+
+def _articles(n=30):
+    bodies = []
+    for i in range(n):
+        wrap = WRAP.replace("1.2", f"{i % 5}.{i % 7}")
+        bodies.append(f"Company {i} reported results. Shares moved {i} percent. {wrap}\n{DISCLAIMER}")
+    return pd.DataFrame({"uri": [f"u{i}" for i in range(n)], "body": bodies})
+
+
+class FakePipeline:
+    """按字符数估算 token（无分词器），标签由正文是否含 reported 决定"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts, **kwargs):
+        self.batches.append(list(texts))
+        return [[{"label": "positive" if "reported" in t else "neutral", "score": 0.9},
+                 {"label": "negative", "score": 0.1}] for t in texts]
+
+
+def test_split_and_normalized_hash():
+    assert split_sentences("A b. C d!\n恒指跌1.2%。科技股领跌") == ["A b.", "C d!", "恒指跌1.2%。", "科技股领跌"]
+    # 数字不同的模板句视为同一句
+    assert sentence_hash("Index fell 1.2%  today.") == sentence_hash("index fell 3.4% today.")
+    assert sentence_hash("Index fell today.") != sentence_hash("Index rose today.")
+
+
+def test_index_counts_documents_once_and_strips_frequent_sentences():
+    df = _articles()
+    index = SentenceIndex(":memory:")
+    assert index.add_documents(zip(df["uri"], df["body"])) == 30
+    # 重复入库不重复计数
+    assert index.add_documents(zip(df["uri"], df["body"])) == 0
+    assert index.frequencies([sentence_hash(DISCLAIMER)]) == {sentence_hash(DISCLAIMER): 30}
+    assert index.top(1)[0][0] == 30
+
+    stripped, stats = strip_boilerplate(df["body"].tolist(), index, min_count=10)
+    assert stats["texts_changed"] == 30 and stats["boilerplate_sentences"] == 60
+    assert all(DISCLAIMER not in t and "Hang Seng" not in t and t.startswith("Company") for t in stripped)
+    # 短句即使常见也保留；全部是样板句的文章保持原文
+    kept, _ = strip_boilerplate([DISCLAIMER, "Shares moved."], index, min_count=10)
+    assert kept == [DISCLAIMER, "Shares moved."]
+
+    demoted, _ = strip_boilerplate(["Tencent fell. " + DISCLAIMER + " Outlook is weak."], index, min_count=10,
+                                   mode="demote")
+    assert demoted == ["Tencent fell. Outlook is weak. " + DISCLAIMER]
+    index.close()
+
+
+def test_report_counts_tokens_removed():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = BoilerplateConfig(os.path.join(tmp, "bp.sqlite"), min_count=10)
+        report = boilerplate_report(_articles(), FakePipeline(), config, batch_size=8)
+    assert report["tokens_removed"] > 0 and report["tokens_after"] < report["tokens_before"]
+    assert report["tokens_removed_fraction"] > 0.4
+    assert report["label_agreement"] == 1.0
+    assert report["speedup"] is not None
+
+
+def test_missing_uris_fall_back_to_body_hash():
+    df = _articles(12)
+    df.loc[::2, "uri"] = None
+    with tempfile.TemporaryDirectory() as tmp:
+        config = BoilerplateConfig(os.path.join(tmp, "bp.sqlite"), min_count=10)
+        stripped, stats = boilerplate_texts(df, "body", config)
+    # 缺失 uri 的 6 篇各自计数，免责声明出现在全部 12 篇，达到 min_count
+    assert stats["indexed_documents"] == 12
+    assert all(DISCLAIMER not in t for t in stripped)
+
+
+def test_report_alternates_timing_order():
+    df = _articles()
+    pipeline = FakePipeline()
+    with tempfile.TemporaryDirectory() as tmp:
+        config = BoilerplateConfig(os.path.join(tmp, "bp.sqlite"), min_count=10)
+        report = boilerplate_report(df, pipeline, config, batch_size=30, repeats=2)
+    # 预热之后：第一轮原文先评分，第二轮去样板文本先评分
+    timed = ["original" if DISCLAIMER in batch[0] else "stripped" for batch in pipeline.batches[1:]]
+    assert timed == ["original", "stripped", "stripped", "original"]
+    assert report["timing_repeats"] == 2
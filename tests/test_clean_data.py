@@ -0,0 +1,190 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from clean_data import (clean_text_content, clean_text_series, detect_language, detect_language_series,
+                        normalize_datetime, normalize_datetime_series)
+
+TEXTS = [
+    "<p>Tencent&nbsp;Holdings &amp; Alibaba</p>\n\n  rose   2%",
+    "腾讯控股　今日公布<b>第二季度</b>业绩，收入同比增长１５％。",
+    "ＮＶＩＤＩＡ​ earnings\x00 beat\t\testimates ¨ today",
+    "삼성전자 주가가 오늘 크게 올랐습니다 and more",
+    "  \r\n  ",
+    "short",
+    "",
+    None,
+    float("nan"),
+    12345,
+    "a \x07 b &lt;tag&gt; <br/> c d",
+    "混合 text 中文 and English 文本内容测试",
+]
+
+
+def test_clean_text_series_matches_scalar():
+    series = pd.Series(TEXTS, dtype=object)
+    expected = [clean_text_content(t) for t in TEXTS]
+    assert clean_text_series(series).tolist() == expected
+
+
+def test_detect_language_series_matches_scalar():
+    texts = [clean_text_content(t) for t in TEXTS] + TEXTS
+    expected = [detect_language(t) for t in texts]
+    assert detect_language_series(pd.Series(texts, dtype=object)).tolist() == expected
+
+
+def test_normalize_datetime_series_matches_scalar():
+    dates = ["2025-08-01", "2025-08-01", "2025-8-1", "2025-13-01", None, "2025-08-02", "bad", "2025-08-03"]
+    times = ["10:15:00", None, "9:05:07", "10:00:00", "10:00:00", "nan", "10:00:00", float("nan")]
+    expected = [normalize_datetime(d, t) for d, t in zip(dates, times)]
+    result = normalize_datetime_series(pd.Series(dates, dtype=object), pd.Series(times, dtype=object))
+    assert [None if pd.isna(v) else v.to_pydatetime() for v in result] == expected
+
+
+def test_clean_news_dataframe_matches_row_wise_reference():
+    from clean_data import clean_news_dataframe
+
+    n = len(TEXTS)
+    raw = pd.DataFrame({
+        "uri": [str(i) for i in range(n)],
+        "url": [f"u{i}" for i in range(n)],
+        "title": TEXTS[::-1],
+        "body": [t if not isinstance(t, str) else t * 3 for t in TEXTS],
+        "date": ["2025-08-01"] * n,
+        "time": ["10:00:00", None] * (n // 2),
+    })
+    reference = raw.copy()
+    for col in ["title", "body"]:
+        reference[col] = reference[col].apply(clean_text_content)
+    reference["datetime_clean"] = [normalize_datetime(d, t) for d, t in zip(raw["date"], raw["time"])]
+    reference["detected_lang"] = reference["body"].apply(detect_language)
+    reference = reference[reference["body"].str.len() >= 10]
+
+    result = clean_news_dataframe(raw)
+    assert result["uri"].tolist() == reference["uri"].tolist()
+    for col in ["title", "body", "detected_lang"]:
+        assert result[col].tolist() == reference[col].tolist()
+    assert result["datetime_clean"].tolist() == pd.to_datetime(reference["datetime_clean"]).tolist()
+
+
+def test_parallel_chunked_cleaning_matches_serial(tmp_path):
+    from clean_data import clean_news_dataframe, clean_news_parallel, iter_raw_chunks
+
+    rows = []
+    for i in range(40):
+        rows.append({"uri": str(i % 30), "url": f"u{i % 30}", "title": f"T{i % 30}",
+                     "body": "<p>short</p>" if i == 3 else f"Tencent &amp; Alibaba news item {i} body text",
+                     "date": "2025-08-01", "time": "10:00:00"})
+    raw = tmp_path / "raw.csv"
+    pd.DataFrame(rows).to_csv(raw, index=False)
+
+    serial = clean_news_dataframe(pd.read_csv(raw))
+    parallel = clean_news_parallel(iter_raw_chunks(str(raw), chunk_size=7), workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_incremental_cleaning_appends_new_and_replaces_changed(tmp_path):
+    from clean_data import clean_and_save_news
+
+    raw = tmp_path / "raw.csv"
+    out_dir = tmp_path / "out"
+    rows = [{"uri": f"u{i}", "url": f"http://x/{i}", "title": f"t{i}", "body": f"<b>Tencent</b> article number {i}"}
+            for i in range(3)]
+    pd.DataFrame(rows).to_csv(raw, index=False)
+    first, _ = clean_and_save_news(str(raw), output_dir=str(out_dir), incremental=True)
+    assert len(first) == 3
+
+    rows[1]["body"] = "Tencent article number 1, updated with a correction"
+    rows.append({"uri": "u3", "url": "http://x/3", "title": "t3", "body": "Alibaba article number 3"})
+    pd.DataFrame(rows).to_csv(raw, index=False)
+    second, _ = clean_and_save_news(str(raw), output_dir=str(out_dir), incremental=True)
+    assert sorted(second["uri"]) == ["u1", "u3"]
+
+    third, _ = clean_and_save_news(str(raw), output_dir=str(out_dir), incremental=True)
+    assert third.empty
+
+    merged = pd.read_csv(out_dir / "raw_cleaned.csv")
+    assert merged["uri"].tolist() == ["u0", "u2", "u1", "u3"]
+    assert merged.loc[merged["uri"] == "u1", "body"].item() == "Tencent article number 1, updated with a correction"
+
+
+def test_incremental_reads_only_appended_rows(tmp_path, monkeypatch):
+    import clean_data
+    from clean_manifest import CleanManifest
+
+    raw = tmp_path / "raw.jsonl"
+    out_dir = tmp_path / "out"
+    rows = pd.DataFrame({"uri": [f"u{i}" for i in range(1000)], "url": [f"http://x/{i}" for i in range(1000)],
+                         "title": "t", "body": [f"Tencent article number {i}" for i in range(1000)]})
+    rows.iloc[:990].to_json(raw, orient="records", lines=True)
+    first, _ = clean_data.clean_and_save_news(str(raw), output_dir=str(out_dir), incremental=True)
+    assert len(first) == 990
+
+    # data_pipe.py 只追加；第二次只读取并比对新增的行（外加一行未写完的半行留到下次）
+    with open(raw, "a", encoding="utf-8") as f:
+        f.write(rows.iloc[990:].to_json(orient="records", lines=True) + '{"uri": "partial')
+    reads = []
+    read_appended = clean_data.read_appended
+    monkeypatch.setattr(clean_data, "read_appended", lambda path, offset: reads.append(offset) or
+                        read_appended(path, offset))
+    second, _ = clean_data.clean_and_save_news(str(raw), output_dir=str(out_dir), incremental=True)
+    assert reads[0] > 0 and sorted(second["uri"]) == sorted(f"u{i}" for i in range(990, 1000))
+
+    manifest = CleanManifest(str(out_dir / "raw_cleaned.csv.manifest.sqlite"))
+    assert len(manifest.lookup(rows["uri"])) == 1000
+    assert manifest.resume_offset(str(raw)) == os.path.getsize(raw) - len('{"uri": "partial')
+    manifest.close()
+
+
+def test_cleaned_language_column_drives_sentiment_grouping(tmp_path):
+    from clean_data import clean_and_save_news, language_counts
+    from sentiment_top import score_articles
+
+    bodies = ["Tencent shares rose after strong quarterly results", "腾讯控股今日公布第二季度业绩，收入同比增长",
+              "Alibaba cut prices across its cloud product line", "阿里巴巴宣布下调云计算产品价格以争夺客户",
+              "Meituan posted a wider loss in food delivery", "삼성전자 주가가 오늘 크게 올랐습니다 오늘 크게"]
+    raw = tmp_path / "raw.csv"
+    pd.DataFrame({"uri": [f"u{i}" for i in range(6)], "url": [f"http://x/{i}" for i in range(6)],
+                  "title": "t", "body": bodies}).to_csv(raw, index=False)
+    cleaned, _ = clean_and_save_news(str(raw), output_dir=str(tmp_path / "out"))
+    assert cleaned["detected_lang"].tolist() == ["en", "zh", "en", "zh", "en", "ko"]
+    assert language_counts(cleaned) == {"en": 3, "zh": 2, "ko": 1}
+    # 已有 detected_lang 列时直接复用，不重新检测
+    assert language_counts(cleaned.assign(detected_lang="en")) == {"en": 6}
+
+    seen = []
+    bodies = cleaned["body"].tolist()
+
+    def fake_pipeline(batch, **kwargs):
+        seen.extend(batch)
+        return [[{"label": "positive", "score": bodies.index(t) / 10}, {"label": "negative", "score": 0.0}]
+                for t in batch]
+
+    results = score_articles(cleaned, fake_pipeline, "body", batch_size=2)
+    # 模型按语言连续看到文本（语言内保持原顺序），结果仍按行顺序返回
+    assert seen == [bodies[i] for i in (0, 2, 4, 5, 1, 3)]
+    assert [r["score"] for r in results] == [i / 10 for i in range(6)]
+
+
+def test_read_appended_stops_at_last_complete_csv_record(tmp_path):
+    from clean_manifest import read_appended
+
+    raw = tmp_path / "raw.csv"
+    rows = pd.DataFrame({"uri": [f"u{i}" for i in range(4)], "title": "t",
+                         "body": [f"Tencent line one {i}\nline two, with comma\n\"quoted\" end" for i in range(4)]})
+    text = rows.to_csv(index=False)
+    # 写入方追加到第 4 条正文引号内的换行处
+    cut = text.index("line two", text.index("u3"))
+    raw.write_text(text[:cut], encoding="utf-8")
+    first, end = read_appended(str(raw), 0)
+    assert first["uri"].tolist() == ["u0", "u1", "u2"] and first["body"].tolist() == rows["body"][:3].tolist()
+    assert end == len(text[:text.index("u3")].encode("utf-8"))
+
+    raw.write_text(text, encoding="utf-8")
+    rest, end = read_appended(str(raw), end)
+    assert rest.columns.tolist() == ["uri", "title", "body"]
+    assert rest["uri"].tolist() == ["u3"] and rest["body"].item() == rows["body"][3]
+    assert end == len(text.encode("utf-8"))
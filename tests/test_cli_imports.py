@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cli import COMMANDS, HEAVY_MODULES, measure_import_time, parse_importtime
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+@pytest.mark.parametrize("name", sorted(COMMANDS))
+def test_subcommand_import_within_budget(name):
+    result = measure_import_time(name)
+    assert result["ok"], result["error"]
+    assert not result["heavy_imports"], f"{name} 加载时导入了重依赖: {result['heavy_imports']}"
+    if not result["within_budget"]:
+        # 预算约为实测的 3 倍；超出时再测一次，排除偶发的机器负载
+        result = measure_import_time(name)
+    assert result["within_budget"], f"{name} 导入耗时 {result['import_ms']} ms 超出预算 {result['budget_ms']} ms"
+
+
+def test_parse_importtime_counts_top_level_only():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |   _io",
+        "import time:       200 |        300 | encodings",
+        "import time:      1000 |       1000 |     torch._C",
+        "import time:       500 |       1500 |   torch",
+        "import time:        50 |       2050 | cli",
+    ])
+    total_ms, modules = parse_importtime(stderr)
+    assert total_ms == pytest.approx(2.35)
+    assert {"torch", "torch._C", "cli"} <= modules
+    assert "torch" in HEAVY_MODULES
+
+
+def test_validate_only_via_cli():
+    p = subprocess.run([sys.executable, "src/cli.py", "run-real", "data/sample_news.csv", "--validate-only"],
+                       cwd=ROOT, capture_output=True, text=True)
+    assert p.returncode == 0, p.stderr
+    assert '"valid": true' in p.stdout
@@ -0,0 +1,156 @@
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+import data_pipe
+from data_pipe import NewsPipeline, PipeConfig, TokenBucket
+
+
+class FakeER:
+    """按 (keywords, 窗口, 页) 生成确定的文章；fail 中的单元先失败指定次数"""
+
+    def __init__(self, pages=3, per_page=2, delay=0.0, fail=None):
+        self.pages = pages
+        self.per_page = per_page
+        self.delay = delay
+        self.fail = dict(fail or {})
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, er, keywords, page, lang=None, date_start=None, date_end=None, **kwargs):
+        unit = (keywords, date_start, date_end, page)
+        with self.lock:
+            self.calls.append((time.monotonic(), unit))
+            if self.fail.get(unit):
+                self.fail[unit] -= 1
+                raise RuntimeError("HTTP 429")
+        # 后面的页返回得更快，检验输出顺序不依赖完成顺序
+        time.sleep(self.delay / page)
+        arts = [{"uri": f"{keywords}|{date_start}|{page}|{i}", "url": f"https://x/{keywords}/{page}/{i}",
+                 "title": f"{keywords} news", "body": "text", "date": date_start or "2024-06-01"}
+                for i in range(self.per_page)]
+        return arts, self.pages
+
+
+def _pipeline(monkeypatch, outdir, fake, **kwargs):
+    monkeypatch.setattr(data_pipe, "_eventregistry", lambda: types.SimpleNamespace(EventRegistry=lambda apiKey: None))
+    monkeypatch.setattr(data_pipe, "pull_articles_page", fake)
+    cfg = dict(keywords=None, symbols=["0700.HK", "9988.HK", "3690.HK"], years=[], recent_pages=3,
+               archive_pages=0, lang=None, outdir=str(outdir), cache_mode="off")
+    cfg.update(kwargs)
+    return NewsPipeline(api_key="k", cfg=PipeConfig(**cfg))
+
+
+def test_token_bucket_rate_and_burst():
+    bucket = TokenBucket(rate=50, burst=3)
+    stamps = []
+    threads = [threading.Thread(target=lambda: (bucket.acquire(), stamps.append(time.monotonic())))
+               for _ in range(13)]
+    start = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # 3 个突发令牌之后按 50/s 补充：13 次至少 10 / 50 秒
+    assert max(stamps) - start >= 10 / 50 * 0.9
+
+
+def test_concurrent_pull_respects_rate_and_keeps_window_order(monkeypatch, tmp_path):
+    fake = FakeER(pages=3, delay=0.05)
+    pipe = _pipeline(monkeypatch, tmp_path, fake, workers=4, rate_per_sec=20, burst=1)
+    start = time.monotonic()
+    written = pipe.run_recent()
+    assert written == 2 * 3 * 3 * 2  # jsonl + csv 各一行
+
+    stamps = sorted(t for t, _ in fake.calls)
+    assert len(stamps) == 9
+    assert stamps[-1] - start >= 8 / 20 * 0.9
+
+    rows = pd.read_csv(pipe.recent_csv)
+    assert rows["uri"].is_unique and len(rows) == 18
+    pages = rows["uri"].str.split("|").str[2].astype(int)
+    for _, group in rows.assign(page=pages).groupby("target"):
+        # 每个窗口第 1 页先落盘（它决定后续页数），其余页各一次
+        assert group["page"].iloc[0] == 1 and sorted(group["page"]) == [1, 1, 2, 2, 3, 3]
+
+
+def test_retries_go_through_the_rate_limiter(monkeypatch, tmp_path):
+    real_sleep = time.sleep
+    monkeypatch.setattr(data_pipe.time, "sleep", lambda s: real_sleep(min(s, 0.01)))
+    fake = FakeER(pages=1, fail={("0700.HK", None, None, 1): 2})
+    pipe = _pipeline(monkeypatch, tmp_path, fake, symbols=["0700.HK"], recent_pages=1, workers=2, max_retries=3)
+    acquired = []
+    acquire = pipe.limiter.acquire
+    monkeypatch.setattr(pipe.limiter, "acquire", lambda: (acquired.append(1), acquire()))
+    pipe.run_recent()
+    assert len(fake.calls) == 3 and len(acquired) == 3
+
+
+def _units(symbols, years, pages):
+    return {(s, f"{y}-01-01", f"{y}-12-31", p) for s in symbols for y in years for p in range(1, pages + 1)}
+
+
+def test_archive_resumes_at_unfinished_pages(monkeypatch, tmp_path):
+    archive = dict(symbols=["0700.HK", "9988.HK"], years=[2023, 2024], recent_pages=0, archive_pages=3, workers=1,
+                   max_retries=0, rate_per_sec=200, burst=10)
+    crash = FakeER(pages=3, fail={("9988.HK", "2023-01-01", "2023-12-31", 2): 1})
+    pipe = _pipeline(monkeypatch, tmp_path, crash, **archive)
+    with pytest.raises(RuntimeError):
+        pipe.run_archive()
+
+    # 进度表记录的是已落盘的 (query, 窗口, 页)；JSON 检查点只存计数，不随每页重写
+    done = {tuple(u.split("|")) for u in NewsPipeline(api_key="k", cfg=pipe.cfg).progress.done_units()}
+    done = {(q, ds, de, int(p)) for q, ds, de, p in done}
+    assert ("9988.HK", "2023-01-01", "2023-12-31", 1) in done
+    assert not os.path.exists(pipe.ckpt_path)
+
+    resume = FakeER(pages=3)
+    pipe = _pipeline(monkeypatch, tmp_path, resume, **archive)
+    pipe.run_archive()
+    refetched = [unit for _, unit in resume.calls]
+    assert len(refetched) == len(set(refetched))
+    assert not done & set(refetched)
+    assert done | set(refetched) == _units(archive["symbols"], archive["years"], 3)
+    assert pd.read_csv(pipe.archive_csv)["uri"].is_unique
+
+
+def test_shards_cover_every_window_once(monkeypatch, tmp_path):
+    keys = [data_pipe.window_key(f"{code:04d}.HK", f"{y}-01-01", f"{y}-12-31") for code in range(40)
+            for y in range(2018, 2025)]
+    for n in (1, 2, 3, 5):
+        owners = [[k for k in range(n) if data_pipe.in_shard(key, k, n)] for key in keys]
+        assert all(len(o) == 1 for o in owners)
+
+    archive = dict(symbols=["0700.HK", "9988.HK", "3690.HK"], years=[2022, 2023, 2024], recent_pages=0,
+                   archive_pages=2, workers=2, rate_per_sec=200, burst=10)
+    fetched = []
+    for k in range(3):
+        fake = FakeER(pages=2)
+        _pipeline(monkeypatch, tmp_path, fake, shard_index=k, shard_count=3, **archive).run_archive()
+        fetched.extend(unit for _, unit in fake.calls)
+    assert sorted(fetched) == sorted(_units(archive["symbols"], archive["years"], 2))
+
+
+def test_legacy_checkpoint_lists_move_into_progress_store(monkeypatch, tmp_path):
+    wkey = data_pipe.window_key("0700.HK", "2023-01-01", "2023-12-31")
+    with open(tmp_path / data_pipe.CHECKPOINT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"run_started_at": "2024-01-01T00:00:00", "last_written_archive": 4,
+                   "done_units": [data_pipe.unit_key(wkey, 1), data_pipe.unit_key(wkey, 2)],
+                   "window_pages": {wkey: 2}}, f)
+    fake = FakeER(pages=2)
+    pipe = _pipeline(monkeypatch, tmp_path, fake, symbols=["0700.HK"], years=[2023], recent_pages=0,
+                     archive_pages=2, rate_per_sec=200, burst=10)
+    assert pipe.state.last_written_archive == 4 and pipe.progress.window_pages(wkey) == 2
+    pipe.run_archive()
+    # 旧检查点里已完成的单元不再抓取，之后检查点只保存计数
+    assert fake.calls == []
+    with open(pipe.ckpt_path, encoding="utf-8") as f:
+        assert set(json.load(f)) == {"run_started_at", "last_written_recent", "last_written_archive"}
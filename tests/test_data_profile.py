@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from data_profile import DataProfile
+
+
+def test_merged_partial_profiles_match_full_frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "score": rng.normal(0.1, 0.5, 20000),
+        "uri": [f"u{i % 15000}" for i in range(20000)],
+        "body": ["short"] * 100 + ["long enough English body text"] * 19900,
+    })
+    df.loc[:49, "score"] = np.nan
+
+    left = DataProfile(numeric_columns=["score"], id_columns=["uri"]).update(df.iloc[:7000])
+    right = DataProfile(numeric_columns=["score"], id_columns=["uri"]).update(df.iloc[7000:])
+    report = left.merge(right).report()
+
+    expected = df["score"].describe()
+    stats = report["numeric_stats"]["score"]
+    assert stats["count"] == expected["count"]
+    assert np.isclose(stats["mean"], expected["mean"]) and np.isclose(stats["std"], expected["std"])
+    assert stats["min"] == expected["min"] and stats["max"] == expected["max"]
+    for q in ["25%", "50%", "75%"]:
+        assert abs(stats[q] - expected[q]) <= 0.02 * abs(expected[q]) + 1e-3
+    assert abs(report["approx_distinct"]["uri"] - 15000) < 15000 * 0.03
+    assert report["total_rows"] == 20000
+    assert report["missing_values"] == {"score": 50}
+    assert report["empty_content"] == 100
+    assert report["language_distribution"] == {"en": 19900, "other": 100}
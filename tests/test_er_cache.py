@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from er_cache import ResponseCache, normalize_query, query_key
+
+CLOSED = normalize_query("0700.HK", "eng", "2023-01-01", "2023-12-31", page=1)
+RECENT = normalize_query("0700.HK", "eng", None, None, page=1)
+
+
+class FakeFetch:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return [{"uri": f"a{self.calls}"}], 3
+
+
+def _age(cache, query, seconds):
+    """把缓存条目的抓取时间往前拨"""
+    path = cache._path(query_key(query))
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["fetched_at"] -= seconds
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+
+
+def test_use_mode_ttl_expires_open_windows_only(tmp_path):
+    cache = ResponseCache(str(tmp_path), mode="use", recent_ttl_min=1)
+    fetch = FakeFetch()
+    assert cache.fetch(RECENT, fetch) == ([{"uri": "a1"}], 3)
+    assert cache.fetch(RECENT, fetch) == ([{"uri": "a1"}], 3) and fetch.calls == 1
+
+    _age(cache, RECENT, 120)
+    assert cache.fetch(RECENT, fetch)[0] == [{"uri": "a2"}] and fetch.calls == 2
+
+    # 已结束的历史窗口永不过期
+    cache.fetch(CLOSED, fetch)
+    _age(cache, CLOSED, 10 * 365 * 86400)
+    assert cache.fetch(CLOSED, fetch)[0] == [{"uri": "a3"}] and fetch.calls == 3
+    assert cache.stats() == {"hits": 2, "misses": 3}
+
+
+def test_replay_never_calls_api_and_refresh_always_does(tmp_path):
+    fetch = FakeFetch()
+    ResponseCache(str(tmp_path), mode="use").fetch(CLOSED, fetch)
+
+    replay = ResponseCache(str(tmp_path), mode="replay", recent_ttl_min=0)
+    assert replay.fetch(CLOSED, fetch) == ([{"uri": "a1"}], 3)
+    # 未缓存的查询返回空页而不是访问 API
+    assert replay.fetch(RECENT, fetch) == ([], 0)
+    assert fetch.calls == 1 and replay.stats() == {"hits": 1, "misses": 1}
+
+    refresh = ResponseCache(str(tmp_path), mode="refresh")
+    assert refresh.fetch(CLOSED, fetch)[0] == [{"uri": "a2"}]
+    assert refresh.fetch(CLOSED, fetch)[0] == [{"uri": "a3"}] and fetch.calls == 3
+    # refresh 覆盖写入的结果随后被读到
+    assert ResponseCache(str(tmp_path), mode="use").fetch(CLOSED, fetch)[0] == [{"uri": "a3"}]
+
+    off = ResponseCache(str(tmp_path / "off"), mode="off")
+    off.fetch(CLOSED, fetch)
+    assert fetch.calls == 4 and not os.path.exists(tmp_path / "off")
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from near_dup import tag_near_duplicates
+
+WIRE = ("Tencent Holdings reported second-quarter revenue of 184 billion yuan, up 15% from a year earlier, "
+        "beating analyst estimates as its gaming and advertising businesses continued to recover.")
+
+
+def test_reprints_share_canonical_uri_across_runs(tmp_path):
+    db = str(tmp_path / "near_dup.sqlite")
+    first = tag_near_duplicates(pd.DataFrame({
+        "uri": ["a", "b"],
+        "body": [WIRE, "Alibaba shares fell after the company announced a restructuring of its cloud unit."],
+    }), db)
+    assert first["canonical_uri"].tolist() == ["a", "b"]
+
+    second = tag_near_duplicates(pd.DataFrame({
+        "uri": ["c"],
+        "body": ["(Reuters) " + WIRE + " Shares rose 2% in Hong Kong."],
+    }), db)
+    assert second["canonical_uri"].tolist() == ["a"]
+
+
+def test_missing_uri_articles_are_separate_clusters(tmp_path):
+    from factors import daily_factor_from_sentiment
+    from sentiment_top import score_articles
+
+    df = pd.DataFrame({"uri": [None, None, "c"], "body": ["profit up", "loss deep", "x"]})
+    tagged = tag_near_duplicates(df, str(tmp_path / "near_dup.sqlite"))
+    assert tagged["canonical_uri"].notna().all() and tagged["canonical_uri"].nunique() == 3
+
+    def fake_pipeline(batch, **kwargs):
+        return [[{"label": "positive" if "profit" in t else "negative", "score": 0.9},
+                 {"label": "neutral", "score": 0.1}] for t in batch]
+
+    # 已有结果文件中 canonical_uri 缺失
+    df["canonical_uri"] = [float("nan"), float("nan"), "c"]
+    results = score_articles(df, fake_pipeline, "body")
+    assert [r["label"] for r in results] == ["positive", "negative", "negative"]
+
+    scored = df.assign(date="2024-01-02", code="0700", sentiment_score=[0.9, -0.9, -0.9])
+    assert daily_factor_from_sentiment(scored)["news_count"].tolist() == [3]
@@ -0,0 +1,98 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from onnx_backend import OnnxSentimentPipeline, agreement_report, quantize_int8
+
+ID2LABEL = {0: "negative", 1: "neutral", 2: "positive"}
+
+
+class FakeTokenizer:
+    """每个字符一个 token，按批内最长 padding"""
+
+    def __call__(self, texts, truncation=True, max_length=512, padding=True, return_tensors="np"):
+        lengths = [min(len(t), max_length) if truncation else len(t) for t in texts]
+        width = max(lengths)
+        mask = np.array([[1] * n + [0] * (width - n) for n in lengths])
+        return {"input_ids": mask * 7, "attention_mask": mask}
+
+
+class FakeSession:
+    """logits 由有效 token 数决定：短文本偏负面，长文本偏正面"""
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, outputs, feeds):
+        assert outputs == ["logits"] and feeds["input_ids"].dtype == np.int64
+        n = feeds["attention_mask"].sum(axis=1).astype(np.float32)
+        self.batches.append(len(n))
+        return [np.stack([5 - n, np.ones_like(n), n - 5], axis=1)]
+
+
+def _fake_pipeline():
+    pipe = OnnxSentimentPipeline.__new__(OnnxSentimentPipeline)
+    pipe.session = FakeSession()
+    pipe.tokenizer = FakeTokenizer()
+    pipe.id2label = ID2LABEL
+    pipe.backend = "onnx"
+    return pipe
+
+
+def test_pipeline_output_shape_and_label_order():
+    pipe = _fake_pipeline()
+    texts = ["ab", "abcdefghijkl", "abcde"]
+
+    top1 = pipe(texts)
+    assert [r["label"] for r in top1] == ["negative", "positive", "neutral"]
+
+    # top_k=None：每条返回全部类别，按概率降序，概率和为 1，标签来自 id2label
+    everything = pipe(texts, top_k=None, batch_size=2)
+    assert pipe.session.batches[-2:] == [2, 1]
+    for ranked, best in zip(everything, top1):
+        assert len(ranked) == 3 and {r["label"] for r in ranked} == set(ID2LABEL.values())
+        assert [r["score"] for r in ranked] == sorted((r["score"] for r in ranked), reverse=True)
+        assert ranked[0] == best and sum(r["score"] for r in ranked) == pytest.approx(1.0)
+    assert [r["label"] for r in everything[1]] == ["positive", "neutral", "negative"]
+
+    assert len(pipe(texts, top_k=2)[0]) == 2
+    # max_length 截断改变有效 token 数
+    assert pipe(["abcdefghijkl"], max_length=3)[0]["label"] == "negative"
+
+
+def test_agreement_report_against_baseline():
+    baseline = _fake_pipeline()
+    report = agreement_report(["ab", "abcdefghijkl", "abcde", "abcdefg"] * 3, baseline,
+                              {"onnx": _fake_pipeline()}, batch_size=4)
+    assert report["n"] == 12
+    assert report["onnx"]["label_agreement"] == 1.0
+    assert report["onnx"]["max_prob_diff"] == 0.0
+    assert report["onnx"]["score_correlation"] == pytest.approx(1.0)
+    assert report["onnx"]["speedup"] > 0
+
+
+def test_int8_quantization_keeps_outputs_close(tmp_path):
+    ort = pytest.importorskip("onnxruntime")
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(0)
+    weight = rng.normal(size=(64, 3)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["x", "w"], ["logits"])], "tiny",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, ["batch", 64])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 3])],
+        initializer=[numpy_helper.from_array(weight, "w")])
+    path = tmp_path / "model.onnx"
+    onnx.save(helper.make_model(graph, opset_imports=[helper.make_opsetid("", 14)]), str(path))
+
+    int8_path = quantize_int8(path)
+    assert int8_path.name == "model.int8.onnx" and int8_path.exists()
+    x = rng.normal(size=(8, 64)).astype(np.float32)
+    full = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"]).run(["logits"], {"x": x})[0]
+    quant = ort.InferenceSession(str(int8_path), providers=["CPUExecutionProvider"]).run(["logits"], {"x": x})[0]
+    assert np.mean(full.argmax(axis=1) == quant.argmax(axis=1)) >= 0.75
@@ -0,0 +1,63 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from pipelined_scorer import PipelinedScorer, pad_batch
+from sentiment_top import analyze_sentiment_batch, model_fingerprint
+
+
+class FakeTokenizer:
+    pad_token_id = 1
+
+    def __call__(self, texts, truncation=True, max_length=512, **kwargs):
+        return {"input_ids": [[0] + [ord(c) for c in t][:max_length - 2] + [2] for t in texts]}
+
+
+class FakeModel:
+    """logits 只依赖非 padding 的 token，padding 方式不同结果应一致"""
+
+    tokenizer = FakeTokenizer()
+    model = SimpleNamespace(config=SimpleNamespace(id2label={0: "negative", 1: "neutral", 2: "positive"},
+                                                   _name_or_path="fake/model", _commit_hash="abc"))
+
+    def logits(self, input_ids, attention_mask):
+        if (input_ids == ord("!")).any():
+            raise RuntimeError("boom")
+        lengths = attention_mask.sum(axis=1).astype(np.float64)
+        return np.stack([np.zeros_like(lengths), np.ones_like(lengths), lengths / 100], axis=1)
+
+    def __call__(self, texts, **kwargs):
+        enc = self.tokenizer(texts)["input_ids"]
+        logits = self.logits(*pad_batch(enc, self.tokenizer.pad_token_id))
+        probs = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+        labels = self.model.config.id2label
+        return [[{"label": labels[i], "score": float(p)} for i, p in enumerate(row)] for row in probs]
+
+
+def test_pad_batch():
+    ids, mask = pad_batch([[5, 6, 7], [8]], pad_id=1)
+    assert ids.tolist() == [[5, 6, 7], [8, 1, 1]]
+    assert mask.tolist() == [[1, 1, 1], [1, 0, 0]]
+
+
+def test_pipelined_matches_sequential_and_isolates_failed_batches():
+    base = FakeModel()
+    scorer = PipelinedScorer(base, queue_size=2)
+    assert model_fingerprint(scorer) == model_fingerprint(base) == "fake/model@abc"
+
+    texts = ["a" * n for n in [5, 300, 40, 700, 12, 90] * 10]
+    expected = analyze_sentiment_batch(texts, base, batch_size=4)
+    got = analyze_sentiment_batch(texts, scorer, batch_size=4, max_tokens=600)
+    for e, g in zip(expected, got):
+        assert e["label"] == g["label"]
+        np.testing.assert_allclose(e["probs"], g["probs"], rtol=1e-6)
+    assert set(scorer.last_stats["stages"]) == {"tokenize", "model", "postprocess"}
+
+    texts[7] = "bad!"
+    results, ok = scorer.score_texts(texts, batch_size=4)
+    assert not ok[7] and results[7]["probs"] is None
+    assert sum(ok) == len(texts) - 4
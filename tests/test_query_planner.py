@@ -0,0 +1,43 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from query_planner import plan_batches, route_article, ticker_terms
+
+UNIVERSE = ["0700.HK", "9988.HK", "3690.HK", "1810.HK", "9618.HK", "Tencent OR Meituan"]
+
+
+def test_batches_pack_tickers_under_term_and_char_limits():
+    batches = plan_batches(UNIVERSE, max_targets=3, max_terms=8)
+    # 自由关键词不参与合并，单独成一条查询
+    assert [b.targets for b in batches] == [["0700.HK", "9988.HK"], ["3690.HK", "1810.HK"], ["Tencent OR Meituan"],
+                                            ["9618.HK"]]
+    for b in batches:
+        assert len(b.keywords.split(" OR ")) <= 8 or not b.is_batched
+    # 单只股票保留原始关键词，抓取端展开方式与缓存键不变
+    assert batches[2].keywords == "Tencent OR Meituan" and batches[3].keywords == "9618.HK"
+    assert batches[0].keywords == " OR ".join(ticker_terms("0700.HK") + ticker_terms("9988.HK"))
+
+    by_chars = plan_batches(UNIVERSE[:5], max_targets=5, max_terms=100, max_chars=80)
+    assert all(len(b.keywords) <= 80 for b in by_chars)
+    assert [t for b in by_chars for t in b.targets] == UNIVERSE[:5]
+    assert [b.targets for b in plan_batches(UNIVERSE[:3])] == [["0700.HK"], ["9988.HK"], ["3690.HK"]]
+
+
+def test_route_multi_ticker_articles_and_drop_unmatched():
+    batch = plan_batches(["0700.HK", "9988.HK", "3690.HK"], max_targets=3,
+                         aliases={"9988.HK": ["Alibaba"], "3690.HK": ["Meituan"]})[0]
+    article = {"title": "Alibaba and Tencent (0700) slide",
+               "body": "Alibaba cut prices; 0700.HK fell. Alibaba said more.",
+               "concepts": [{"label": {"eng": "Meituan"}}]}
+    # 标题权重 2：Alibaba 2+2=4 > Tencent 代码 2+1=3 > Meituan 概念 2
+    assert route_article(article, batch) == ["9988.HK", "0700.HK", "3690.HK"]
+
+    # 代码前后紧跟数字 / 字母不算命中（07001、HK07000）
+    assert route_article({"title": "Fund 07001 and HK07000 update", "body": "no match"}, batch) == []
+    assert route_article({"title": "港股 HK0700 走高", "body": None}, batch) == ["0700.HK"]
+
+    # 未批量的查询直接归给唯一的目标
+    single = plan_batches(["0700.HK"])[0]
+    assert route_article({"title": "unrelated"}, single) == ["0700.HK"]
@@ -0,0 +1,61 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from score_mappings import apply_score_mapping, probability_frame
+
+
+def _legacy_reference(label, confidence):
+    if label in ["LABEL_0", "NEGATIVE", "negative"]:
+        return -confidence
+    if label in ["LABEL_1", "NEUTRAL", "neutral"]:
+        return (confidence - 0.5) * 0.2
+    if label in ["LABEL_2", "POSITIVE", "positive"]:
+        return confidence
+    return 0.0
+
+
+def test_legacy_mapping_matches_scalar_rule():
+    df = pd.DataFrame({
+        "sentiment_label": ["negative", "LABEL_1", "POSITIVE", "neutral", "weird"],
+        "sentiment_confidence": [0.8, 0.9, 0.6, 0.3, 0.7],
+    })
+    expected = [_legacy_reference(l, c) for l, c in zip(df["sentiment_label"], df["sentiment_confidence"])]
+    assert np.allclose(apply_score_mapping(df, "legacy"), expected)
+
+
+def test_probability_mappings():
+    results = [{"probs": [0.1, 0.2, 0.7]}, {"probs": [1 / 3, 1 / 3, 1 / 3]}, {"probs": None}]
+    df = probability_frame(results)
+    assert df.dtypes.unique().tolist() == [np.float32]
+    assert np.allclose(apply_score_mapping(df, "expected_value")[:2], [0.6, 0.0], atol=1e-6)
+    assert np.allclose(apply_score_mapping(df, "polarity")[:1], [0.75], atol=1e-6)
+    weighted = apply_score_mapping(df, "entropy_weighted")
+    assert 0 < weighted[0] < 0.6 and abs(weighted[1]) < 1e-6 and np.isnan(weighted[2])
+
+
+def test_rescoring_cascade_output_keeps_lexicon_scores():
+    from sentiment_cascade import CascadeThresholds, lexicon_decisions, merge_cascade
+    from sentiment_top import add_sentiment_scores
+
+    df = pd.DataFrame({"body": ["strong gain beat record", "plain update", "weak loss miss decline", "error row"]})
+    d = lexicon_decisions(df["body"], ["gain", "strong", "beat", "record"], ["loss", "weak", "miss", "decline"],
+                          CascadeThresholds())
+    routed = df[~d["confident"].to_numpy()]
+    results = [{"label": "positive", "score": 0.7, "probs": [0.1, 0.2, 0.7]},
+               {"label": "LABEL_1", "score": 0.5, "probs": None}]
+    merged = merge_cascade(df, d, add_sentiment_scores(routed, results, "body"))
+    assert merged["sentiment_score"].tolist()[0] == 1.0
+
+    for mapping in ["legacy", "expected_value", "polarity", "entropy_weighted"]:
+        scores = apply_score_mapping(merged, mapping)
+        # 词典行保留词典极性，模型行按新映射重算
+        assert scores[0] == 1.0 and scores[2] == -1.0
+        if mapping != "legacy":
+            # 没有类别概率的模型行（出错批次）在所有概率映射下都是 NaN
+            assert not np.isnan(scores[1]) and np.isnan(scores[3])
+    assert np.isclose(apply_score_mapping(merged, "polarity")[1], 0.75)
@@ -0,0 +1,32 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from seen_store import SeenStore
+
+
+def test_add_and_lookup(tmp_path):
+    store = SeenStore(str(tmp_path / "seen.sqlite"))
+    assert store.add_many(["a", "b", "b"]) == 2
+    assert "a" in store and "z" not in store
+    assert store.contains_many(["a", "z", "b"]) == {"a", "b"}
+    assert store.add_many(["a", "c"]) == 1
+    assert len(store) == 3
+
+
+def test_legacy_jsonl_migrated_once(tmp_path):
+    legacy = tmp_path / "seen_uris.jsonl"
+    legacy.write_text("\n".join([json.dumps({"uri": "u1"}), "not json", json.dumps({"uri": "u2"})]) + "\n")
+    db = str(tmp_path / "seen.sqlite")
+
+    store = SeenStore(db, legacy_jsonl=str(legacy))
+    assert store.contains_many(["u1", "u2", "u3"]) == {"u1", "u2"}
+    store.close()
+
+    with legacy.open("a") as f:
+        f.write(json.dumps({"uri": "u3"}) + "\n")
+    store = SeenStore(db, legacy_jsonl=str(legacy))
+    assert "u3" not in store
+    assert len(store) == 2
@@ -0,0 +1,59 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_top import analyze_sentiment_batch, plan_token_batches
+
+
+def test_token_batches_respect_budget_and_cover_all():
+    lengths = [512, 12, 300, 20, 512, 64, 18, 250]
+    batches = plan_token_batches(lengths, max_tokens=1024, max_batch_size=3)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        assert len(b) <= 3
+        assert max(lengths[i] for i in b) * len(b) <= 1024
+
+
+def test_dynamic_batching_restores_input_order():
+    seen_batches = []
+
+    def fake_pipeline(batch, **kwargs):
+        seen_batches.append(list(batch))
+        return [[{"label": "positive", "score": len(t) / 10000}, {"label": "negative", "score": 0.0}] for t in batch]
+
+    texts = ["x" * n for n in [40, 2000, 60, 1000, 80, 50] * 4]
+    results = analyze_sentiment_batch(texts, fake_pipeline, batch_size=8, max_tokens=2048)
+    assert [r["score"] for r in results] == [len(t) / 10000 for t in texts]
+    assert max(len(b) for b in seen_batches) <= 8
+    assert len(seen_batches[0][0]) == 2000
+
+
+def test_planning_counts_tokens_with_the_tokenizer():
+    from sentiment_top import estimate_token_length, token_lengths
+
+    class CountingTokenizer:
+        calls = 0
+
+        def __call__(self, texts, truncation=True, max_length=512):
+            CountingTokenizer.calls += 1
+            return {"input_ids": [[0] * min(len(t.split()) + 2, max_length) for t in texts]}
+
+    seen_batches = []
+
+    def fake_pipeline(batch, **kwargs):
+        seen_batches.append(list(batch))
+        return [[{"label": "neutral", "score": 1.0}] for _ in batch]
+
+    fake_pipeline.tokenizer = CountingTokenizer()
+    # 数字、代码密集的文本远少于 4 字符 / token，按分词器计数 max_tokens 才是真正上限
+    texts = ["7 " * n for n in (10, 400, 30, 60)]
+    assert token_lengths(texts, fake_pipeline) == [12, 402, 32, 62]
+    analyze_sentiment_batch(texts, fake_pipeline, batch_size=8, max_tokens=512)
+    assert CountingTokenizer.calls == 2
+    for batch in seen_batches:
+        assert max(len(t.split()) + 2 for t in batch) * len(batch) <= 512
+
+    assert estimate_token_length("x" * 400) == 102 and estimate_token_length("x" * 4000) == 512
+    # 没有分词器时粗估：中日韩字符不按 4 字符 / token 低估
+    assert estimate_token_length("腾讯控股公布业绩") == 18
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_cache import SentimentCache
+
+
+def test_hits_misses_and_model_isolation(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    cache = SentimentCache(db, "model@a", "v1")
+    assert cache.get_many(["x", "y"]) == [None, None]
+    cache.put_many(["x"], [{"label": "positive", "score": 0.9}])
+    assert cache.get_many(["y", "x"]) == [None, {"label": "positive", "score": 0.9}]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+    cache.close()
+
+    other_model = SentimentCache(db, "model@b", "v1")
+    assert other_model.get_many(["x"]) == [None]
+
+
+def test_lru_eviction(tmp_path):
+    cache = SentimentCache(str(tmp_path / "cache.sqlite"), "m", "v1", max_entries=2)
+    cache.put_many(["a", "b"], [1, 2])
+    time.sleep(0.01)
+    cache.get_many(["a"])
+    time.sleep(0.01)
+    cache.put_many(["c"], [3])
+    assert len(cache) == 2
+    assert cache.get_many(["a", "b", "c"]) == [1, None, 3]
+
+
+def test_put_many_only_counts_rows_near_the_cap(tmp_path):
+    cache = SentimentCache(str(tmp_path / "cache.sqlite"), "m", "v1", max_entries=5)
+    counts = []
+    cache.conn.set_trace_callback(lambda sql: counts.append(sql) if "COUNT(*)" in sql else None)
+    cache.put_many(["a", "b"], [1, 2])
+    time.sleep(0.01)
+    cache.put_many(["c", "d"], [3, 4])
+    assert counts == []
+    time.sleep(0.01)
+
+    # 重复写入同一文本时上界偏大，超过上限才精确计数一次，不误删
+    cache.put_many(["a", "b"], [1, 2])
+    assert len(counts) == 1 and len(cache) == 4
+    time.sleep(0.01)
+    cache.put_many(["e", "f"], [5, 6])
+    # 淘汰的是最久未用的 c / d 之一，重新写入过的 a、b 保留
+    assert len(cache) == 5 and None not in cache.get_many(["a", "b", "e", "f"])
@@ -0,0 +1,64 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_cascade import CascadeThresholds, cascade_report, lexicon_decisions
+
+POSITIVE = ["gain", "strong", "beat", "record"]
+NEGATIVE = ["loss", "weak", "miss", "decline"]
+
+
+def fake_pipeline(batch, **kwargs):
+    out = []
+    for text in batch:
+        p = 0.8 if "gain" in text else 0.1
+        out.append([{"label": "positive", "score": p}, {"label": "neutral", "score": 0.9 - p},
+                    {"label": "negative", "score": 0.1}])
+    return out
+
+
+def test_lexicon_decisions_thresholds():
+    texts = pd.Series([
+        "strong gain beat record quarter",   # 4 正面命中，明确
+        "gain loss strong weak results",     # 正负混杂
+        "gain in a long article " + "filler " * 200,  # 命中太少、密度太低
+        None,
+    ])
+    d = lexicon_decisions(texts, POSITIVE, NEGATIVE, CascadeThresholds(min_hits=3, min_purity=0.8, min_density=0.02))
+    assert d["confident"].tolist() == [True, False, False, False]
+    assert d.loc[0, "lm_polarity"] == 1.0
+    assert d.loc[1, "lm_polarity"] == 0.0
+
+
+def test_cascade_routes_only_uncertain_rows_and_keeps_order():
+    bodies = ["strong gain beat record", "weak loss miss decline", "company held its meeting", "gain on sale"] * 6
+    df = pd.DataFrame({
+        "date": np.repeat(["2024-01-02", "2024-01-03"], 12),
+        "code": [f"{i % 12:04d}.HK" for i in range(24)],
+        "body": bodies,
+    })
+    report = cascade_report(df, fake_pipeline, POSITIVE, NEGATIVE, CascadeThresholds(), batch_size=4)
+    assert report["routed_to_transformer"] == 12
+    assert report["routed_fraction"] == 0.5
+    assert report["factor_days"] == 2
+    assert -1 <= report["factor_rank_corr_mean"] <= 1
+
+
+def test_merge_cascade_assigns_lexicon_scores_in_place():
+    from sentiment_cascade import merge_cascade
+    from sentiment_top import add_sentiment_scores, score_articles
+
+    df = pd.DataFrame({"body": ["strong gain beat record", "plain update", "weak loss miss decline"]},
+                      index=[10, 11, 12])
+    d = lexicon_decisions(df["body"], POSITIVE, NEGATIVE, CascadeThresholds())
+    routed = df[~d["confident"].to_numpy()]
+    scored = add_sentiment_scores(routed, score_articles(routed, fake_pipeline, "body"), "body")
+    merged = merge_cascade(df, d, scored)
+    assert merged.index.tolist() == [10, 11, 12]
+    assert merged["sentiment_source"].tolist() == ["lexicon", "transformer", "lexicon"]
+    assert merged["sentiment_score"].tolist()[0] == 1.0 and merged["sentiment_score"].tolist()[2] == -1.0
+    assert merged["prob_neutral"].isna().tolist() == [True, False, True]
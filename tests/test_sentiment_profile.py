@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_profile import (ScoringProfile, add_profile_arguments, apply_profile, best_config, load_profile,
+                               save_profile, tune)
+
+
+class FakePipeline:
+    """标签取决于截断后文本的最后一个字符：截断过短时标签改变"""
+
+    def __call__(self, texts, max_length=512, **kwargs):
+        out = []
+        for t in texts:
+            positive = t[:max_length].endswith("+")
+            out.append([{"label": "positive", "score": 0.9 if positive else 0.1},
+                        {"label": "negative", "score": 0.1 if positive else 0.9}])
+        return out
+
+
+def test_tune_records_metrics_and_rejects_lossy_truncation():
+    texts = ["x" * 20 + "+" if i % 2 else "short+" for i in range(40)]
+    loads = []
+    rows = tune(texts, lambda num_threads: loads.append(num_threads) or FakePipeline(),
+                batch_sizes=[4, 8], thread_counts=[1, 2], max_lengths=[8, 512])
+    assert loads == [1, 2] and len(rows) == 8
+    for row in rows:
+        assert row["articles_per_sec"] > 0 and row["latency_p99_ms"] >= row["latency_p50_ms"]
+        assert row["peak_rss_mb"] > 0
+    assert {r["label_agreement"] for r in rows if r["max_length"] == 512} == {1.0}
+    assert {r["label_agreement"] for r in rows if r["max_length"] == 8} == {0.5}
+
+    best = best_config(rows, min_agreement=0.98)
+    assert best["max_length"] == 512
+    assert best_config(rows, max_rss_mb=0) is None
+
+
+def test_profile_roundtrip_and_cli_precedence():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "profile.json")
+        assert load_profile("torch", path) is None
+        save_profile(ScoringProfile(16, 4, 256, "torch", 123.0), path)
+        save_profile(ScoringProfile(64, 8, 512, "onnx-int8", 456.0), path)
+        assert load_profile("torch", path).batch_size == 16
+        assert load_profile("onnx-int8", path).num_threads == 8
+
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--backend", default="torch")
+        parser.add_argument("--batch_size", type=int)
+        parser.add_argument("--max_length", type=int)
+        parser.add_argument("--threads_per_worker", type=int)
+        parser.add_argument("--workers", type=int, default=1)
+        add_profile_arguments(parser)
+
+        args = parser.parse_args(["--profile", path, "--batch_size", "32"])
+        apply_profile(args)
+        assert (args.batch_size, args.max_length, args.threads_per_worker) == (32, 256, 4)
+
+        # 多进程时不采用单进程调出的线程数
+        args = parser.parse_args(["--profile", path, "--workers", "4"])
+        apply_profile(args)
+        assert args.threads_per_worker is None
+
+        args = parser.parse_args(["--profile", path, "--no_profile"])
+        assert apply_profile(args) is None and args.batch_size is None
@@ -0,0 +1,104 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_server import SentimentClient, SentimentServer, model_score_fn
+from sentiment_top import analyze_sentiment_batch
+
+
+class FakePipeline:
+    """按文本长度给出确定的三类概率；含 "!" 的批次报错"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, texts, **kwargs):
+        self.batch_sizes.append(len(texts))
+        if any("!" in t for t in texts):
+            raise RuntimeError("boom")
+        out = []
+        for t in texts:
+            pos = min(len(t), 90) / 100
+            out.append([{"label": "positive", "score": pos}, {"label": "neutral", "score": 0.05},
+                        {"label": "negative", "score": 0.95 - pos}])
+        return out
+
+
+def _start(pipeline, unix_socket=None, **kwargs):
+    server = SentimentServer(model_score_fn(pipeline, batch_size=64, max_tokens=None), "fake/model@abc", **kwargs)
+    return server, server.run_in_thread(port=0, unix_socket=unix_socket)
+
+
+def test_server_matches_local_scoring_and_coalesces_requests():
+    pipeline = FakePipeline()
+    server, url = _start(pipeline, max_batch_size=64, max_wait_ms=200)
+    try:
+        client = SentimentClient(url, request_size=5)
+        assert client.fingerprint == "fake/model@abc"
+        assert client.sentiment_source == "transformer"
+
+        texts = ["a" * n for n in range(1, 41)]
+        assert analyze_sentiment_batch(texts, client, batch_size=8) == analyze_sentiment_batch(
+            texts, FakePipeline(), batch_size=64)
+
+        # 并发的小请求在 max_wait_ms 内合并为少量模型批次
+        pipeline.batch_sizes.clear()
+        outputs = [None] * 8
+        threads = [threading.Thread(target=lambda i=i: outputs.__setitem__(i, client.score_texts(["b" * (i + 1)])))
+                   for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert all(out[1] == [True] for out in outputs)
+        assert len(pipeline.batch_sizes) < 8
+
+        metrics = client.metrics()
+        assert metrics["texts"] == 48 and metrics["errors"] == 0
+        assert metrics["latency_ms"]["p50"] is not None and metrics["batch_fill_mean"] > 0
+    finally:
+        server.stop()
+
+
+def test_failed_batch_is_reported_and_server_keeps_working():
+    server, url = _start(FakePipeline(), max_wait_ms=1, backend="student")
+    try:
+        client = SentimentClient(url)
+        # 学生模型服务的结果标注为 student
+        assert client.backend == "student" and client.sentiment_source == "student"
+        results, ok = client.score_texts(["fine", "bad!"])
+        assert ok == [False, False] and results[0]["probs"] is None
+        assert client.score_texts(["fine"])[1] == [True]
+    finally:
+        server.stop()
+
+
+def test_unix_socket_transport():
+    with tempfile.TemporaryDirectory() as tmp:
+        server, url = _start(FakePipeline(), unix_socket=os.path.join(tmp, "s.sock"))
+        try:
+            assert url.startswith("unix://")
+            results, ok = SentimentClient(url).score_texts(["abc", "abcdef"])
+            assert ok == [True, True] and results[0]["label"] == "negative"
+        finally:
+            server.stop()
+
+
+def test_startup_failure_is_raised_in_caller():
+    busy = socket.socket()
+    busy.bind(("127.0.0.1", 0))
+    busy.listen()
+    try:
+        server = SentimentServer(model_score_fn(FakePipeline(), batch_size=8, max_tokens=None), "fake/model@abc")
+        # 端口被占用：异常在调用方抛出，而不是一直等待启动
+        with pytest.raises(OSError):
+            server.run_in_thread(port=busy.getsockname()[1], timeout=5)
+        assert server._thread is None
+    finally:
+        busy.close()
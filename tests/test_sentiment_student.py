@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_student import (StudentModel, StudentScorer, _take_rows, fidelity_report, hash_features,
+                               load_teacher_outputs)
+from sentiment_top import add_sentiment_scores, analyze_sentiment_batch
+
+_POS = "profit beat record growth upgrade".split()
+_NEG = "loss miss lawsuit downgrade probe".split()
+_FILLER = "tencent alibaba shares hong kong market said quarter".split()
+
+
+def _teacher_frame(n=600, seed=0):
+    """合成教师输出：情感由正负词数量决定"""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(n):
+        pos, neg = rng.integers(0, 3, size=2)
+        words = list(rng.choice(_FILLER, 8)) + list(rng.choice(_POS, pos)) + list(rng.choice(_NEG, neg))
+        rng.shuffle(words)
+        logits = np.array([neg * 1.5, 0.5, pos * 1.5])
+        probs = np.exp(logits) / np.exp(logits).sum()
+        rows.append({"date": f"2024-01-{i % 7 + 1:02d}", "code": f"{i % 10:04d}", "body": " ".join(words),
+                     "prob_negative": probs[0], "prob_neutral": probs[1], "prob_positive": probs[2]})
+    df = pd.DataFrame(rows)
+    labels = np.array(["negative", "neutral", "positive"])[df[["prob_negative", "prob_neutral",
+                                                               "prob_positive"]].to_numpy().argmax(axis=1)]
+    df["sentiment_label"] = labels
+    df["sentiment_confidence"] = df[["prob_negative", "prob_neutral", "prob_positive"]].max(axis=1)
+    return df
+
+
+def test_hash_features_and_take_rows():
+    indptr, indices, values = hash_features(["Profit beat", "", "profit beat profit"], n_bits=10)
+    assert indptr.tolist()[0] == 0 and indptr[2] == indptr[1]
+    assert set(indices[indptr[0]:indptr[1]]) <= set(indices[indptr[2]:indptr[3]])
+    np.testing.assert_allclose(np.linalg.norm(values[indptr[2]:indptr[3]]), 1.0, rtol=1e-5)
+    sub = _take_rows(indptr, indices, values, np.array([2, 0]))
+    assert sub[0].tolist() == [0, indptr[3] - indptr[2], indptr[3] - indptr[2] + indptr[1]]
+    assert sub[1].tolist() == indices[indptr[2]:indptr[3]].tolist() + indices[:indptr[1]].tolist()
+
+
+def test_student_learns_teacher_and_plugs_into_scoring():
+    df = _teacher_frame()
+    train, test = df.iloc[:500], df.iloc[500:]
+    model = StudentModel(n_bits=12)
+    history = model.fit(train["body"].tolist(), train[["prob_negative", "prob_neutral", "prob_positive"]].to_numpy(),
+                        epochs=8)
+    assert history[-1] < history[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "student.npz")
+        model.save(path)
+        scorer = StudentScorer(path)
+        np.testing.assert_allclose(scorer.model.predict_proba(test["body"].tolist()),
+                                   model.predict_proba(test["body"].tolist()), rtol=1e-6)
+        assert scorer.fingerprint.startswith("student/student@")
+
+        # 与其他评分器同一接口：analyze_sentiment_batch / add_sentiment_scores 直接可用
+        results = analyze_sentiment_batch(test["body"].tolist(), scorer, batch_size=32)
+        scored = add_sentiment_scores(test[["body"]], results, "body", source=scorer.sentiment_source)
+        assert scored["sentiment_score"].between(-1, 1).all()
+        assert (scored["sentiment_source"] == "student").all()
+
+        report = fidelity_report(test, scorer, "body", teacher_articles_per_sec=10.0)
+        assert report["label_agreement"] > 0.8
+        assert report["score_correlation"] > 0.8
+        assert report["speedup"] > 1
+        assert report["factor_rank_corr_pooled"] > 0.8
+
+        # 词典级联行（没有概率）不作为软标签
+        csv_path = os.path.join(tmp, "articles_with_sentiment.csv")
+        with_lexicon = df.assign(sentiment_source="transformer")
+        with_lexicon.loc[:9, "sentiment_source"] = "lexicon"
+        with_lexicon.loc[:9, ["prob_negative", "prob_neutral", "prob_positive"]] = np.nan
+        with_lexicon.to_csv(csv_path, index=False)
+        assert len(load_teacher_outputs(csv_path)) == len(df) - 10
+
+        # 来源不明或含学生模型结果的文件不能作为教师输出
+        df.to_csv(csv_path, index=False)
+        with pytest.raises(ValueError, match="sentiment_source"):
+            load_teacher_outputs(csv_path)
+        with_lexicon.loc[10:19, "sentiment_source"] = "student"
+        with_lexicon.to_csv(csv_path, index=False)
+        with pytest.raises(ValueError, match="学生模型"):
+            load_teacher_outputs(csv_path)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from sentiment_top import analyze_sentiment_batch
+from sentiment_workers import SentimentWorkerPool
+
+
+def fake_pipeline(batch, **kwargs):
+    if "crash" in batch:
+        # 模拟工作进程崩溃（如 OOM 被杀）
+        os._exit(1)
+    return [[{"label": "positive", "score": len(t) / 10000}, {"label": "negative", "score": 0.0}] for t in batch]
+
+
+def load_fake_pipeline(num_threads=None):
+    return fake_pipeline
+
+
+def test_worker_pool_merges_shards_in_order_and_isolates_failures():
+    texts = ["x" * n for n in range(1, 41)]
+    texts[25] = "crash"
+    with SentimentWorkerPool(2, 1, shard_size=8, loader=load_fake_pipeline) as pool:
+        assert pool.fingerprint.endswith("@unknown")
+        results, ok = pool.score_texts(texts, batch_size=4, max_tokens=64)
+        # 崩溃后进程池重建，后续调用仍可用
+        again = analyze_sentiment_batch(texts[:8], pool, batch_size=4)
+
+    crashed = set(range(24, 32))
+    for i, (text, result) in enumerate(zip(texts, results)):
+        if i in crashed:
+            assert not ok[i] and result["probs"] is None
+        else:
+            assert ok[i] and result["score"] == len(text) / 10000
+    assert [r["score"] for r in again] == [r["score"] for r in results[:8]]
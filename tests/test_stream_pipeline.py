@@ -0,0 +1,125 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from stream_pipeline import FetchStream, rechunk, run_stream
+
+WIRE = ("Tencent Holdings reported second-quarter revenue of 184 billion yuan, up 15% from a year earlier, "
+        "beating analyst estimates as its gaming and advertising businesses continued to recover.")
+
+
+BODIES = ["Alibaba shares fell after the company announced a restructuring of its cloud unit.",
+          "Meituan posted a wider loss as competition in food delivery intensified this quarter.",
+          "Xiaomi raised its smartphone shipment guidance on strong demand in overseas markets."]
+
+
+def _rows(start, n, body=None):
+    return [{"uri": f"u{i}", "url": f"http://x/{i}", "title": f"title {i}", "body": body or BODIES[i],
+             "date": "2024-06-03", "time": "10:00:00"} for i in range(start, start + n)]
+
+
+class FakeNewsPipeline:
+    """代替 NewsPipeline：run_recent 通过 on_commit 逐页推送"""
+
+    def __init__(self, pages, gate=None):
+        self.cfg = SimpleNamespace(recent_pages=1, archive_pages=0, years=[])
+        self.on_commit = None
+        self.pages = pages
+        self.gate = gate
+        self.produced = 0
+
+    def run_recent(self):
+        for i, page in enumerate(self.pages):
+            if i == 1 and self.gate is not None:
+                # 第二页等下游拿到第一块后才到达
+                assert self.gate.wait(5)
+            self.on_commit(page)
+            self.produced += 1
+
+
+class FakeModel:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts, **kwargs):
+        self.texts.extend(texts)
+        return [[{"label": "positive", "score": 0.8}, {"label": "neutral", "score": 0.15},
+                 {"label": "negative", "score": 0.05}] for _ in texts]
+
+
+def test_fetch_stream_applies_backpressure():
+    pipe = FakeNewsPipeline([[{"n": i}] for i in range(30)])
+    stream = FetchStream(pipe, queue_pages=4)
+    lead = []
+    for consumed, _ in enumerate(stream, start=1):
+        time.sleep(0.005)
+        lead.append(pipe.produced - consumed)
+    # 抓取线程最多领先队列长度 + 正在 put 的一页
+    assert len(lead) == 30 and max(lead) <= 4 + 1
+    assert pipe.on_commit is None
+
+
+def test_rechunk_flushes_partial_chunk_when_fetch_is_idle():
+    gate = threading.Event()
+    pipe = FakeNewsPipeline([[{"n": i} for i in range(3)], [{"n": i} for i in range(3, 8)]], gate)
+    chunks = rechunk(FetchStream(pipe), chunk_size=100)
+    first = next(chunks)
+    assert len(first) == 3
+    gate.set()
+    assert [len(c) for c in chunks] == [5]
+
+    # 非流式数据源只在凑满或结束时产出
+    assert [len(c) for c in rechunk([[{"n": 1}] * 3, [{"n": 2}] * 5], chunk_size=4)] == [4, 4]
+
+
+def test_run_stream_uses_cache_token_batching_and_cluster_dedup(tmp_path):
+    out = tmp_path / "scored.csv"
+    pages = [_rows(0, 3), _rows(3, 1, WIRE), _rows(4, 1, "(Reuters) " + WIRE + " Shares rose 2%.")]
+    kwargs = dict(chunk_size=2, cache_db=str(tmp_path / "cache.sqlite"), max_tokens=4096,
+                  near_dup_db=str(tmp_path / "near_dup.sqlite"))
+
+    model = FakeModel()
+    stats = run_stream(pages, str(out), sentiment_pipeline=model, **kwargs)
+    assert stats["rows_scored"] == 5
+    # 转载稿晚一块到达，与原稿同簇，只送模型一次
+    assert len(model.texts) == 4 and sum(WIRE in t for t in model.texts) == 1
+
+    rerun = FakeModel()
+    stats = run_stream(pages, str(tmp_path / "again.csv"), sentiment_pipeline=rerun, **kwargs)
+    assert rerun.texts == [] and stats["cache"]["hits"] > 0
+
+    scored = pd.read_csv(out)
+    assert scored["uri"].tolist() == [f"u{i}" for i in range(5)]
+    assert (scored["sentiment_source"] == "transformer").all()
+    assert scored["canonical_uri"].tolist()[3:] == ["u3", "u3"]
+
+
+def test_csv_output_is_rewritten_per_run_and_aligned_to_header(tmp_path):
+    from stream_pipeline import append_results
+
+    out = tmp_path / "scored.csv"
+    pages = [_rows(0, 3)]
+    run_stream(pages, str(out), chunk_size=2, sentiment_pipeline=FakeModel())
+    # 重跑不重复追加；第二次启用近重复检测，多出 canonical_uri 列
+    run_stream(pages, str(out), chunk_size=2, sentiment_pipeline=FakeModel(),
+               near_dup_db=str(tmp_path / "near_dup.sqlite"))
+    scored = pd.read_csv(out)
+    assert scored["uri"].tolist() == ["u0", "u1", "u2"]
+    assert scored["canonical_uri"].tolist() == ["u0", "u1", "u2"]
+
+    # 同一列集合、不同列顺序时按已有表头对齐
+    append_results(scored.iloc[:1][scored.columns[::-1]], str(out))
+    again = pd.read_csv(out)
+    assert again.columns.tolist() == scored.columns.tolist() and again["uri"].tolist() == ["u0", "u1", "u2", "u0"]
+
+    # 列集合不同时合并后重写，旧行缺失的列为空
+    append_results(pd.DataFrame({"uri": ["u9"], "extra": [1]}), str(out))
+    merged = pd.read_csv(out)
+    assert merged["uri"].tolist()[-1] == "u9" and merged["extra"].notna().sum() == 1
+    assert merged.loc[0, "body"] == scored.loc[0, "body"]